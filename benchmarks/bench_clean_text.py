@@ -0,0 +1,71 @@
+# benchmarks/bench_clean_text.py
+#
+# Times each html_to_text backend on retailer-sized receipt mails.
+#
+#   python -m benchmarks.bench_clean_text [--emails 200] [--repeat 3]
+
+import argparse
+import random
+import time
+
+from hushh_mcp.operons.extract_email_text import HTML_TEXT_BACKENDS, html_to_text
+
+ITEMS = [
+    ("boAt Rockerz 450 Bluetooth Headphones", "1,499.00"),
+    ("Logitech M235 Wireless Mouse", "595.00"),
+    ("Redmi Note 12 Pro 5G (Onyx Black, 128 GB)", "24,999.00"),
+    ("Sony WH-1000XM4 Noise Cancelling Headphones", "24,990.00"),
+    ("Apple AirPods (2nd generation)", "12,900.00"),
+]
+
+HEAD = (
+    "<!DOCTYPE html><html><head><meta charset='utf-8'><title>Your order</title>"
+    "<style>" + "td.c{font-family:Arial,sans-serif;color:#333;padding:4px}" * 120 + "</style>"
+    "<script>window.dataLayer=[];" + "dataLayer.push({'e':'<b>'});" * 40 + "</script></head><body>"
+)
+
+FOOTER_ROW = (
+    "<tr><td class='c'><a href='https://www.amazon.in/gp/r.html?C=1&amp;K=2&amp;M=urn:rtn:msg'>"
+    "Your Orders</a>&nbsp;|&nbsp;<a href='#'>Your Account</a></td>"
+    "<td class='c'><img src='https://example.com/pixel.gif' width='1' height='1' alt=''>"
+    "<!-- tracking --></td></tr>"
+)
+
+def build_email(rng: random.Random, footer_rows: int) -> str:
+    lines = []
+    for name, price in rng.sample(ITEMS, rng.randint(1, 3)):
+        lines.append(f"<li>* {name}&nbsp;Quantity: 1 {price} INR</li>")
+    return (
+        HEAD
+        + "<table><tr><td class='c'>Hello,</td></tr><tr><td class='c'><ul>"
+        + "".join(lines)
+        + "</ul></td></tr>"
+        + FOOTER_ROW * footer_rows
+        + "</table></body></html>"
+    )
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--emails", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--footer-rows", type=int, default=250, help="~250 rows gives a ~90 KB mail")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    emails = [build_email(rng, args.footer_rows) for _ in range(args.emails)]
+    total_kb = sum(len(e) for e in emails) / 1024
+    print(f"{len(emails)} mails, {total_kb / len(emails):.0f} KB average")
+
+    reference = [html_to_text(e, "bs4") for e in emails]
+    for backend in sorted(HTML_TEXT_BACKENDS):
+        best = None
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            texts = [html_to_text(e, backend) for e in emails]
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        parity = "identical" if texts == reference else "DIFFERS"
+        print(f"{backend:>7}: {best * 1000 / len(emails):7.2f} ms/mail  {total_kb / 1024 / best:7.1f} MB/s  ({parity} to bs4)")
+
+if __name__ == "__main__":
+    main()
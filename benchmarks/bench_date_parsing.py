@@ -0,0 +1,79 @@
+# benchmarks/bench_date_parsing.py
+#
+# Compares the previous strptime-with-fallback format_date against the
+# memoised parse_email_date on a corpus shaped like retailer Date headers.
+#
+#   python -m benchmarks.bench_date_parsing [--headers 20000] [--repeat 5]
+
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from hushh_mcp.operons.parse_email_date import format_email_date, parse_email_date
+
+def legacy_format_date(date_str):
+    try:
+        return datetime.strptime(date_str[:25], "%a, %d %b %Y %H:%M:%S").strftime("%Y-%m-%d")
+    except:
+        try:
+            return datetime.strptime(date_str[:10], "%Y-%m-%d").strftime("%Y-%m-%d")
+        except:
+            return None
+
+def build_corpus(count: int, rng: random.Random):
+    start = datetime(2019, 1, 1)
+    headers = []
+    for _ in range(count):
+        moment = start + timedelta(seconds=rng.randrange(6 * 365 * 86400))
+        style = rng.random()
+        if style < 0.6:
+            headers.append(moment.strftime("%a, %d %b %Y %H:%M:%S +0000"))
+        elif style < 0.8:
+            # Single-digit day, as many MTAs send it, with a zone comment
+            headers.append(moment.strftime("%a, ") + str(moment.day) + moment.strftime(" %b %Y %H:%M:%S +0530 (IST)"))
+        elif style < 0.9:
+            headers.append(moment.strftime("%d %b %Y %H:%M:%S -0700"))
+        else:
+            headers.append(moment.strftime("%Y-%m-%d"))
+    # Receipt parsing revisits the same mails (shipped/delivered threads, reruns)
+    return headers + rng.sample(headers, count // 2)
+
+def time_it(fn, headers, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for header in headers:
+            fn(header)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--headers", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    headers = build_corpus(args.headers, random.Random(0))
+    legacy_parsed = sum(legacy_format_date(h) is not None for h in headers)
+    parsed = sum(format_email_date(h) is not None for h in headers)
+    print(f"{len(headers)} headers; parsed: legacy {legacy_parsed}, new {parsed}")
+
+    def cold(header):
+        parse_email_date.cache_clear()
+        format_email_date.cache_clear()
+        return format_email_date(header)
+
+    format_email_date.cache_clear()
+    parse_email_date.cache_clear()
+    results = [
+        ("legacy strptime", time_it(legacy_format_date, headers, args.repeat)),
+        ("new, no cache", time_it(cold, headers, args.repeat)),
+        ("new, memoised", time_it(format_email_date, headers, args.repeat)),
+    ]
+    for name, elapsed in results:
+        print(f"{name:>16}: {elapsed * 1e6 / len(headers):6.2f} us/header")
+
+if __name__ == "__main__":
+    main()
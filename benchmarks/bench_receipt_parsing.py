@@ -0,0 +1,42 @@
+# benchmarks/bench_receipt_parsing.py
+#
+# Compares serial and process-pool receipt parsing on a large mailbox.
+#
+#   python -m benchmarks.bench_receipt_parsing [--emails 5000] [--workers 1 2 4]
+
+import argparse
+import os
+import random
+import time
+
+from benchmarks.bench_clean_text import build_email
+from hushh_mcp.operons.extract_receipt_data import extract_receipts
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--emails", type=int, default=5000)
+    parser.add_argument("--footer-rows", type=int, default=60)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, os.cpu_count() or 1])
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    emails = [{
+        "from": "Amazon.in <auto-confirm@amazon.in>",
+        "subject": "Your Amazon.in order",
+        "date": "Wed, 01 Jan 2023 10:00:00 +0530",
+        "body": build_email(rng, args.footer_rows),
+    } for _ in range(args.emails)]
+    print(f"{len(emails)} mails, {os.cpu_count()} CPUs")
+
+    baseline = None
+    for workers in sorted(set(args.workers)):
+        start = time.perf_counter()
+        results = extract_receipts(emails, workers=workers)
+        elapsed = time.perf_counter() - start
+        if baseline is None:
+            baseline, reference = elapsed, results
+        parity = "identical" if results == reference else "DIFFERS"
+        print(f"{workers:>3} workers: {elapsed:6.2f}s  x{baseline / elapsed:4.1f}  ({parity})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+# benchmarks/bench_receipt_regex.py
+#
+# Times receipt extraction on pathological bodies with the standard `re`
+# engine and the linear-time RE2 engine (google-re2, if installed).
+#
+#   python -m benchmarks.bench_receipt_regex [--sizes 2000 4000 8000]
+
+import argparse
+import time
+
+from hushh_mcp.operons import extract_receipt_data
+from hushh_mcp.operons.extract_receipt_data import extract_receipt
+from hushh_mcp.operons.safe_regex import re2, regex_budget
+
+DATE = "Wed, 01 Jan 2023 10:00:00 +0530"
+
+def pathological_emails(size: int):
+    return {
+        # Many "* " bullets and no "Quantity": every bullet rescans to the end
+        "amazon bullets": {"from": "auto-confirm@amazon.in", "subject": "Your order", "date": DATE,
+                           "body": "* item " * size},
+        # A long item table with no quantity column
+        "flipkart table": {"from": "noreply@flipkart.com", "subject": "Your order", "date": DATE,
+                           "body": "Apple AirPods generation " * size},
+        # Repeated invoice headers with the amounts missing
+        "croma invoice": {"from": "orders@croma.com", "subject": "Invoice", "date": DATE,
+                          "body": "Item Description Tax Code Qty. Rate Amount 1 Sony x " * (size // 4)},
+    }
+
+def time_extraction(email, engine):
+    # Budget disabled so the full cost of each engine is visible
+    extract_receipt_data.EMAIL_REGEX_BUDGET_SECONDS = None
+    start = time.perf_counter()
+    with regex_budget(None, engine=engine):
+        extractor = extract_receipt_data.EXTRACTORS[extract_receipt_data.detect_platform(email)]
+        extractor.extract(email)
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[2000, 4000, 8000])
+    args = parser.parse_args()
+
+    engines = ["re", "re2"] if re2 is not None else ["re"]
+    if re2 is None:
+        print("google-re2 not installed; timing the standard engine only")
+
+    for size in args.sizes:
+        for name, email in pathological_emails(size).items():
+            timings = "  ".join(f"{engine}: {time_extraction(email, engine) * 1000:8.1f} ms" for engine in engines)
+            print(f"{name:>15} ({len(email['body']) // 1024:4d} KB)  {timings}")
+
+    budget = 0.5
+    extract_receipt_data.EMAIL_REGEX_BUDGET_SECONDS = budget
+    email = pathological_emails(args.sizes[-1])["amazon bullets"]
+    with regex_budget(None, engine="re"):
+        start = time.perf_counter()
+        result = extract_receipt(email)
+    # The budget is checked between pattern calls, so one slow call on `re` overruns it
+    print(f"standard engine with a {budget}s budget (checked between calls): "
+          f"{result['strategy']} after {time.perf_counter() - start:.2f}s")
+
+if __name__ == "__main__":
+    main()
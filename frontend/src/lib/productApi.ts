@@ -1,5 +1,5 @@
 // Utility for updating product status via backend API
-export async function updateProductStatus(id: number, newStatus: string) {
+export async function updateProductStatus(id: string, newStatus: string) {
   const res = await fetch('http://localhost:5000/products/update-status', {
     method: 'POST',
     headers: { 'Content-Type': 'application/json' },
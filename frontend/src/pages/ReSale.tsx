@@ -21,7 +21,7 @@ import { useNavigate } from "react-router-dom";
 import { updateProductStatus, fetchProducts } from "@/lib/productApi";
 
 interface Product {
-  id: number;
+  id: string;
   itemname: string;
   purchase_price: number;
   purchase_date: string;
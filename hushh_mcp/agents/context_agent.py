@@ -1,20 +1,11 @@
 import os
 import json
-import json
 from hushh_mcp.vault.json_vault import load_encrypted_json, save_encrypted_json
-import time
-from dotenv import load_dotenv
-from tqdm import tqdm
-from groq import Groq
-
-# Load API key
-load_dotenv()
-api_key = os.getenv("GROQ_API_KEY")
-if not api_key:
-    raise ValueError("GROQ_API_KEY not set in environment")
+from hushh_mcp import llm, llm_metrics
+from hushh_mcp.operons.product_identity import index_by_id
 
-# Initialize Groq client
-client = Groq(api_key=api_key)
+# Initialize Groq client (raises if GROQ_API_KEY is not set)
+client = llm.groq_client()
 
 # Model choice
 MODEL = "llama3-70b-8192"
@@ -27,7 +18,7 @@ OUTPUT_FILE = os.path.join(JSONS_DIR, "context.json")
 def build_prompt(product):
     return f"""Given this item metadata:
 {{
-  "id": {product['id']},
+  "id": {json.dumps(product['id'])},
   "price": "{product['price']}",
   "item": "{product['itemname']}",
   "purchase_date": "{product['purchase_date']}"
@@ -43,34 +34,68 @@ id, price, canonical_name, aliases, context_keywords
 DONT WRITE ANYTHING ELSE OTHER THAN THE JSON. I ONLY WANT JSON AS YOUR OUTPUT.
 """
 
+def is_json(text):
+    try:
+        json.loads(text)
+        return True
+    except json.JSONDecodeError:
+        return False
+
 def call_groq(prompt):
-    return client.chat.completions.create(
-        messages=[{"role": "user", "content": prompt}],
-        model=MODEL,
-        temperature=0.3,
-    )
+    # Returns the reply text; replies that are not JSON are not cached
+    return llm.complete(llm.GROQ, MODEL, prompt, client=client, accept=is_json, temperature=0.3)
+
+def load_previous_context(path):
+    # Product ids are content-derived, so a previous run's context for the same id is still valid
+    if not os.path.exists(path):
+        return {}
+    try:
+        return index_by_id(load_encrypted_json(path), "canonical_name")
+    except Exception:
+        return {}
+
+def describe_product(product):
+    # Returns the context entry, or None if the reply was not JSON
+    prompt = build_prompt(product)
+    # The reply should be valid JSON
+    with llm_metrics.tagged(agent="context_agent", stage="context", product_id=product["id"]):
+        raw = call_groq(prompt).strip()
+    try:
+        parsed = json.loads(raw)
+        parsed["id"] = product["id"]
+        return parsed
+    except json.JSONDecodeError:
+        print(f"Failed to parse product ID {product['id']}:")
+        print(raw)
+        return None
 
 def main():
     items = load_encrypted_json(INPUT_FILE)
+    previous = load_previous_context(OUTPUT_FILE)
+
+    fresh = [product for product in items if str(product["id"]) not in previous]
+    described = iter(llm.map_concurrently(describe_product, fresh, desc="Processing items"))
 
+    # Reassemble in input order; a failed product is skipped without stopping the others
     output = []
-    for product in tqdm(items, desc="Processing items"):
-        prompt = build_prompt(product)
-        response = call_groq(prompt)
-
-        # response.choices[0].message.content should be valid JSON
-        raw = response.choices[0].message.content.strip()
-        try:
-            parsed = json.loads(raw)
-            output.append(parsed)
-        except json.JSONDecodeError:
-            print(f"Failed to parse product ID {product['id']}:")
-            print(raw)
+    reused = 0
+    for product in items:
+        if str(product["id"]) in previous:
+            output.append(previous[str(product["id"])])
+            reused += 1
             continue
+        context = next(described)
+        if context:
+            output.append(context)
 
     save_encrypted_json(output, OUTPUT_FILE)
+    cache_stats = llm.save_response_cache()
+
+    print(f"LLM cache: {cache_stats['hits']} hit(s), {cache_stats['misses']} miss(es)")
 
-    print(f"\nContext data saved")
+    print(f"\nContext data saved ({reused} reused from the previous run)")
+    # False marks a partial run; the next run describes only the products still missing
+    return len(output) == len(items)
 
 if __name__ == "__main__":
     main()
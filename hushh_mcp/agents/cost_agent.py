@@ -3,19 +3,12 @@ import json
 from hushh_mcp.vault.json_vault import load_encrypted_json, save_encrypted_json
 import re
 import json
-from tqdm import tqdm
-from dotenv import load_dotenv
-import google.generativeai as genai
+from hushh_mcp import llm, llm_metrics
+from hushh_mcp.operons.product_identity import index_by_id
 
-# Load API key
-load_dotenv()
-api_key = os.getenv("GEMINI_API_KEY")
-if not api_key:
-    raise ValueError("GEMINI_API_KEY not set in environment")
-
-# Configure Gemini
-genai.configure(api_key=api_key)
-model = genai.GenerativeModel("gemini-1.5-flash")
+# Configure Gemini (raises if GEMINI_API_KEY is not set)
+GEMINI_MODEL = "gemini-1.5-flash"
+model = llm.gemini_model(GEMINI_MODEL)
 
 # Paths
 BASE_DIR = os.path.dirname(__file__)
@@ -23,13 +16,13 @@ JSONS_DIR = os.path.join(BASE_DIR, "../jsons")
 INPUT_FILE = os.path.join(JSONS_DIR, "productdetail.json")   # <-- use this file
 OUTPUT_FILE = os.path.join(JSONS_DIR, "resale_cost.json")
 
-def build_prompt(product):
-    return f"""
-You are a resale valuation assistant for the Indian market (OLX, Cashify, Quikr, etc.) as of July 26, 2025.
-
-Estimate a **realistic and conservative** price range for this second-hand product in INR. Use the product's name, original price, purchase date, and platform.
+# Batch valuation: products per prompt are capped by their estimated tokens and by count
+# (each product also costs ~60 tokens of reply). Set the max to 1 to value one product per request.
+VALUATION_BATCH_TOKEN_BUDGET = 1500
+VALUATION_BATCH_MAX_PRODUCTS = 20
 
-Guidelines:
+# Shared by the single and batch valuation prompts
+VALUATION_GUIDELINES = """Guidelines:
 - Indian electronics depreciate fast: steep drop in 1–3 years, flattening near 5+ years.
 - Older items = more wear. Assume normal usage.
 - Brand matters: flagships retain value better than mid-range.
@@ -39,7 +32,19 @@ Guidelines:
 - Confidence depends on demand: low demand = low confidence, etc.
 think about confidence, dont just write medium for every thing
 reasoning should be just one liner. and the output you will give me should be just in JSON, NOTHING ELSE. I WANT JUST THE JSON  
-TODAY IS JULY 26, 2025. AND HAVE EMPHASIS ON THE INDIAN MARKET AND THE PURCHASE DATE FOR THE VALUE.  
+TODAY IS JULY 26, 2025. AND HAVE EMPHASIS ON THE INDIAN MARKET AND THE PURCHASE DATE FOR THE VALUE.  """
+
+PRICING_CAUTION = """Overpricing leads to incorrect appraisals. Prioritize underpricing to avoid user dissatisfaction  
+Pricing above this leads to unsold listings and user loss. Therefore, I choose the lowest safe bracket.  
+less premium brand devices depreciate faster than premium ones. (specially in phone, headphone category)"""
+
+def build_prompt(product):
+    return f"""
+You are a resale valuation assistant for the Indian market (OLX, Cashify, Quikr, etc.) as of July 26, 2025.
+
+Estimate a **realistic and conservative** price range for this second-hand product in INR. Use the product's name, original price, purchase date, and platform.
+
+{VALUATION_GUIDELINES}
 ONLY return JSON in this format:  
 {{
   "price_range": "X to Y INR",
@@ -49,9 +54,30 @@ ONLY return JSON in this format:
 Do not write anything else.  
 Input product:  
 {json.dumps(product, indent=2)}  
-Overpricing leads to incorrect appraisals. Prioritize underpricing to avoid user dissatisfaction  
-Pricing above this leads to unsold listings and user loss. Therefore, I choose the lowest safe bracket.  
-less premium brand devices depreciate faster than premium ones. (specially in phone, headphone category)
+{PRICING_CAUTION}
+"""
+
+def build_batch_prompt(lines):
+    products_json = "\n".join(lines)
+    return f"""
+You are a resale valuation assistant for the Indian market (OLX, Cashify, Quikr, etc.) as of July 26, 2025.
+
+Estimate a **realistic and conservative** price range for EACH second-hand product below in INR, valuing every product on its own. Use each product's name, original price, purchase date, and platform.
+
+{VALUATION_GUIDELINES}
+ONLY return a JSON array with exactly one object per input product, in this format:
+[
+  {{
+    "id": "the product's id, copied exactly",
+    "price_range": "X to Y INR",
+    "confidence": "high|medium|low",
+    "reasoning": "one-line explanation"
+  }}
+]
+Do not write anything else.
+Input products (one JSON object per line):
+{products_json}
+{PRICING_CAUTION}
 """
 
 def extract_json(text):
@@ -66,14 +92,97 @@ def extract_json(text):
                 return None
     return None
 
-def call_gemini(prompt):
+def call_gemini(prompt, accept=None):
     try:
-        response = model.generate_content(prompt)
-        return response.text.strip()
+        # Only replies that contain JSON are cached, so a garbled answer is asked again next run
+        text = llm.complete(llm.GEMINI, GEMINI_MODEL, prompt, client=model,
+                            accept=accept or (lambda reply: extract_json(reply) is not None))
+        return text.strip()
     except Exception as e:
         print("Gemini API call failed:", str(e))
         return None
 
+def load_previous_valuations(path):
+    # Product ids are content-derived, so a previous valuation for the same id can be reused
+    if not os.path.exists(path):
+        return {}
+    try:
+        return index_by_id(load_encrypted_json(path), "price_range")
+    except Exception:
+        return {}
+
+def value_product(product):
+    # Returns the valuation entry, or None if Gemini gave nothing usable
+    prompt = build_prompt(product)
+    with llm_metrics.tagged(agent="cost_agent", stage="valuation", product_id=product.get("id")):
+        response_text = call_gemini(prompt)
+
+    if not response_text:
+        print(f"No response for: {product.get('itemname')}")
+        return None
+
+    parsed = extract_json(response_text)
+    if parsed:
+        # Attach original ID + itemname back into Gemini's response
+        parsed["id"] = product.get("id")
+        parsed["itemname"] = product.get("itemname")
+        return parsed
+    print(f"Failed to parse JSON for: {product.get('itemname')}")
+    print("Raw response:", response_text)
+    return None
+
+def serialise_for_valuation(product):
+    return json.dumps(product, ensure_ascii=False, separators=(",", ":"))
+
+def batch_products(products):
+    lines = [serialise_for_valuation(product) for product in products]
+    batches = llm.pack_by_token_budget(lines, VALUATION_BATCH_TOKEN_BUDGET, VALUATION_BATCH_MAX_PRODUCTS)
+    return [[products[idx] for idx in batch] for batch in batches]
+
+def parse_batch_response(text, batch_by_id):
+    """Returns {id: valuation} for the batch's products found in the reply; unknown ids and incomplete entries are ignored."""
+    text = text.strip()
+    if text.startswith("```"):
+        text = text.strip("`").removeprefix("json").strip()
+    try:
+        returned = json.loads(text)
+    except json.JSONDecodeError:
+        match = re.search(r'\[[\s\S]*\]', text)
+        try:
+            returned = json.loads(match.group(0)) if match else None
+        except json.JSONDecodeError:
+            returned = None
+    if isinstance(returned, dict):
+        # Also accept an object keyed by product id
+        returned = [dict(entry, id=key) for key, entry in returned.items() if isinstance(entry, dict)]
+    if not isinstance(returned, list):
+        return {}
+
+    found = {}
+    for entry in returned:
+        if isinstance(entry, dict) and str(entry.get("id")) in batch_by_id and entry.get("price_range"):
+            found[str(entry["id"])] = entry
+    return found
+
+def value_batch(batch):
+    """Values several products in one request; returns {id: valuation} for those the reply covered."""
+    batch_by_id = {str(product.get("id")): product for product in batch}
+    prompt = build_batch_prompt([serialise_for_valuation(product) for product in batch])
+    # Only complete replies are cached; a partial one is re-asked per product below
+    with llm_metrics.tagged(agent="cost_agent", stage="batch_valuation", product_id=[product.get("id") for product in batch]):
+        response_text = call_gemini(prompt, accept=lambda reply: len(parse_batch_response(reply, batch_by_id)) == len(batch_by_id))
+    if not response_text:
+        return {}
+
+    valuations = {}
+    for key, entry in parse_batch_response(response_text, batch_by_id).items():
+        # Same shape as a single valuation: Gemini's fields, then the original ID + itemname
+        valuation = {field: value for field, value in entry.items() if field != "id"}
+        valuation["id"] = batch_by_id[key].get("id")
+        valuation["itemname"] = batch_by_id[key].get("itemname")
+        valuations[key] = valuation
+    return valuations
+
 def main():
     # Load products WITH their IDs from productdetail.json (encrypted)
     products = load_encrypted_json(INPUT_FILE)
@@ -81,29 +190,37 @@ def main():
     if isinstance(products, dict):
         products = [products]
 
+    previous = load_previous_valuations(OUTPUT_FILE)
+    fresh = [product for product in products if str(product.get("id")) not in previous]
+
+    # Batch first; single-product batches and products a batch reply left out are valued one by one
+    batches = [batch for batch in batch_products(fresh) if len(batch) > 1]
+    valued = {}
+    for valuations in llm.map_concurrently(value_batch, batches, desc="Valuing product batches"):
+        valued.update(valuations or {})
+    requeued = [product for product in fresh if str(product.get("id")) not in valued]
+    for product, valuation in zip(requeued, llm.map_concurrently(value_product, requeued, desc="Valuing products")):
+        if valuation:
+            valued[str(product.get("id"))] = valuation
+    print(f"Valuation requests: {len(batches)} batch(es), {len(requeued)} single")
+
+    # Reassemble in input order; failed valuations are left out as before
     output = []
-
-    for product in tqdm(products, desc="Valuing products"):
-        prompt = build_prompt(product)
-        response_text = call_gemini(prompt)
-
-        if not response_text:
-            print(f"No response for: {product.get('itemname')}")
-            continue
-
-        parsed = extract_json(response_text)
-        if parsed:
-            # Attach original ID + itemname back into Gemini's response
-            parsed["id"] = product.get("id")
-            parsed["itemname"] = product.get("itemname")
-            output.append(parsed)
-        else:
-            print(f"Failed to parse JSON for: {product.get('itemname')}")
-            print("Raw response:", response_text)
+    reused = 0
+    for product in products:
+        if str(product.get("id")) in previous:
+            output.append(previous[str(product.get("id"))])
+            reused += 1
+        elif str(product.get("id")) in valued:
+            output.append(valued[str(product.get("id"))])
 
     save_encrypted_json(output, OUTPUT_FILE)
+    cache_stats = llm.save_response_cache()
 
-    print(f"\nCost of. {len(output)} product saved")
+    print(f"LLM cache: {cache_stats['hits']} hit(s), {cache_stats['misses']} miss(es)")
+    print(f"\nCost of. {len(output)} product saved ({reused} reused from the previous run)")
+    # False marks a partial run; the next run values only the products still missing
+    return len(output) == len(products)
 
 if __name__ == "__main__":
     main()
@@ -1,21 +1,68 @@
 import os
-import json
-from hushh_mcp.vault.json_vault import save_encrypted_json
-import base64
-import re
-from datetime import datetime
-from typing import List
+import queue
+from hushh_mcp.vault.json_vault import load_encrypted_json, save_encrypted_json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Iterable, Iterator, List, Optional
 from hushh_mcp.consent.token import validate_token
 from hushh_mcp.constants import CONSENT_TOKEN_PATH
 from hushh_mcp.types import ConsentScope
-from google.auth.transport.requests import Request
+from hushh_mcp.ratelimit import AdaptiveConcurrency, TokenBucket, backoff_delay
+from hushh_mcp.vault.lru_cache import EncryptedLRUCache
+from hushh_mcp.operons.extract_email_text import DEFAULT_MAX_BODY_BYTES, extract_email_text
+from hushh_mcp.operons.parse_email_date import parse_email_date
 from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
 from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
 
 SCOPES = ['https://www.googleapis.com/auth/gmail.readonly']
 JSONS_DIR = os.path.join(os.path.dirname(__file__), "../jsons")
 INPUT_FILE = os.path.join(JSONS_DIR, "relevant_emails.json")
+SYNC_STATE_FILE = os.path.join(JSONS_DIR, "gmail_sync_state.json")
+MESSAGE_CACHE_FILE = os.path.join(JSONS_DIR, "message_cache.json")
+MESSAGE_CACHE_MAX_ENTRIES = 5000
+MESSAGE_CACHE_MAX_BYTES = 64 * 1024 * 1024
+# Headers of messages the sender screen rejected, kept apart so they never evict full bodies
+MESSAGE_HEADER_CACHE_FILE = os.path.join(JSONS_DIR, "message_header_cache.json")
+MESSAGE_HEADER_CACHE_MAX_ENTRIES = 20000
+MESSAGE_HEADER_CACHE_MAX_BYTES = 8 * 1024 * 1024
+# Bump whenever parse_message_metadata or parse_message_headers changes what it stores
+MESSAGE_CACHE_VERSION = "4"
+# Decoded-body budget per message; raise it if order sections start getting cut off
+MAX_BODY_BYTES = DEFAULT_MAX_BODY_BYTES
+
+# Stores and the keywords to look for in subject or body
+STORE_KEYWORDS = {
+    "amazon.in": ["shipped"],
+    "croma.com": ["invoice"],
+    "noreply@flipkart.com": ["delivered", "invoice"]
+}
+
+# messages.list returns at most 500 ids per page
+GMAIL_LIST_PAGE_SIZE = 500
+# Gmail rejects batches over 100 calls and recommends staying at or below 50
+GMAIL_BATCH_SIZE = 50
+MAX_BATCH_RETRIES = 4
+RETRY_BACKOFF_SECONDS = 1.0
+# Gmail allows 250 quota units per user per second; messages.get and messages.list cost 5 each
+GMAIL_QUOTA_UNITS_PER_SECOND = 250
+MESSAGES_GET_QUOTA_UNITS = 5
+MESSAGES_LIST_QUOTA_UNITS = 5
+MAX_FETCH_WORKERS = 8
+# Ids handed to the fetcher at once, enough to keep every worker busy
+FETCH_CHUNK_SIZE = GMAIL_BATCH_SIZE * MAX_FETCH_WORKERS
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+# Full scans are split per store and into date windows that are listed in parallel
+QUERY_SHARD_DAYS = 180
+QUERY_SHARDED_YEARS = 6
+MAX_LIST_WORKERS = 4
+# Listed-id chunks buffered ahead of the fetcher (a few pages' worth); shard workers block
+# beyond it, so a large mailbox is never listed into memory faster than it is fetched
+LIST_QUEUE_MAX_CHUNKS = 4 * GMAIL_LIST_PAGE_SIZE // GMAIL_BATCH_SIZE
+# How often a blocked shard worker checks whether the consumer has gone away
+LIST_QUEUE_POLL_SECONDS = 0.1
 
 def load_consent_token():
     if not os.path.exists(CONSENT_TOKEN_PATH):
@@ -40,13 +87,195 @@ def build_store_subject_query(store_keywords: dict) -> str:
     return " OR ".join(query_parts)
 
 
-def get_matching_message_ids(service, query: str, max_results=100) -> List[str]:
-    results = service.users().messages().list(userId='me', q=query, maxResults=max_results).execute()
-    messages = results.get('messages', [])
-    return [msg['id'] for msg in messages]
+def with_date_window(query: str, after: Optional[date] = None, before: Optional[date] = None) -> str:
+    if not after and not before:
+        return query
+    parts = [f"({query})"]
+    if after:
+        parts.append(f"after:{after:%Y/%m/%d}")
+    if before:
+        parts.append(f"before:{before:%Y/%m/%d}")
+    return " ".join(parts)
+
+def get_matching_message_ids(
+    service,
+    query: str,
+    max_results: Optional[int] = None,
+    after: Optional[date] = None,
+    before: Optional[date] = None,
+    bucket: Optional[TokenBucket] = None
+) -> Iterator[str]:
+    """
+    Yields matching message ids page by page, following nextPageToken.
+    The next page is only requested once the caller has consumed the
+    current one, so fetching can start on the first page. Each page
+    request draws its quota from `bucket` and is retried on transient errors.
+    """
+    # Gmail treats maxResults=0 as "use the default page size", so a zero cap never reaches it
+    if max_results is not None and max_results <= 0:
+        return
+    query = with_date_window(query, after, before)
+    page_token = None
+    yielded = 0
+    while True:
+        page_size = GMAIL_LIST_PAGE_SIZE
+        if max_results is not None:
+            page_size = min(page_size, max_results - yielded)
+        request = {'userId': 'me', 'q': query, 'maxResults': page_size}
+        if page_token:
+            request['pageToken'] = page_token
+        results = execute_with_retries(
+            service.users().messages().list(**request), bucket, MESSAGES_LIST_QUOTA_UNITS
+        )
+
+        for msg in results.get('messages', []):
+            yield msg['id']
+            yielded += 1
+            if max_results is not None and yielded >= max_results:
+                return
+
+        page_token = results.get('nextPageToken')
+        if not page_token:
+            return
+
+def chunked(items: Iterable[str], size: int) -> Iterator[List[str]]:
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def plan_query_shards(
+    store_keywords: dict,
+    today: Optional[date] = None,
+    shard_days: int = QUERY_SHARD_DAYS,
+    sharded_years: int = QUERY_SHARDED_YEARS
+) -> List[str]:
+    """
+    Splits the store search into one query per store and date window.
+    The windows tile the last `sharded_years` years; the oldest and newest
+    windows are open-ended so no mail falls outside the plan. Adjacent
+    windows overlap by a day because Gmail rounds after:/before: to local
+    midnight; duplicates are removed when the shards are merged.
+    """
+    today = today or date.today()
+    start = today - timedelta(days=365 * sharded_years)
+
+    boundaries = []
+    cursor = start
+    while cursor < today:
+        boundaries.append(cursor)
+        cursor += timedelta(days=shard_days)
+
+    windows = [(None, boundaries[0] + timedelta(days=1))]
+    for index, lower in enumerate(boundaries):
+        upper = boundaries[index + 1] + timedelta(days=1) if index + 1 < len(boundaries) else None
+        windows.append((lower, upper))
+
+    queries = []
+    for store, keywords in store_keywords.items():
+        store_query = build_store_subject_query({store: keywords})
+        for after, before in windows:
+            queries.append(with_date_window(store_query, after, before))
+    return queries
+
+def list_message_ids_sharded(
+    service_factory,
+    queries: List[str],
+    max_workers: int = MAX_LIST_WORKERS,
+    bucket: Optional[TokenBucket] = None
+) -> Iterator[str]:
+    """
+    Lists every query concurrently, each worker on its own service, and
+    yields de-duplicated ids as pages arrive from any shard. Pass the
+    fetcher's bucket so listing and fetching share one quota.
+    """
+    arrivals: "queue.Queue" = queue.Queue(maxsize=LIST_QUEUE_MAX_CHUNKS)
+    stop = threading.Event()
+    local = threading.local()
+    done = object()
+
+    def put(item) -> bool:
+        # Blocks while the queue is full, but gives up once the consumer has stopped reading
+        while not stop.is_set():
+            try:
+                arrivals.put(item, timeout=LIST_QUEUE_POLL_SECONDS)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def list_shard(query):
+        try:
+            service = getattr(local, "service", None)
+            if service is None:
+                service = local.service = service_factory()
+            for chunk in chunked(get_matching_message_ids(service, query, bucket=bucket), GMAIL_BATCH_SIZE):
+                if not put(chunk):
+                    return
+        except Exception as e:
+            put(e)
+        finally:
+            put(done)
+
+    pool = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        for query in queries:
+            pool.submit(list_shard, query)
+
+        seen = set()
+        remaining = len(queries)
+        while remaining:
+            item = arrivals.get()
+            if item is done:
+                remaining -= 1
+            elif isinstance(item, Exception):
+                raise item
+            else:
+                for msg_id in item:
+                    if msg_id not in seen:
+                        seen.add(msg_id)
+                        yield msg_id
+    finally:
+        stop.set()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+def is_retryable(error: Exception) -> bool:
+    if isinstance(error, HttpError):
+        status = error.resp.status
+        if status in RETRYABLE_STATUSES:
+            return True
+        # Gmail reports per-user quota as 403 rateLimitExceeded / userRateLimitExceeded
+        return status == 403 and "ratelimitexceeded" in str(error).lower()
+    # Transport errors (timeouts, resets) carry no status and are worth another try
+    return True
+
+def execute_with_retries(
+    request,
+    bucket: Optional[TokenBucket] = None,
+    quota_units: int = 0,
+    max_retries: int = MAX_BATCH_RETRIES
+):
+    """Executes a single API request, retrying transient errors with jittered backoff."""
+    for attempt in range(max_retries + 1):
+        if bucket is not None:
+            bucket.acquire(quota_units)
+        try:
+            return request.execute()
+        except Exception as e:
+            if attempt == max_retries or not is_retryable(e):
+                raise
+            print(f"Retrying Gmail request after error: {e}")
+            time.sleep(backoff_delay(attempt, RETRY_BACKOFF_SECONDS))
 
 def extract_message_metadata(service, msg_id: str):
     msg = service.users().messages().get(userId='me', id=msg_id, format='full').execute()
+    return parse_message_metadata(msg_id, msg)
+
+def parse_message_headers(msg_id: str, msg: dict):
     headers = msg['payload']['headers']
     metadata = {
         'id': msg_id,
@@ -61,32 +290,246 @@ def extract_message_metadata(service, msg_id: str):
         elif header['name'].lower() == 'date':
             metadata['date'] = header['value']
 
-    def decode_part(data):
-        return base64.urlsafe_b64decode(data).decode('utf-8', errors='ignore')
-
-    def extract_body(payload):
-        if payload.get('mimeType') == 'text/plain' and 'data' in payload.get('body', {}):
-            return decode_part(payload['body']['data']), 'plain'
-        elif payload.get('mimeType') == 'text/html' and 'data' in payload.get('body', {}):
-            return decode_part(payload['body']['data']), 'html'
-        elif 'parts' in payload:
-            for part in payload['parts']:
-                body, kind = extract_body(part)
-                if body:
-                    return body, kind
-        return "", None
+    # Receipt parsing dates purchases from this header; fall back to Gmail's receive time
+    if parse_email_date(metadata.get('date')) is None and metadata['timestamp']:
+        metadata['date'] = datetime.fromtimestamp(metadata['timestamp'], tz=timezone.utc).date().isoformat()
 
-    body, kind = extract_body(msg['payload'])
+    return metadata
 
-    if kind == 'html':
-        body = re.sub('<[^<]+?>', '', body)
+def parse_message_metadata(msg_id: str, msg: dict):
+    metadata = parse_message_headers(msg_id, msg)
 
-    cleaned_body = re.sub(r'\s+', ' ', body).strip()
-    metadata['body'] = cleaned_body or "[No body found]"
+    body, _ = extract_email_text(msg['payload'], max_bytes=MAX_BODY_BYTES)
+    metadata['body'] = body or "[No body found]"
 
     return metadata
 
-def main():
+class GmailFetcher:
+    """
+    Bounded thread-pool fetch engine for messages.get batches. A shared
+    token bucket keeps the run under Gmail's per-user quota, throttled or
+    failing sub-requests are retried with jittered backoff, and the
+    number of batches in flight shrinks when Gmail starts throttling.
+    Each worker thread builds its own service since the client's HTTP
+    transport is not thread-safe.
+    """
+
+    def __init__(
+        self,
+        service_factory,
+        max_workers: int = MAX_FETCH_WORKERS,
+        batch_size: int = GMAIL_BATCH_SIZE,
+        max_retries: int = MAX_BATCH_RETRIES,
+        bucket: Optional[TokenBucket] = None
+    ):
+        self.service_factory = service_factory
+        self.max_workers = max_workers
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.bucket = bucket or TokenBucket(GMAIL_QUOTA_UNITS_PER_SECOND, GMAIL_QUOTA_UNITS_PER_SECOND)
+        self.concurrency = AdaptiveConcurrency(max_workers)
+        # Ids that still failed transiently after every retry; retried on the next run
+        self.failed_ids: List[str] = []
+        self._local = threading.local()
+        self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+
+    def _service(self):
+        service = getattr(self._local, "service", None)
+        if service is None:
+            service = self._local.service = self.service_factory()
+        return service
+
+    def _execute_batch(self, msg_ids: List[str], parse, get_params: dict):
+        service = self._service()
+        results: Dict[str, Optional[dict]] = {}
+        errors: Dict[str, Exception] = {}
+
+        def on_response(request_id, response, exception):
+            if exception is not None:
+                errors[request_id] = exception
+                return
+            try:
+                results[request_id] = parse(request_id, response)
+            except Exception as e:
+                # Malformed payloads will not improve on retry
+                print(f"Error parsing message {request_id}: {e}")
+                results[request_id] = None
+
+        batch = service.new_batch_http_request(callback=on_response)
+        for msg_id in msg_ids:
+            batch.add(service.users().messages().get(userId='me', id=msg_id, **get_params), request_id=msg_id)
+
+        self.concurrency.acquire()
+        self.bucket.acquire(MESSAGES_GET_QUOTA_UNITS * len(msg_ids))
+        try:
+            batch.execute()
+        except Exception as e:
+            for msg_id in msg_ids:
+                if msg_id not in results:
+                    errors.setdefault(msg_id, e)
+        finally:
+            self.concurrency.release(throttled=any(is_retryable(e) for e in errors.values()))
+        return results, errors
+
+    def _fetch_batch(self, msg_ids: List[str], parse, get_params: dict):
+        results: Dict[str, Optional[dict]] = {}
+        errors: Dict[str, Exception] = {}
+        pending = msg_ids
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                time.sleep(backoff_delay(attempt - 1, RETRY_BACKOFF_SECONDS))
+            batch_results, errors = self._execute_batch(pending, parse, get_params)
+            results.update(batch_results)
+
+            pending = []
+            for msg_id, error in errors.items():
+                if is_retryable(error):
+                    pending.append(msg_id)
+                else:
+                    print(f"Error fetching message {msg_id}: {error}")
+            if not pending:
+                break
+        return results, pending, errors
+
+    def get_messages(self, msg_ids: Iterable[str], parse, **get_params) -> Dict[str, dict]:
+        """
+        Runs messages.get for every id and returns {msg_id: parse(msg_id, response)}.
+        """
+        ids = list(dict.fromkeys(msg_ids))
+        chunks = [ids[start:start + self.batch_size] for start in range(0, len(ids), self.batch_size)]
+        if len(chunks) > 1 and self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.max_workers)
+
+        if len(chunks) > 1:
+            outcomes = self._pool.map(lambda chunk: self._fetch_batch(chunk, parse, get_params), chunks)
+        else:
+            outcomes = [self._fetch_batch(chunk, parse, get_params) for chunk in chunks]
+
+        results: Dict[str, dict] = {}
+        for batch_results, failed, errors in outcomes:
+            results.update({msg_id: data for msg_id, data in batch_results.items() if data is not None})
+            for msg_id in failed:
+                print(f"Giving up on message {msg_id} for this run: {errors.get(msg_id)}")
+                self.failed_ids.append(msg_id)
+        return results
+
+def fetch_messages_metadata(fetcher: GmailFetcher, msg_ids: Iterable[str]) -> Dict[str, dict]:
+    return fetcher.get_messages(msg_ids, parse_message_metadata, format='full')
+
+def fetch_message_headers(fetcher: GmailFetcher, msg_ids: Iterable[str]) -> Dict[str, dict]:
+    # Header-only fetch, as in operons/extract_gmail_data.py: a few hundred bytes instead of the HTML body
+    return fetcher.get_messages(
+        msg_ids, parse_message_headers,
+        format='metadata', metadataHeaders=['From', 'Subject', 'Date']
+    )
+
+# ------------------ INCREMENTAL SYNC ------------------
+def load_sync_state() -> Optional[dict]:
+    if not os.path.exists(SYNC_STATE_FILE):
+        return None
+    try:
+        return load_encrypted_json(SYNC_STATE_FILE)
+    except Exception:
+        return None
+
+def save_sync_state(history_id: str, pending_ids: Optional[List[str]] = None):
+    save_encrypted_json({
+        "history_id": str(history_id),
+        "pending_ids": list(dict.fromkeys(pending_ids or [])),
+        "synced_at": int(time.time() * 1000)
+    }, SYNC_STATE_FILE)
+
+def load_existing_emails() -> Optional[List[dict]]:
+    if not os.path.exists(INPUT_FILE):
+        return None
+    try:
+        emails = load_encrypted_json(INPUT_FILE)
+    except Exception:
+        return None
+    return emails if isinstance(emails, list) else None
+
+def get_mailbox_history_id(service) -> str:
+    return service.users().getProfile(userId='me').execute()['historyId']
+
+def get_added_message_ids(service, start_history_id: str) -> Optional[List[str]]:
+    """
+    Ids of messages added to the mailbox since start_history_id, or None
+    when Gmail no longer keeps history that far back (HTTP 404).
+    """
+    message_ids = []
+    page_token = None
+    while True:
+        request = {
+            'userId': 'me',
+            'startHistoryId': start_history_id,
+            'historyTypes': ['messageAdded']
+        }
+        if page_token:
+            request['pageToken'] = page_token
+        try:
+            results = service.users().history().list(**request).execute()
+        except HttpError as e:
+            if e.resp.status == 404:
+                return None
+            raise
+
+        for record in results.get('history', []):
+            for added in record.get('messagesAdded', []):
+                message_ids.append(added['message']['id'])
+
+        page_token = results.get('nextPageToken')
+        if not page_token:
+            return list(dict.fromkeys(message_ids))
+
+def matches_store_sender(metadata: dict, store_keywords: dict) -> bool:
+    sender = metadata.get("from", "").lower()
+    return any(store in sender for store in store_keywords)
+
+def is_relevant(metadata: dict, store_keywords: dict) -> bool:
+    sender = metadata.get("from", "").lower()
+    subject = metadata.get("subject", "").lower()
+    body = metadata.get("body", "").lower()
+
+    for store, keywords in store_keywords.items():
+        if store in sender:
+            return any(kw in subject or kw in body for kw in keywords)
+    return False
+
+def merge_emails(existing: List[dict], new: List[dict]) -> List[dict]:
+    merged = {email.get("id"): email for email in existing}
+    for email in new:
+        merged[email.get("id")] = email
+    return list(merged.values())
+
+def open_message_cache() -> EncryptedLRUCache:
+    # Delivered messages never change, so entries never need revalidation
+    return EncryptedLRUCache(
+        MESSAGE_CACHE_FILE,
+        max_entries=MESSAGE_CACHE_MAX_ENTRIES,
+        max_bytes=MESSAGE_CACHE_MAX_BYTES,
+        version=MESSAGE_CACHE_VERSION
+    )
+
+def open_header_cache() -> EncryptedLRUCache:
+    return EncryptedLRUCache(
+        MESSAGE_HEADER_CACHE_FILE,
+        max_entries=MESSAGE_HEADER_CACHE_MAX_ENTRIES,
+        max_bytes=MESSAGE_HEADER_CACHE_MAX_BYTES,
+        version=MESSAGE_CACHE_VERSION
+    )
+
+def main(full_resync: bool = False):
     os.makedirs(JSONS_DIR, exist_ok=True)
 
     # Verify Consent
@@ -106,39 +549,86 @@ def main():
         print("Google authentication failed.")
         return
 
-    # Define stores and the keywords to look for in subject or body
-    store_keywords = {
-        "amazon.in": ["shipped"],
-        "croma.com": ["invoice"],
-        "noreply@flipkart.com": ["delivered", "invoice"]
-    }
-    
+    store_keywords = STORE_KEYWORDS
+
+    # One quota shared by listing and fetching
+    bucket = TokenBucket(GMAIL_QUOTA_UNITS_PER_SECOND, GMAIL_QUOTA_UNITS_PER_SECOND)
+
+    # Capture the cursor before listing so nothing delivered mid-run is missed next time
+    history_id = get_mailbox_history_id(service)
 
-    # Gmail query: fetch by sender only
-    query = build_store_subject_query(store_keywords)
-    message_ids = get_matching_message_ids(service, query)
+    existing = None
+    added_ids = None
+    state = None if full_resync else load_sync_state()
+    if state and state.get("history_id"):
+        existing = load_existing_emails()
+        if existing is not None:
+            added_ids = get_added_message_ids(service, state["history_id"])
+            if added_ids is None:
+                print("Gmail history cursor expired. Running full resync.")
 
+    if added_ids is not None:
+        # Incremental: messages added since the last run plus those that failed to fetch last time
+        id_stream = iter(list(dict.fromkeys(state.get("pending_ids", []) + added_ids)))
+    else:
+        existing = []
+        # Full scan: per-store, date-sharded queries listed in parallel
+        id_stream = list_message_ids_sharded(authenticate_google, plan_query_shards(store_keywords), bucket=bucket)
+    # Full-scan ids come from from:<store> queries, so a sender screen would reject nothing
+    screen_senders = added_ids is not None
+
+    # Fetch each chunk as soon as its ids are listed instead of waiting for every page
+    cache = open_message_cache()
+    header_cache = open_header_cache()
     metadata_list = []
-    for msg_id in message_ids:
-        try:
-            metadata = extract_message_metadata(service, msg_id)
+    # Saved even if the run dies part-way, so messages already fetched are not fetched again
+    try:
+        with GmailFetcher(authenticate_google, bucket=bucket) as fetcher:
+            for chunk in chunked(id_stream, FETCH_CHUNK_SIZE):
+                cached = {}
+                for msg_id in chunk:
+                    entry = cache.get(msg_id)
+                    if entry is not None:
+                        cached[msg_id] = entry
+                uncached = [msg_id for msg_id in chunk if msg_id not in cached]
 
-            sender = metadata.get("from", "").lower()
-            subject = metadata.get("subject", "").lower()
-            body = metadata.get("body", "").lower()
+                if screen_senders:
+                    # Phase 1: headers only, drop anything not sent by a tracked store
+                    rejected = {msg_id for msg_id in uncached if header_cache.get(msg_id) is not None}
+                    headers = fetch_message_headers(fetcher, [msg_id for msg_id in uncached if msg_id not in rejected])
+                    candidates = []
+                    for msg_id, header in headers.items():
+                        if matches_store_sender(header, store_keywords):
+                            candidates.append(msg_id)
+                        else:
+                            header_cache.put(msg_id, header)
+                else:
+                    candidates = uncached
 
-            for store, keywords in store_keywords.items():
-                if store in sender:
-                    if any(kw in subject or kw in body for kw in keywords):
-                        metadata_list.append(metadata)
-                    break
+                # Phase 2: full payloads for the survivors; body keywords only matter when the subject has none
+                fetched = fetch_messages_metadata(fetcher, candidates) if candidates else {}
+                for msg_id, metadata in fetched.items():
+                    cache.put(msg_id, metadata)
+                fetched.update(cached)
 
-        except Exception as e:
-            print(f"Error parsing message {msg_id}: {e}")
+                for msg_id in chunk:
+                    metadata = fetched.get(msg_id)
+                    if metadata and is_relevant(metadata, store_keywords):
+                        metadata_list.append(metadata)
+    finally:
+        cache.save()
+        header_cache.save()
+    stats = cache.stats()
+    print(f"Message cache: {stats['hits']} hits, {stats['misses']} misses, {stats['entries']} entries")
+    stats = header_cache.stats()
+    print(f"Screened-out header cache: {stats['hits']} hits, {stats['entries']} entries")
+    if fetcher.failed_ids:
+        print(f"{len(fetcher.failed_ids)} messages could not be fetched. They will be retried next run.")
 
     # Save output
-    save_encrypted_json(metadata_list, INPUT_FILE)
-    print(f"Filtered relevant emails")
+    save_encrypted_json(merge_emails(existing, metadata_list), INPUT_FILE)
+    save_sync_state(history_id, fetcher.failed_ids)
+    print(f"Filtered relevant emails ({len(metadata_list)} new)")
 
 if __name__ == '__main__':
     main()
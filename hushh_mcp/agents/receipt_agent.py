@@ -1,259 +1,192 @@
 import os
 import json
 from hushh_mcp.vault.json_vault import load_encrypted_json, save_encrypted_json
-import re
-import json
-from datetime import datetime
-from bs4 import BeautifulSoup
-import google.generativeai as genai
-from dotenv import load_dotenv
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from hushh_mcp import llm, llm_metrics
+from hushh_mcp.operons.extract_receipt_data import extract_receipts_cached, order_reference
+from hushh_mcp.operons.classify_electronics import CLASSIFIER_VERSION, ElectronicsClassifier, split_electronics
+from hushh_mcp.operons.product_identity import normalise_item_name, product_id
+from hushh_mcp.operons.dedupe_products import collapse_near_duplicates
+from hushh_mcp.vault.lru_cache import EncryptedLRUCache
 
 # ------------------ CONFIG ------------------
 JSONS_DIR = os.path.join(os.path.dirname(__file__), "../jsons")
 INPUT_PATH = os.path.join(JSONS_DIR, "relevant_emails.json")
 OUTPUT_PATH = os.path.join(JSONS_DIR, "productdetail.json")
+# Process count for receipt parsing; small mailboxes are parsed serially regardless
+PARSE_WORKERS = os.cpu_count() or 1
+CLASSIFIER_CACHE_FILE = os.path.join(JSONS_DIR, "electronics_cache.json")
+EXTRACTION_CACHE_FILE = os.path.join(JSONS_DIR, "extraction_cache.json")
+EXTRACTION_CACHE_MAX_ENTRIES = 50000
+CLASSIFIER_CACHE_MAX_ENTRIES = 20000
+# Electronics-filter prompts are split so each chunk's product list stays under this many tokens
+FILTER_CHUNK_TOKEN_BUDGET = 4000
+FILTER_MAX_CONCURRENCY = 4
+FILTER_CHUNK_RETRIES = 2
+
+# Configure Gemini (raises if GEMINI_API_KEY is not set)
+GEMINI_MODEL = "gemini-1.5-flash"
+model = llm.gemini_model(GEMINI_MODEL)
+
+# ------------------ ELECTRONICS FILTER ------------------
+def open_extraction_cache() -> EncryptedLRUCache:
+    return EncryptedLRUCache(EXTRACTION_CACHE_FILE, max_entries=EXTRACTION_CACHE_MAX_ENTRIES)
+
+def open_classifier_cache() -> EncryptedLRUCache:
+    return EncryptedLRUCache(CLASSIFIER_CACHE_FILE, max_entries=CLASSIFIER_CACHE_MAX_ENTRIES, version=CLASSIFIER_VERSION)
+
+def serialise_product(idx, prod) -> str:
+    return json.dumps({"id": idx, "itemname": prod.get("itemname"), "price": prod.get("price")},
+                      ensure_ascii=False, separators=(",", ":"))
+
+def chunk_by_token_budget(products, budget=None):
+    """Greedily packs (id, compact JSON) pairs into chunks of at most `budget` estimated tokens."""
+    lines = [serialise_product(idx, prod) for idx, prod in enumerate(products)]
+    batches = llm.pack_by_token_budget(lines, budget or FILTER_CHUNK_TOKEN_BUDGET)
+    return [[(idx, lines[idx]) for idx in batch] for batch in batches]
+
+def build_filter_prompt(lines):
+    products_json = "[" + ",".join(lines) + "]"
+    return f"""
+You will be provided with a JSON array of purchase data. Each object has an "id", an "itemname" and a "price".
+
+Your task is to identify ONLY the items from this list that are electronic devices or require electricity to function. This explicitly includes items that:
+* Plug into an electrical outlet.
+* Are powered by internal batteries (rechargeable or disposable).
+* Are components essential for an electronic device to operate
 
-# Load API key
-load_dotenv()
-api_key = os.getenv("GEMINI_API_KEY")
-if not api_key:
-    raise ValueError("GEMINI_API_KEY not set in environment")
-
-# Configure Gemini
-genai.configure(api_key=api_key)
-model = genai.GenerativeModel("gemini-1.5-flash")
+Exclude items that are:
+* Protective covers or cases for electronic devices (e.g., phone cases).
+* Non-electronic accessories or tools, even if they are used with electronic devices. charger cables, adapters, or connectors
+* Books, clothing, or food items.
 
-# ------------------ PLATFORM DETECTION ------------------
-PLATFORM_KEYWORDS = {
-    "amazon": ["amazon.in", "amazon"],
-    "croma": ["croma.com", "croma"]
-}
+Return a JSON array of the "id" values of the identified items (for example [0, 3]), and nothing else.
+ONLY JSON format is acceptable.
+Do not include any additional text or explanations. not even ```json or ``` at the start or end.
 
-# ------------------ HELPERS ------------------
-def clean_text(html):
-    soup = BeautifulSoup(html, "html.parser")
-    text = soup.get_text(separator=" ")
-    return re.sub(r"\s+", " ", text).strip()
+Here is the purchase data:
+{products_json}
+"""
 
-def format_date(date_str):
-    try:
-        return datetime.strptime(date_str[:25], "%a, %d %b %Y %H:%M:%S").strftime("%Y-%m-%d")
-    except:
+def parse_filter_response(text, chunk_products):
+    """Returns the chunk ids Gemini kept; accepts bare ids or echoed item objects."""
+    text = text.strip()
+    if text.startswith("```"):
+        text = text.strip("`").removeprefix("json").strip()
+    returned = json.loads(text)
+    if not isinstance(returned, list):
+        raise ValueError("Gemini did not return a JSON array")
+
+    by_name = {normalise_item_name(prod.get("itemname")): idx for idx, prod in chunk_products.items()}
+    kept = set()
+    for item in returned:
+        if isinstance(item, dict):
+            idx = item.get("id") if item.get("id") in chunk_products else by_name.get(normalise_item_name(item.get("itemname")))
+        else:
+            idx = item
+        if idx in chunk_products:
+            kept.add(idx)
+    return kept
+
+def filter_chunk(chunk, products):
+    """Sends one chunk, retrying just this chunk on errors or unparseable output. Returns None if it never succeeds."""
+    chunk_products = {idx: products[idx] for idx, _ in chunk}
+    prompt = build_filter_prompt([line for _, line in chunk])
+
+    def parses(reply):
+        # Malformed replies stay out of the LLM cache so the retry reaches Gemini
+        try:
+            parse_filter_response(reply, chunk_products)
+            return True
+        except Exception:
+            return False
+
+    # Transport errors are already retried by the LLM layer; these attempts cover malformed replies
+    chunk_ids = [product_id(prod) for prod in chunk_products.values()]
+    for attempt in range(FILTER_CHUNK_RETRIES + 1):
         try:
-            return datetime.strptime(date_str[:10], "%Y-%m-%d").strftime("%Y-%m-%d")
-        except:
+            with llm_metrics.tagged(agent="receipt_agent", stage="electronics_filter", product_id=chunk_ids):
+                text = llm.complete(llm.GEMINI, GEMINI_MODEL, prompt, client=model, accept=parses)
+            return parse_filter_response(text, chunk_products)
+        except llm.CircuitOpenError as e:
+            print(f"Electronics filter chunk of {len(chunk)} skipped: {e}")
             return None
-
-def detect_platform(email):
-    sender = email.get("from", "").lower()
-    for platform, keywords in PLATFORM_KEYWORDS.items():
-        if any(kw in sender for kw in keywords):
-            return platform
-    return None
-
-def extract_price(text):
-    patterns = [
-        r"Total\s+([\d,]+)\s+INR",
-        r"Rs\.?\s?([\d,]+(?:\.\d{2})?)",
-        r"₹\s?([\d,]+(?:\.\d{2})?)",
-        r"Total Amount Paid: ([\d,]+\.\d{2})"
-    ]
-    for pattern in patterns:
-        match = re.search(pattern, text)
-        if match:
-            return int(float(match.group(1).replace(",", "")))
+        except Exception as e:
+            print(f"Electronics filter chunk of {len(chunk)} failed (attempt {attempt + 1}): {e}")
     return None
 
-# ------------------ AMAZON & CROMA EXTRACTORS ------------------
-def extract_amazon_data(email):
-    body = clean_text(email["body"])
-    subject = email.get("subject", "")
-    date = format_date(email["date"])
-    platform = "amazon"
-    results = []
-
-    def modern_regex(body):
-        return re.findall(r"\*\s+(.+?)\s+Quantity:?[ ]*\d+\s+([\d,.]+)\s*INR", body)
-
-    def legacy_regex(body):
-        items = re.findall(r"\*\s+(.+?)\s+Quantity", body)
-        prices = re.findall(r"Quantity: ?\d+\s+([\d,.]+)\s*INR", body)
-        return list(zip(items, prices)) if items and prices and len(items) == len(prices) else []
-
-    def shipment_details_regex(body):
-        if "Your Shipment Details" in body:
-            section = body.split("Your Shipment Details", 1)[1]
-            lines = [l.strip() for l in section.splitlines() if l.strip() and not l.lower().startswith("http")]
-            found = []
-            for line in lines:
-                m = re.match(r"(.+?)\s+Rs\.?\s?([\d,.]+)", line)
-                if m:
-                    found.append(m.groups())
-            return found
-        return []
-
-    def order_summary_regex(body):
-        m = re.search(r"Order summary Item Subtotal: Rs\.([\d,.]+)", body)
-        if m:
-            return [(None, m.group(1))]
-        return []
-
-    def subject_fallback(subject, body):
-        match = re.search(r"Shipped: [\"“”']?(.+?)[\"“”']", subject)
-        item = match.group(1).strip() if match else None
-        price = extract_price(body)
-        if item and price:
-            return [(item, str(price))]
-        return []
-
-    strategies = [modern_regex, legacy_regex, shipment_details_regex, order_summary_regex]
-    for strat in strategies:
-        found = strat(body)
-        for item, price in found:
-            if item is not None and price:
-                try:
-                    price_val = int(float(price.replace(",", "")))
-                except Exception:
-                    price_val = None
-                results.append({
-                    "itemname": item.strip() if item else None,
-                    "price": price_val,
-                    "purchase_date": date,
-                    "platform": platform
-                })
-        if results:
-            break
-
-    if not results:
-        found = subject_fallback(subject, body)
-        for item, price in found:
-            try:
-                price_val = int(float(price.replace(",", "")))
-            except Exception:
-                price_val = None
-            results.append({
-                "itemname": item.strip() if item else None,
-                "price": price_val,
-                "purchase_date": date,
-                "platform": platform
-            })
-
-    if not results:
-        price = extract_price(body)
-        item = subject or body[:50]
-        if price:
-            results.append({
-                "itemname": item.strip() if item else None,
-                "price": price,
-                "purchase_date": date,
-                "platform": platform
-            })
-
-    if not results:
-        results.append({
-            "itemname": subject or "Unknown Product",
-            "price": 0,
-            "purchase_date": date,
-            "platform": platform
-        })
-    return results
-
-def extract_croma_data(email):
-    body = clean_text(email["body"])
-    date = format_date(email["date"])
-    platform = "croma"
-    results = []
-
-    invoice_items = re.findall(r"Item Description\s*Tax Code\s*Qty\.\s*Rate\s*Amount\s*(\d+)\s+(.+?)\s+\S+\s+(\d+\.\d+)\s+(\d+\.\d+)", body, re.DOTALL)
-    if invoice_items:
-        for qty, item, rate, amount in invoice_items:
-            results.append({
-                "itemname": item.strip(),
-                "price": int(float(amount)),
-                "purchase_date": date,
-                "platform": platform
-            })
-    else:
-        m = re.search(r"Total Amount Paid: ([\d,.]+)", body)
-        if m:
-            price = int(float(m.group(1).replace(",", "")))
-            results.append({
-                "itemname": None,
-                "price": price,
-                "purchase_date": date,
-                "platform": platform
-            })
-    return results
+def resolve_with_gemini(products, classifier):
+    """Asks Gemini about the items the offline classifier could not decide; returns the electronic ones."""
+    chunks = chunk_by_token_budget(products)
+    with ThreadPoolExecutor(max_workers=min(FILTER_MAX_CONCURRENCY, len(chunks))) as pool:
+        results = list(pool.map(lambda chunk: filter_chunk(chunk, products), chunks))
+
+    electronic_ids = set()
+    for chunk, kept in zip(chunks, results):
+        for idx, _ in chunk:
+            name = products[idx].get("itemname")
+            if kept is None:
+                # Offline or persistently malformed replies: use the model's best guess and cache nothing
+                if classifier.best_guess(name):
+                    electronic_ids.add(idx)
+                continue
+            classifier.record(name, idx in kept)
+            if idx in kept:
+                electronic_ids.add(idx)
+    print(f"Gemini electronics filter: {len(chunks)} chunk(s), {sum(r is None for r in results)} failed")
+    return [prod for idx, prod in enumerate(products) if idx in electronic_ids]
 
 # ------------------ MAIN LOGIC ------------------
-def parse_email(email):
-    platform = detect_platform(email)
-    if platform == "amazon":
-        return extract_amazon_data(email)
-    elif platform == "croma":
-        return extract_croma_data(email)
-    else:
-        return []
-
 def main():
     emails = load_encrypted_json(INPUT_PATH)
 
     all_products = []
-    for email in emails:
-        parsed = parse_email(email)
-        all_products.extend(parsed)
-
-    # Deduplicate
+    strategies = Counter()
+    extraction_cache = open_extraction_cache()
+    extracted_results, parsed_count = extract_receipts_cached(emails, extraction_cache, workers=PARSE_WORKERS)
+    extraction_cache.save()
+    print(f"Parsed {parsed_count} new or changed email(s); {len(emails) - parsed_count} served from cache")
+    for email, extracted in zip(emails, extracted_results):
+        if extracted["platform"]:
+            strategies[f"{extracted['platform']}:{extracted['strategy']}"] += 1
+        # Tagged with the mail's order so near-duplicate merging keeps separate orders apart
+        reference = order_reference(email) if extracted["items"] else {}
+        all_products.extend({**item, **reference} for item in extracted["items"])
+    print(f"Extraction strategies: {dict(strategies)}")
+
+    # Deduplicate on the content-derived id, which also becomes the product's id
     seen = set()
     unique_products = []
     for prod in all_products:
-        key = (
-            prod.get("itemname"),
-            prod.get("price"),
-            prod.get("purchase_date"),
-            prod.get("platform")
-        )
+        key = product_id(prod)
         if key not in seen:
             seen.add(key)
             unique_products.append(prod)
 
-    # ------------------ PROMPT FOR GEMINI ------------------
-    prompt = f"""
-You will be provided with a JSON array of purchase data. Each object in the array represents an item with details such as "itemname", "price", "purchase_date", and "platform".
-
-Your task is to identify and return ONLY the items from this list that are electronic devices or require electricity to function. This explicitly includes items that:
-* Plug into an electrical outlet.
-* Are powered by internal batteries (rechargeable or disposable).
-* Are components essential for an electronic device to operate
-
-Exclude items that are:
-* Protective covers or cases for electronic devices (e.g., phone cases).
-* Non-electronic accessories or tools, even if they are used with electronic devices. charger cables, adapters, or connectors
-* Books, clothing, or food items.
+    # Collapse the same purchase seen in several mails ("Shipped", "Delivered", ...)
+    unique_products, dedupe_stats = collapse_near_duplicates(unique_products)
+    print(f"Near-duplicates merged: {dedupe_stats['merged']} (~{dedupe_stats['llm_calls_saved']} downstream LLM calls saved)")
 
-Return the identified items as a JSON array, and nothing else.
-ONLY JSON format is acceptable.
-Do not include any additional text or explanations. not even ```json or ``` at the start or end.
-
-Here is the purchase data:
-{json.dumps(unique_products, indent=2, ensure_ascii=False)}
-"""
+    # Keep electronics: offline classifier first, Gemini only for the uncertain items
+    cache = open_classifier_cache()
+    classifier = ElectronicsClassifier(cache)
+    electronic, uncertain = split_electronics(unique_products, classifier)
+    print(f"Classified offline: {dict(classifier.sources)}; escalating {len(uncertain)} item(s) to Gemini")
 
-    # Send to Gemini
-    response = model.generate_content(prompt)
-    gemini_result = response.text.strip()
+    if uncertain:
+        electronic.extend(resolve_with_gemini(uncertain, classifier))
+    cache.save()
+    llm.save_response_cache()
 
-    # Parse Gemini response to Python list
-    try:
-        filtered_items = json.loads(gemini_result)
-    except json.JSONDecodeError:
-        raise ValueError("Gemini did not return valid JSON")
+    kept = {id(prod) for prod in electronic}
+    filtered_items = [prod for prod in unique_products if id(prod) in kept]
 
-    # Add IDs AFTER filtering
+    # Stable ids: the same purchase keeps its id across runs, so downstream results can be reused
     final_with_ids = []
-    for idx, prod in enumerate(filtered_items, start=1):
+    for prod in filtered_items:
         ordered_prod = {
-            "id": idx,
+            "id": product_id(prod),
             "itemname": prod.get("itemname"),
             "price": prod.get("price"),
             "purchase_date": prod.get("purchase_date"),
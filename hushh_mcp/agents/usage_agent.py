@@ -2,19 +2,12 @@ import os
 import json
 from hushh_mcp.vault.json_vault import load_encrypted_json, save_encrypted_json
 import re
-from tqdm import tqdm
-from dotenv import load_dotenv
-import google.generativeai as genai
+from hushh_mcp import llm, llm_metrics
+from hushh_mcp.operons.product_identity import index_by_id
 
-# Load API key
-load_dotenv()
-api_key = os.getenv("GEMINI_API_KEY")
-if not api_key:
-    raise ValueError("GEMINI_API_KEY not set in environment")
-
-# Configure Gemini
-genai.configure(api_key=api_key)
-model = genai.GenerativeModel("gemini-1.5-flash")
+# Configure Gemini (raises if GEMINI_API_KEY is not set)
+GEMINI_MODEL = "gemini-1.5-flash"
+model = llm.gemini_model(GEMINI_MODEL)
 
 # Paths
 BASE_DIR = os.path.dirname(__file__)
@@ -67,12 +60,55 @@ def extract_json(text):
 
 def call_gemini(prompt):
     try:
-        response = model.generate_content(prompt)
-        return response.text.strip()
+        # Only replies carrying a status are cached, so a garbled answer is asked again next run
+        text = llm.complete(llm.GEMINI, GEMINI_MODEL, prompt, client=model,
+                            accept=lambda reply: "status" in (extract_json(reply) or {}))
+        return text.strip()
     except Exception as e:
         print("Gemini API call failed:", str(e))
         return None
 
+# Fields usage_agent adds on top of the master.json product record
+DERIVED_FIELDS = ("status", "reasoning")
+
+def usage_signals(product):
+    return {k: v for k, v in product.items() if k not in DERIVED_FIELDS}
+
+def load_previous_usage(path, driver_history):
+    if not os.path.exists(path):
+        return {}
+    try:
+        previous = load_encrypted_json(path)
+    except Exception:
+        return {}
+    # Driver activity feeds every decision, so any change to it re-evaluates all products
+    if not isinstance(previous, dict) or previous.get("driver_history_from_pc") != driver_history:
+        return {}
+    return index_by_id(previous.get("products"), "status")
+
+def mark_uncertain(product):
+    # Used when Gemini gave no usable answer; returns False so the run counts as partial
+    product["status"] = "uncertain"
+    return False
+
+def check_usage(product, driver_history):
+    # Sets the product's status in place; returns whether Gemini answered
+    prompt = build_prompt(product, driver_history)
+    with llm_metrics.tagged(agent="usage_agent", stage="usage_check", product_id=product.get("id")):
+        response_text = call_gemini(prompt)
+
+    if not response_text:
+        print(f"No response for: {product.get('itemname')}")
+        return mark_uncertain(product)
+
+    parsed = extract_json(response_text)
+    if parsed and "status" in parsed:
+        product["status"] = parsed["status"]
+        return True
+    print(f"Failed to parse JSON for: {product.get('itemname')}")
+    print("Raw response:", response_text)
+    return mark_uncertain(product)
+
 def main():
     # Load master.json (encrypted)
     master_data = load_encrypted_json(INPUT_FILE)
@@ -80,28 +116,25 @@ def main():
     products = master_data.get("products", [])
     driver_history = master_data.get("driver_history_from_pc", {})
 
+    previous = load_previous_usage(OUTPUT_FILE, driver_history)
     results = []
-
-    for product in tqdm(products, desc="Checking product usage"):
-        prompt = build_prompt(product, driver_history)
-        response_text = call_gemini(prompt)
-
-        if not response_text:
-            print(f"No response for: {product.get('itemname')}")
-            product["status"] = "uncertain"
-            results.append(product)
-            continue
-
-        parsed = extract_json(response_text)
-        if parsed and "status" in parsed:
-            product["status"] = parsed["status"]
+    reused = 0
+    fresh = []
+
+    for product in products:
+        # Reuse a settled decision (or a user's manual status) while the product's signals are unchanged
+        prior = previous.get(str(product.get("id")))
+        if prior and prior["status"] != "uncertain" and usage_signals(prior) == usage_signals(product):
+            product["status"] = prior["status"]
+            reused += 1
         else:
-            print(f"Failed to parse JSON for: {product.get('itemname')}")
-            print("Raw response:", response_text)
-            product["status"] = "uncertain"
-
+            fresh.append(product)
         results.append(product)
 
+    # Each check sets its own product's status in place; results already holds them in input order
+    answered = llm.map_concurrently(lambda product: check_usage(product, driver_history), fresh,
+                                    desc="Checking product usage", on_error=mark_uncertain)
+
     # Map reasoning from resale_cost.json for matching ids
     resale_cost_path = os.path.join(JSONS_DIR, "resale_cost.json")
     try:
@@ -127,8 +160,13 @@ def main():
     }
 
     save_encrypted_json(final_output, OUTPUT_FILE)
+    cache_stats = llm.save_response_cache()
+
+    print(f"LLM cache: {cache_stats['hits']} hit(s), {cache_stats['misses']} miss(es)")
 
-    print(f"\nUsage data saved")
+    print(f"\nUsage data saved ({reused} reused from the previous run)")
+    # False marks a partial run: products left "uncertain" by a failed call are asked again next run
+    return all(answered)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,432 @@
+# hushh_mcp/llm.py
+
+import contextvars
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from dotenv import load_dotenv
+from tqdm import tqdm
+from hushh_mcp import llm_metrics
+from hushh_mcp.ratelimit import CircuitBreaker, CircuitOpenError, TokenBucket, backoff_delay
+from hushh_mcp.vault.lru_cache import EncryptedLRUCache
+
+load_dotenv()
+
+# ========== Config ==========
+
+GEMINI = "gemini"
+GROQ = "groq"
+API_KEY_ENV = {GEMINI: "GEMINI_API_KEY", GROQ: "GROQ_API_KEY"}
+
+LLM_CACHE_FILE = os.path.join(os.path.dirname(__file__), "jsons", "llm_cache.json")
+LLM_CACHE_MAX_ENTRIES = 20000
+LLM_CACHE_MAX_BYTES = 64 * 1024 * 1024
+# Valuations mention "today"; a month-old answer to the same prompt is stale
+LLM_CACHE_TTL_SECONDS = 30 * 24 * 3600
+# Bump to drop every cached response, e.g. after a provider-side model change
+LLM_CACHE_VERSION = "1"
+# New responses between cache saves, so an interrupted run resumes from the last checkpoint
+LLM_CHECKPOINT_EVERY = 10
+# In-flight LLM calls per agent loop; HUSHH_LLM_CONCURRENCY overrides it
+LLM_MAX_CONCURRENCY = 8
+LLM_CONCURRENCY_ENV = "HUSHH_LLM_CONCURRENCY"
+
+# Default quotas are the free tiers (gemini-1.5-flash, Groq llama3-70b); paid keys raise them
+# per provider with HUSHH_GEMINI_REQUESTS_PER_MINUTE, HUSHH_GROQ_TOKENS_PER_MINUTE, etc.
+PROVIDER_REQUESTS_PER_MINUTE = {GEMINI: 15, GROQ: 30}
+PROVIDER_TOKENS_PER_MINUTE = {GEMINI: 1000000, GROQ: 6000}
+PROVIDER_REQUESTS_ENV = "HUSHH_{provider}_REQUESTS_PER_MINUTE"
+PROVIDER_TOKENS_ENV = "HUSHH_{provider}_TOKENS_PER_MINUTE"
+LLM_MAX_RETRIES = 4
+LLM_RETRY_BACKOFF_SECONDS = 1.0
+LLM_RETRY_BACKOFF_CAP_SECONDS = 32.0
+# Longer Retry-After hints are capped; a provider that stays down trips the circuit breaker
+LLM_MAX_RETRY_AFTER_SECONDS = 60.0
+CIRCUIT_FAILURE_THRESHOLD = 5
+CIRCUIT_RESET_SECONDS = 60.0
+RETRYABLE_STATUSES = {408, 429, 500, 502, 503, 504}
+
+_clients: Dict[tuple, Any] = {}
+_cache: Optional[EncryptedLRUCache] = None
+_unsaved = 0
+_controls: Dict[str, Tuple[TokenBucket, TokenBucket, CircuitBreaker]] = {}
+_lock = threading.Lock()
+# One [lock, callers] entry per prompt key in flight, so concurrent identical prompts make a
+# single request; the entry is dropped once its last caller is done
+_inflight: Dict[str, list] = {}
+
+# ========== Clients ==========
+
+def api_key(provider: str) -> str:
+    key = os.getenv(API_KEY_ENV[provider])
+    if not key:
+        raise ValueError(f"{API_KEY_ENV[provider]} not set in environment")
+    return key
+
+def gemini_model(model: str):
+    import google.generativeai as genai
+    genai.configure(api_key=api_key(GEMINI))
+    return genai.GenerativeModel(model)
+
+def groq_client():
+    from groq import Groq
+    return Groq(api_key=api_key(GROQ))
+
+def default_client(provider: str, model: str):
+    with _lock:
+        if (provider, model) not in _clients:
+            _clients[(provider, model)] = gemini_model(model) if provider == GEMINI else groq_client()
+        return _clients[(provider, model)]
+
+# ========== Providers ==========
+
+# Each provider returns (text, prompt tokens, completion tokens); counts are None when not reported
+
+def _token_count(value) -> Optional[int]:
+    return value if isinstance(value, int) and not isinstance(value, bool) else None
+
+def _gemini_reply(client, model: str, prompt: str, options: dict) -> Tuple[str, Optional[int], Optional[int]]:
+    response = client.generate_content(prompt, **options)
+    usage = getattr(response, "usage_metadata", None)
+    return (response.text, _token_count(getattr(usage, "prompt_token_count", None)),
+            _token_count(getattr(usage, "candidates_token_count", None)))
+
+def _groq_reply(client, model: str, prompt: str, options: dict) -> Tuple[str, Optional[int], Optional[int]]:
+    response = client.chat.completions.create(
+        messages=[{"role": "user", "content": prompt}],
+        model=model,
+        **options,
+    )
+    usage = getattr(response, "usage", None)
+    return (response.choices[0].message.content, _token_count(getattr(usage, "prompt_tokens", None)),
+            _token_count(getattr(usage, "completion_tokens", None)))
+
+PROVIDERS: Dict[str, Callable[[Any, str, str, dict], Tuple[str, Optional[int], Optional[int]]]] = {
+    GEMINI: _gemini_reply,
+    GROQ: _groq_reply,
+}
+
+# ========== Resilience ==========
+
+def provider_limit(provider: str, env_template: str, defaults: Dict[str, float]) -> float:
+    """Per-minute quota for the provider: the environment override if set, else the default."""
+    name = env_template.format(provider=provider.upper())
+    value = os.getenv(name)
+    try:
+        return max(1.0, float(value)) if value else defaults[provider]
+    except ValueError:
+        raise ValueError(f"{name} must be a number, got {value!r}")
+
+def provider_controls(provider: str) -> Tuple[TokenBucket, TokenBucket, CircuitBreaker]:
+    """Returns the provider's (request bucket, token bucket, circuit breaker), shared by every caller."""
+    with _lock:
+        if provider not in _controls:
+            requests_per_minute = provider_limit(provider, PROVIDER_REQUESTS_ENV, PROVIDER_REQUESTS_PER_MINUTE)
+            tokens_per_minute = provider_limit(provider, PROVIDER_TOKENS_ENV, PROVIDER_TOKENS_PER_MINUTE)
+            # Buckets hold ten seconds' worth, so a burst cannot spend a whole minute's quota at once
+            _controls[provider] = (
+                TokenBucket(requests_per_minute / 60, max(1, requests_per_minute / 6)),
+                TokenBucket(tokens_per_minute / 60, max(1, tokens_per_minute / 6)),
+                CircuitBreaker(CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RESET_SECONDS),
+            )
+        return _controls[provider]
+
+def reset_provider_controls() -> None:
+    with _lock:
+        _controls.clear()
+
+def error_status(error: Exception) -> Optional[int]:
+    # Groq errors carry status_code, google.api_core errors code, httpx-style errors response.status_code
+    response = getattr(error, "response", None)
+    for status in (getattr(error, "status_code", None), getattr(error, "code", None),
+                   getattr(response, "status_code", None)):
+        if isinstance(status, int):
+            return int(status)
+    return None
+
+def is_retryable(error: Exception) -> bool:
+    status = error_status(error)
+    if status is not None:
+        return status in RETRYABLE_STATUSES
+    # Transport errors (timeouts, resets) carry no status and are worth another try
+    name = type(error).__name__
+    return isinstance(error, (ConnectionError, TimeoutError)) or "Connection" in name or "Timeout" in name
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+    value = headers.get("retry-after") or headers.get("Retry-After")
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        # The HTTP-date form
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+def call_with_retries(
+    provider: str,
+    send: Callable[[], Any],
+    prompt_tokens: int = 1,
+    on_retry: Optional[Callable[[], None]] = None
+) -> Any:
+    """
+    Runs send() under the provider's rate limits. Throttling, server and
+    transport errors are retried, waiting for Retry-After when the provider
+    sends it and exponential backoff with jitter otherwise. Once the
+    provider's circuit breaker is open, raises CircuitOpenError without
+    calling it.
+    """
+    request_bucket, token_bucket, breaker = provider_controls(provider)
+    for attempt in range(LLM_MAX_RETRIES + 1):
+        if not breaker.allow():
+            raise CircuitOpenError(f"{provider} is failing; not calling it for up to {breaker.reset_timeout:.0f}s")
+        request_bucket.acquire()
+        token_bucket.acquire(prompt_tokens)
+        try:
+            result = send()
+        except Exception as error:
+            if not is_retryable(error):
+                # The provider answered; only this request is bad
+                breaker.record_success()
+                raise
+            breaker.record_failure()
+            if attempt == LLM_MAX_RETRIES:
+                raise
+            delay = retry_after_seconds(error)
+            if delay is None:
+                delay = backoff_delay(attempt, LLM_RETRY_BACKOFF_SECONDS, LLM_RETRY_BACKOFF_CAP_SECONDS)
+            delay = min(delay, LLM_MAX_RETRY_AFTER_SECONDS)
+            print(f"{provider} call failed ({error}); retry {attempt + 1}/{LLM_MAX_RETRIES} in {delay:.1f}s")
+            if on_retry:
+                on_retry()
+            time.sleep(delay)
+            continue
+        breaker.record_success()
+        return result
+
+# ========== Response Cache ==========
+
+def normalise_prompt(prompt: str) -> str:
+    # Indentation and line-wrapping differences do not change what is being asked
+    return " ".join(prompt.split())
+
+def cache_key(provider: str, model: str, prompt: str, options: Optional[dict] = None) -> str:
+    # Sampling options are part of the request, so they are part of the key too
+    payload = json.dumps([provider, model, normalise_prompt(prompt), options or {}], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def response_cache() -> EncryptedLRUCache:
+    global _cache
+    with _lock:
+        if _cache is None:
+            _cache = EncryptedLRUCache(
+                LLM_CACHE_FILE, max_entries=LLM_CACHE_MAX_ENTRIES, max_bytes=LLM_CACHE_MAX_BYTES,
+                version=LLM_CACHE_VERSION, ttl=LLM_CACHE_TTL_SECONDS
+            )
+        return _cache
+
+def save_response_cache() -> dict:
+    """Persists cached responses and returns the cache stats."""
+    cache = response_cache()
+    cache.save()
+    return cache.stats()
+
+def reset_response_cache() -> None:
+    # Forgets the in-memory cache (unsaved entries included); the next call reopens LLM_CACHE_FILE
+    global _cache, _unsaved
+    with _lock:
+        _cache = None
+        _unsaved = 0
+        _inflight.clear()
+
+def _checkpoint(cache: EncryptedLRUCache) -> None:
+    global _unsaved
+    with _lock:
+        _unsaved += 1
+        due = _unsaved >= LLM_CHECKPOINT_EVERY
+        if due:
+            _unsaved = 0
+    if due:
+        cache.save()
+
+@contextmanager
+def _inflight_call(key: str):
+    with _lock:
+        entry = _inflight.setdefault(key, [threading.Lock(), 0])
+        entry[1] += 1
+    try:
+        with entry[0]:
+            yield
+    finally:
+        with _lock:
+            entry[1] -= 1
+            # A reset may already have replaced or dropped the entry
+            if entry[1] == 0 and _inflight.get(key) is entry:
+                del _inflight[key]
+
+# ========== Call Interface ==========
+
+def complete(
+    provider: str,
+    model: str,
+    prompt: str,
+    client=None,
+    use_cache: bool = True,
+    accept: Optional[Callable[[str], bool]] = None,
+    **options
+) -> str:
+    """
+    Sends a single-turn prompt to Gemini or Groq and returns the reply text.
+
+    Replies are cached by (provider, model, whitespace-normalised prompt,
+    options), so an identical prompt, from a rerun or from another user
+    with the same product, is answered without a network call. The cache
+    is saved every LLM_CHECKPOINT_EVERY new replies. Network calls go
+    through call_with_retries; errors that survive the retries propagate
+    to the caller and are never cached. Every call, cached or not, is
+    recorded in llm_metrics.registry under the current llm_metrics tags.
+
+    Args:
+        provider (str): GEMINI or GROQ
+        model (str): Model name, e.g. "gemini-1.5-flash"
+        prompt (str): User prompt
+        client: Provider client to use; defaults to a shared one configured from the environment
+        use_cache (bool): Set False to always ask the provider
+        accept (callable): Only replies for which accept(text) is true are cached
+        **options: Provider request options such as temperature
+
+    Returns:
+        str: The reply text
+    """
+    if provider not in PROVIDERS:
+        raise ValueError(f"Unknown LLM provider: {provider}")
+
+    key = cache_key(provider, model, prompt, options)
+    record = llm_metrics.start_record(provider, model, key[:16])
+    started = time.perf_counter()
+
+    def send():
+        return PROVIDERS[provider](client or default_client(provider, model), model, prompt, options)
+
+    def count_retry():
+        record.retries += 1
+
+    def request() -> str:
+        text, prompt_tokens, completion_tokens = call_with_retries(provider, send, estimate_tokens(prompt), count_retry)
+        record.tokens_estimated = prompt_tokens is None or completion_tokens is None
+        record.prompt_tokens = estimate_tokens(prompt) if prompt_tokens is None else prompt_tokens
+        record.completion_tokens = estimate_tokens(text or "") if completion_tokens is None else completion_tokens
+        if accept:
+            record.parsed = bool(text) and bool(accept(text))
+        return text
+
+    try:
+        if not use_cache:
+            return request()
+
+        cache = response_cache()
+        with _inflight_call(key):
+            cached = cache.get(key)
+            if cached is not None:
+                record.cache_hit = True
+                # Only accepted replies are cached
+                record.parsed = True if accept else None
+                return cached["text"]
+            text = request()
+            if text and record.parsed is not False:
+                cache.put(key, {"text": text})
+                _checkpoint(cache)
+            return text
+    except Exception as error:
+        record.error = type(error).__name__
+        raise
+    finally:
+        record.latency_seconds = time.perf_counter() - started
+        llm_metrics.registry.record(record)
+
+# ========== Prompt Budgeting ==========
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token is close enough for budgeting English product data
+    return len(text) // 4 + 1
+
+def pack_by_token_budget(lines: List[str], budget: int, max_items: Optional[int] = None) -> List[List[int]]:
+    """
+    Greedily groups consecutive lines into batches of at most `budget`
+    estimated tokens and `max_items` lines. A line over budget on its own
+    gets a batch to itself. Returns the line indexes of each batch.
+    """
+    batches, current, used = [], [], 0
+    for idx, line in enumerate(lines):
+        cost = estimate_tokens(line)
+        if current and (used + cost > budget or (max_items and len(current) >= max_items)):
+            batches.append(current)
+            current, used = [], 0
+        current.append(idx)
+        used += cost
+    if current:
+        batches.append(current)
+    return batches
+
+# ========== Concurrency ==========
+
+def default_concurrency() -> int:
+    value = os.getenv(LLM_CONCURRENCY_ENV)
+    try:
+        return max(1, int(value)) if value else LLM_MAX_CONCURRENCY
+    except ValueError:
+        raise ValueError(f"{LLM_CONCURRENCY_ENV} must be an integer, got {value!r}")
+
+def map_concurrently(
+    fn: Callable[[Any], Any],
+    items: Iterable[Any],
+    max_workers: Optional[int] = None,
+    desc: Optional[str] = None,
+    on_error: Optional[Callable[[Any], Any]] = None
+) -> List[Any]:
+    """
+    Runs fn over items on a thread pool, for loops that make one blocking
+    LLM call per item.
+
+    Args:
+        fn (callable): Work for one item
+        items (iterable): Inputs
+        max_workers (int): Concurrency limit; defaults to default_concurrency()
+        desc (str): Progress bar label
+        on_error (callable): Builds the result for an item whose fn raised; None if omitted
+
+    Returns:
+        list: One result per item, in input order. A failing item is
+              reported and does not affect the others.
+    """
+    items = list(items)
+    results: List[Any] = [None] * len(items)
+    if not items:
+        return results
+
+    workers = max(1, min(max_workers or default_concurrency(), len(items)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        # Each task runs in a copy of the caller's context, so llm_metrics tags carry into the workers
+        futures = {pool.submit(contextvars.copy_context().run, fn, item): idx for idx, item in enumerate(items)}
+        for future in tqdm(as_completed(futures), total=len(futures), desc=desc):
+            idx = futures[future]
+            try:
+                results[idx] = future.result()
+            except Exception as e:
+                print(f"{desc or 'LLM task'}: item {idx} failed: {e}")
+                results[idx] = on_error(items[idx]) if on_error else None
+    return results
@@ -0,0 +1,153 @@
+# hushh_mcp/llm_metrics.py
+
+import contextvars
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional
+from hushh_mcp.vault.json_vault import save_encrypted_json
+
+# ========== Config ==========
+
+LLM_METRICS_FILE = os.path.join(os.path.dirname(__file__), "jsons", "llm_metrics.json")
+# Slowest and most expensive calls listed in a summary
+SUMMARY_TOP_N = 10
+
+_tags: contextvars.ContextVar = contextvars.ContextVar("llm_metric_tags", default={})
+
+# ========== Tags ==========
+
+@contextmanager
+def tagged(**tags):
+    """
+    Tags the LLM calls made inside the block, e.g. tagged(agent="cost_agent",
+    stage="valuation", product_id=...). Nested blocks add to the outer tags.
+    """
+    token = _tags.set({**_tags.get(), **tags})
+    try:
+        yield
+    finally:
+        _tags.reset(token)
+
+def current_tags() -> Dict[str, Any]:
+    return dict(_tags.get())
+
+# ========== Records ==========
+
+@dataclass
+class LLMCallRecord:
+    provider: str
+    model: str
+    prompt_hash: str
+    agent: Optional[str] = None
+    stage: Optional[str] = None
+    # A single id, or the list of ids sent together in one batched prompt
+    product_id: Any = None
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    # Provider-reported token counts, or estimates when the provider did not report them
+    tokens_estimated: bool = False
+    latency_seconds: float = 0.0
+    retries: int = 0
+    cache_hit: bool = False
+    # Whether the caller could use the reply; None when the call had no check
+    parsed: Optional[bool] = None
+    error: Optional[str] = None
+    started_at: float = field(default_factory=time.time)
+
+def start_record(provider: str, model: str, prompt_hash: str) -> LLMCallRecord:
+    tags = current_tags()
+    return LLMCallRecord(
+        provider, model, prompt_hash,
+        agent=tags.get("agent"), stage=tags.get("stage"), product_id=tags.get("product_id")
+    )
+
+# ========== Summaries ==========
+
+def _percentile(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    # Nearest-rank percentile
+    return sorted_values[min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))]
+
+def aggregate(records: List[LLMCallRecord]) -> dict:
+    # Tokens and latency only count calls that reached the provider
+    network = [r for r in records if not r.cache_hit]
+    checked = [r for r in records if r.parsed is not None]
+    parse_failures = sum(1 for r in checked if not r.parsed)
+    latencies = sorted(r.latency_seconds for r in network)
+    return {
+        "calls": len(records),
+        "network_calls": len(network),
+        "cache_hits": len(records) - len(network),
+        "cache_hit_rate": (len(records) - len(network)) / len(records) if records else 0.0,
+        "prompt_tokens": sum(r.prompt_tokens for r in network),
+        "completion_tokens": sum(r.completion_tokens for r in network),
+        "retries": sum(r.retries for r in records),
+        "errors": sum(1 for r in records if r.error),
+        "parse_failures": parse_failures,
+        "parse_failure_rate": parse_failures / len(checked) if checked else 0.0,
+        "latency_seconds": {
+            "total": sum(latencies),
+            "mean": sum(latencies) / len(latencies) if latencies else 0.0,
+            "p50": _percentile(latencies, 0.5),
+            "p95": _percentile(latencies, 0.95),
+            "max": latencies[-1] if latencies else 0.0,
+        },
+    }
+
+# ========== Registry ==========
+
+class MetricsRegistry:
+    """
+    In-process store of LLM call records. llm.complete records every
+    call; summary() aggregates them overall, per agent and per
+    agent/stage, and lists the slowest and most expensive calls.
+    """
+
+    def __init__(self):
+        self._records: List[LLMCallRecord] = []
+        self._lock = threading.Lock()
+
+    def record(self, record: LLMCallRecord) -> None:
+        with self._lock:
+            self._records.append(record)
+
+    def records(self) -> List[LLMCallRecord]:
+        with self._lock:
+            return list(self._records)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._records.clear()
+
+    def summary(self, top_n: int = SUMMARY_TOP_N) -> dict:
+        records = self.records()
+        by_agent, by_stage = defaultdict(list), defaultdict(list)
+        for record in records:
+            by_agent[record.agent or "untagged"].append(record)
+            by_stage[f"{record.agent or 'untagged'}/{record.stage or 'untagged'}"].append(record)
+
+        network = [r for r in records if not r.cache_hit]
+        slowest = sorted(network, key=lambda r: r.latency_seconds, reverse=True)[:top_n]
+        most_expensive = sorted(network, key=lambda r: r.prompt_tokens + r.completion_tokens, reverse=True)[:top_n]
+        return {
+            "overall": aggregate(records),
+            "by_agent": {name: aggregate(group) for name, group in sorted(by_agent.items())},
+            "by_stage": {name: aggregate(group) for name, group in sorted(by_stage.items())},
+            "slowest": [asdict(r) for r in slowest],
+            "most_expensive": [asdict(r) for r in most_expensive],
+        }
+
+    def write_summary(self, path: Optional[str] = None, **run_info) -> dict:
+        """Saves summary() plus any run details (e.g. stage statuses) as a vault-encrypted JSON file."""
+        summary = {**run_info, **self.summary()}
+        path = path or LLM_METRICS_FILE
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        save_encrypted_json(summary, path)
+        return summary
+
+registry = MetricsRegistry()
@@ -0,0 +1,252 @@
+# hushh_mcp/operons/classify_electronics.py
+
+import math
+from collections import Counter
+from typing import Iterable, List, Optional, Tuple
+
+from hushh_mcp.operons.product_identity import normalise_item_name
+from hushh_mcp.vault.lru_cache import EncryptedLRUCache
+
+# ==================== Constants ====================
+
+# Bump when the lexicon, seed data or thresholds change so cached offline decisions are recomputed
+CLASSIFIER_VERSION = "3"
+# Model probability needed to decide without the LLM (and 1 - this to reject)
+CONFIDENCE_THRESHOLD = 0.9
+
+# Devices that plug in or run on batteries
+ELECTRONIC_TERMS = {
+    "airpods", "earbuds", "earphone", "earphones", "headphone", "headphones", "headset", "neckband",
+    "speaker", "speakers", "soundbar", "home theatre", "laptop", "macbook", "chromebook",
+    "smartphone", "mobile phone", "iphone", "tablet", "ipad", "television", "smart tv", "led tv",
+    "monitor", "mouse", "keyboard", "webcam", "camera", "dslr", "printer", "router", "modem",
+    "smartwatch", "smart watch", "fitness band", "smart band", "trimmer", "shaver", "hair dryer",
+    "straightener", "kettle", "induction cooktop", "mixer grinder", "juicer", "air fryer",
+    "refrigerator", "washing machine", "microwave", "air conditioner", "air purifier",
+    "vacuum cleaner", "ceiling fan", "table fan", "geyser", "water heater", "ssd", "hard drive",
+    "hard disk", "pendrive", "pen drive", "flash drive", "power bank", "playstation", "xbox",
+    "nintendo", "projector", "drone", "graphics card", "motherboard", "processor", "echo dot",
+    "firestick", "fire tv stick", "chromecast", "e reader", "electric toothbrush", "inverter",
+}
+
+# Accessories, media and consumables the electronics filter excludes. Words that also name
+# appliances ("oil" heater, "rice" cooker, "coffee" maker) only appear inside longer phrases
+NON_ELECTRONIC_TERMS = {
+    "case", "cover", "pouch", "sleeve", "skin", "screen guard", "screen protector", "tempered glass",
+    "cable", "adapter", "connector", "converter", "stand", "holder", "mount", "strap", "book",
+    "paperback", "hardcover", "novel", "shirt", "t shirt", "tshirt", "jeans", "kurta", "saree",
+    "shoes", "sneakers", "socks", "bottle", "lunch box", "backpack", "laptop bag", "tote bag",
+    "sling bag", "school bag", "wallet", "notebook diary", "ball pen", "gel pen", "fountain pen",
+    "pencil", "mug", "towel", "bedsheet", "pillow", "chocolate", "snacks", "instant coffee",
+    "coffee powder", "coffee beans", "green tea", "tea bags", "tea powder", "basmati rice", "atta",
+    "sunflower oil", "mustard oil", "olive oil", "coconut oil", "hair oil", "cooking oil", "shampoo",
+    "soap", "cream", "soft toy", "plush toy", "mouse pad", "desk pad", "ink cartridge",
+    "toner cartridge", "ink bottle", "printer paper", "copier paper", "a4 paper", "tripod",
+    "monitor riser", "laptop riser", "wrist rest", "foot rest",
+}
+
+# Power sources: an item naming one is never rejected offline, whatever else it matches
+POWER_TERMS = {
+    "electric", "electrical", "rechargeable", "heater", "remote control", "battery operated",
+    "battery powered", "cordless",
+}
+
+# Labelled item names the offline model is trained on, alongside the lexicon terms
+SEED_EXAMPLES: List[Tuple[str, bool]] = [
+    ("boAt Rockerz 450 Bluetooth On Ear Headphones with Mic", True),
+    ("boAt Airdopes 141 Bluetooth Truly Wireless in Ear Earbuds", True),
+    ("Logitech M235 Wireless Mouse", True),
+    ("Logitech K380 Multi-Device Bluetooth Keyboard", True),
+    ("Logitech C270 HD Webcam", True),
+    ("Redmi Note 12 Pro 5G (Onyx Black, 128 GB)", True),
+    ("Samsung Galaxy M34 5G (Midnight Blue, 6GB RAM)", True),
+    ("Apple iPhone 14 (128 GB) - Blue", True),
+    ("OnePlus Nord CE 3 Lite 5G", True),
+    ("Sony WH-1000XM4 Wireless Noise Cancelling Headphones", True),
+    ("JBL Flip 5 Portable Waterproof Bluetooth Speaker", True),
+    ("HP 15s Intel Core i5 12th Gen Laptop", True),
+    ("Dell Inspiron 3520 Laptop", True),
+    ("Lenovo IdeaPad Slim 3 Laptop", True),
+    ("Mi 10000mAh Power Bank", True),
+    ("Philips BT1232 Beard Trimmer", True),
+    ("Noise ColorFit Pulse Smartwatch", True),
+    ("Amazfit Bip 3 Smart Watch", True),
+    ("SanDisk Ultra 64GB USB 3.0 Pen Drive", True),
+    ("Seagate 1TB External Hard Drive", True),
+    ("Crucial P3 500GB NVMe SSD", True),
+    ("TP-Link Archer C6 Wi-Fi Router", True),
+    ("Amazon Echo Dot (5th Gen) Smart Speaker with Alexa", True),
+    ("Fire TV Stick with Alexa Voice Remote", True),
+    ("Canon PIXMA E477 Wireless Ink Tank Printer", True),
+    ("Prestige Electric Kettle 1.5 Litre", True),
+    ("Bajaj Majesty Dry Iron", True),
+    ("Havells Ceiling Fan 1200mm", True),
+    ("Samsung 43 inch Crystal 4K Smart LED TV", True),
+    ("LG 24 inch IPS Monitor", True),
+    ("Spigen Rugged Armor Back Cover for iPhone 14", False),
+    ("Silicone Case for Samsung Galaxy S23", False),
+    ("Tempered Glass Screen Protector for Redmi Note 12", False),
+    ("Amazon Basics USB Type C to USB A Cable", False),
+    ("Portronics Konnect L USB Cable 1.2M", False),
+    ("HDMI to VGA Adapter Converter", False),
+    ("Laptop Sleeve 15.6 inch", False),
+    ("Adjustable Aluminium Laptop Stand", False),
+    ("Mobile Holder for Car Dashboard", False),
+    ("Atomic Habits (Paperback) by James Clear", False),
+    ("The Psychology of Money Book", False),
+    ("Allen Solly Men's Regular Fit Polo T-Shirt", False),
+    ("Levi's Men's 511 Slim Fit Jeans", False),
+    ("Puma Men's Running Shoes", False),
+    ("Milton Thermosteel Water Bottle 1 Litre", False),
+    ("American Tourister Backpack 32L", False),
+    ("Cadbury Dairy Milk Silk Chocolate", False),
+    ("Tata Tea Gold 1kg", False),
+    ("Fortune Sunflower Oil 1L", False),
+    ("Dove Shampoo 650ml", False),
+    ("Watch Strap Silicone 22mm", False),
+    ("Classmate Notebook Diary Pack of 6", False),
+]
+
+# ==================== Features ====================
+
+def _features(normalised: str) -> List[str]:
+    # Words plus a crude plural-stripped form so "headphones" and "headphone" share evidence
+    words = normalised.split()
+    return words + [w[:-1] for w in words if len(w) > 3 and w.endswith("s")]
+
+def _lexicon_matches(normalised: str, terms: Iterable[str]) -> bool:
+    padded = f" {normalised} "
+    return any(f" {term} " in padded for term in terms)
+
+# ==================== Offline Model ====================
+
+class NaiveBayesModel:
+    """
+    Multinomial naive Bayes over item-name words with Laplace smoothing.
+    Small enough to train at start-up on the seed set plus cached labels.
+    """
+
+    def __init__(self, alpha: float = 1.0):
+        self.alpha = alpha
+        self._counts = {True: Counter(), False: Counter()}
+        self._docs = {True: 0, False: 0}
+
+    def fit(self, examples: Iterable[Tuple[str, bool]]) -> "NaiveBayesModel":
+        for name, label in examples:
+            self._counts[label].update(_features(normalise_item_name(name)))
+            self._docs[label] += 1
+        return self
+
+    def predict_proba(self, name: str) -> float:
+        """Returns P(electronic | name)."""
+        features = _features(normalise_item_name(name))
+        vocabulary = len(set(self._counts[True]) | set(self._counts[False])) or 1
+        total_docs = sum(self._docs.values()) or 1
+        log_scores = {}
+        for label in (True, False):
+            counts = self._counts[label]
+            denominator = sum(counts.values()) + self.alpha * vocabulary
+            score = math.log((self._docs[label] + self.alpha) / (total_docs + 2 * self.alpha))
+            for feature in features:
+                score += math.log((counts[feature] + self.alpha) / denominator)
+            log_scores[label] = score
+        diff = log_scores[False] - log_scores[True]
+        if diff > 700:
+            return 0.0
+        return 1.0 / (1.0 + math.exp(diff))
+
+# ==================== Classifier ====================
+
+class ElectronicsClassifier:
+    """
+    Decides whether purchased items are electronic devices without calling
+    an LLM where possible. An unambiguous lexicon hit decides when the naive
+    Bayes model leans the same way (and, to reject, is confident), otherwise
+    the model decides if it is confident; anything else, and any rejection
+    of an item naming a power source, is left undecided (None) for the
+    caller to escalate. Decisions, including labels recorded
+    from the LLM, are cached by normalised item name.
+    """
+
+    def __init__(self, cache: Optional[EncryptedLRUCache] = None, threshold: float = CONFIDENCE_THRESHOLD):
+        self.cache = cache
+        self.threshold = threshold
+        self.sources = Counter()
+        learned = [(key, entry["electronic"]) for key, entry in (cache.items() if cache else [])
+                   if entry.get("source") == "llm"]
+        examples = SEED_EXAMPLES + learned
+        examples += [(term, True) for term in ELECTRONIC_TERMS]
+        examples += [(term, False) for term in NON_ELECTRONIC_TERMS]
+        self.model = NaiveBayesModel().fit(examples)
+
+    def _decide(self, normalised: str) -> Tuple[Optional[bool], str]:
+        electronic = _lexicon_matches(normalised, ELECTRONIC_TERMS)
+        accessory = _lexicon_matches(normalised, NON_ELECTRONIC_TERMS)
+        probability = self.model.predict_proba(normalised)
+        # Rejected items are dropped for good, so a rejection needs a confident model and
+        # no sign of a powered device ("Oil Filled Room Heater", "Electric Lunch Box")
+        can_reject = probability <= 1 - self.threshold and not _lexicon_matches(normalised, POWER_TERMS)
+        if electronic != accessory:
+            # A one-sided hit such as "monitor" in "Wooden Monitor Riser" is only trusted
+            # when the model agrees; a disagreement goes to the LLM
+            if electronic and probability >= 0.5:
+                return True, "lexicon"
+            if accessory and can_reject:
+                return False, "lexicon"
+            return None, "uncertain"
+
+        # No lexicon hit, or a conflict such as "iPhone 14 case": let the model weigh it
+        if probability >= self.threshold:
+            return True, "model"
+        if can_reject:
+            return False, "model"
+        return None, "uncertain"
+
+    def classify(self, itemname: Optional[str]) -> Optional[bool]:
+        normalised = normalise_item_name(itemname)
+        if not normalised:
+            self.sources["uncertain"] += 1
+            return None
+        if self.cache is not None:
+            cached = self.cache.get(normalised)
+            if cached is not None:
+                self.sources["cache"] += 1
+                return cached["electronic"]
+
+        decision, source = self._decide(normalised)
+        self.sources[source] += 1
+        if decision is not None and self.cache is not None:
+            self.cache.put(normalised, {"electronic": decision, "source": source})
+        return decision
+
+    def record(self, itemname: Optional[str], electronic: bool, source: str = "llm") -> None:
+        normalised = normalise_item_name(itemname)
+        if normalised and self.cache is not None:
+            self.cache.put(normalised, {"electronic": bool(electronic), "source": source})
+
+    def best_guess(self, itemname: Optional[str]) -> bool:
+        # Used when an uncertain item cannot be escalated (e.g. offline)
+        return self.model.predict_proba(normalise_item_name(itemname)) >= 0.5
+
+# ==================== Operon ====================
+
+def split_electronics(products: List[dict], classifier: ElectronicsClassifier) -> Tuple[List[dict], List[dict]]:
+    """
+    Splits products into those confidently classified as electronic and
+    those the classifier could not decide.
+
+    Args:
+        products (list): Product dicts with an "itemname"
+        classifier (ElectronicsClassifier): Classifier to consult
+
+    Returns:
+        tuple: (electronic, uncertain), each in input order; confident non-electronics are dropped
+    """
+    electronic, uncertain = [], []
+    for product in products:
+        decision = classifier.classify(product.get("itemname"))
+        if decision is None:
+            uncertain.append(product)
+        elif decision:
+            electronic.append(product)
+    return electronic, uncertain
@@ -0,0 +1,156 @@
+# hushh_mcp/operons/dedupe_products.py
+
+import random
+import zlib
+from collections import defaultdict
+from datetime import date
+from typing import Dict, List, Optional, Set, Tuple
+
+from hushh_mcp.operons.product_identity import normalise_item_name
+
+# ==================== Constants ====================
+
+# 8 bands x 4 rows puts the LSH threshold near 0.6 Jaccard similarity
+MINHASH_BANDS = 8
+MINHASH_ROWS = 4
+# Candidates must be at least this similar on character shingles to merge
+SIMILARITY_THRESHOLD = 0.7
+# "Ordered", "Shipped" and "Delivered" mails for one order land within a couple of weeks
+DATE_WINDOW_DAYS = 14
+SHINGLE_SIZE = 3
+# context, cost and usage agents each spend one LLM call per product
+LLM_CALLS_PER_PRODUCT = 3
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_rng = random.Random(1729)
+_PERMUTATIONS = [
+    (_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME))
+    for _ in range(MINHASH_BANDS * MINHASH_ROWS)
+]
+
+# ==================== MinHash ====================
+
+def shingles(name: str) -> Set[str]:
+    normalised = normalise_item_name(name)
+    if len(normalised) <= SHINGLE_SIZE:
+        return {normalised} if normalised else set()
+    return {normalised[i:i + SHINGLE_SIZE] for i in range(len(normalised) - SHINGLE_SIZE + 1)}
+
+def minhash_signature(shingle_set: Set[str]) -> List[int]:
+    hashes = [zlib.crc32(s.encode("utf-8")) for s in shingle_set]
+    return [min((a * h + b) % _MERSENNE_PRIME for h in hashes) for a, b in _PERMUTATIONS]
+
+def jaccard(a: Set[str], b: Set[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+# ==================== Merge Rules ====================
+
+def _parse_date(value: Optional[str]) -> Optional[date]:
+    try:
+        return date.fromisoformat(value) if value else None
+    except ValueError:
+        return None
+
+def _prices_compatible(pa, pb) -> bool:
+    # A missing or zero price comes from fallback extraction and matches anything
+    return not pa or not pb or pa == pb
+
+def _dates_close(a: Optional[date], b: Optional[date]) -> bool:
+    return a is None or b is None or abs((a - b).days) <= DATE_WINDOW_DAYS
+
+def _orders_compatible(a: Optional[str], b: Optional[str]) -> bool:
+    return not a or not b or a == b
+
+def _merge(group: List[dict]) -> dict:
+    # Earliest mail's date and name (closest to the order, and stable as later mails
+    # arrive, so the product id does not change), plus the first real price
+    dated = sorted(group, key=lambda p: (_parse_date(p.get("purchase_date")) or date.max))
+    merged = dict(dated[0])
+    merged["price"] = next((p["price"] for p in dated if p.get("price")), merged.get("price"))
+    return merged
+
+# ==================== Operon ====================
+
+def collapse_near_duplicates(products: List[dict]) -> Tuple[List[dict], Dict[str, int]]:
+    """
+    Merges products that are the same purchase seen in several mails
+    (e.g. "Shipped" and "Delivered"), before any LLM sees them.
+
+    Names are normalised and shingled, MinHash/LSH bands bucket likely
+    matches in linear time, and candidates in a bucket merge only if they
+    share a platform, have similar names, compatible prices and purchase
+    dates within DATE_WINDOW_DAYS. Mails with different order ids, or two
+    order confirmations, are separate purchases and never merge.
+
+    Args:
+        products (list): Product dicts with itemname, price, purchase_date and platform,
+                         and optionally order_id and order_confirmation (see order_reference)
+
+    Returns:
+        tuple: (products with duplicates merged, in first-seen order,
+                {"merged": duplicates removed, "llm_calls_saved": estimated downstream calls avoided})
+    """
+    parent = list(range(len(products)))
+    # Known price per group, so a zero-price mail cannot bridge two differently priced products
+    group_price = [p.get("price") or None for p in products]
+    # Likewise per group: its order id, and whether it already holds an order confirmation
+    group_order = [p.get("order_id") or None for p in products]
+    group_confirmed = [bool(p.get("order_confirmation")) for p in products]
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    shingle_sets = [shingles(p.get("itemname")) for p in products]
+    dates = [_parse_date(p.get("purchase_date")) for p in products]
+
+    buckets = defaultdict(list)
+    for idx, (product, shingle_set) in enumerate(zip(products, shingle_sets)):
+        if not shingle_set:
+            continue
+        signature = minhash_signature(shingle_set)
+        platform = (product.get("platform") or "").lower()
+        for band in range(MINHASH_BANDS):
+            rows = tuple(signature[band * MINHASH_ROWS:(band + 1) * MINHASH_ROWS])
+            buckets[(platform, band, rows)].append(idx)
+
+    checked = set()
+    for members in buckets.values():
+        if len(members) < 2:
+            continue
+        # Sorting by date lets each member stop at the first candidate outside the window
+        members = sorted(members, key=lambda i: dates[i] or date.min)
+        for pos, i in enumerate(members):
+            for j in members[pos + 1:]:
+                if dates[i] and dates[j] and (dates[j] - dates[i]).days > DATE_WINDOW_DAYS:
+                    break
+                pair = (i, j) if i < j else (j, i)
+                if pair in checked:
+                    continue
+                checked.add(pair)
+                root_i, root_j = find(i), find(j)
+                if root_i == root_j:
+                    continue
+                if (
+                    _prices_compatible(group_price[root_i], group_price[root_j])
+                    and _orders_compatible(group_order[root_i], group_order[root_j])
+                    and not (group_confirmed[root_i] and group_confirmed[root_j])
+                    and _dates_close(dates[i], dates[j])
+                    and jaccard(shingle_sets[i], shingle_sets[j]) >= SIMILARITY_THRESHOLD
+                ):
+                    parent[root_j] = root_i
+                    group_price[root_i] = group_price[root_i] or group_price[root_j]
+                    group_order[root_i] = group_order[root_i] or group_order[root_j]
+                    group_confirmed[root_i] = group_confirmed[root_i] or group_confirmed[root_j]
+
+    groups: Dict[int, List[int]] = defaultdict(list)
+    for idx in range(len(products)):
+        groups[find(idx)].append(idx)
+
+    collapsed = [_merge([products[i] for i in members]) for members in sorted(groups.values(), key=min)]
+    merged = len(products) - len(collapsed)
+    return collapsed, {"merged": merged, "llm_calls_saved": merged * LLM_CALLS_PER_PRODUCT}
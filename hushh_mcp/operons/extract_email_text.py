@@ -0,0 +1,283 @@
+# hushh_mcp/operons/extract_email_text.py
+
+import base64
+import codecs
+import os
+import re
+from html import unescape
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+try:
+    import lxml.html
+    from lxml import etree
+except ImportError:  # lxml is optional; the streaming stripper covers its absence
+    lxml = None
+
+# ==================== Constants ====================
+
+# Order details sit near the top of retailer mails; the rest is footer and tracking markup
+DEFAULT_MAX_BODY_BYTES = 256 * 1024
+# Base64 is decoded in slices that are a multiple of 4 characters
+DECODE_SLICE_CHARS = 64 * 1024
+
+_WHITESPACE = re.compile(r"\s+")
+_SKIPPED_ELEMENTS = ("script", "style")
+# libxml2 keeps these elements' contents as raw text, while html.parser (the bs4 reference)
+# parses markup inside them; lxml sees them renamed to <span> so both agree
+_RAW_TEXT_TAGS = re.compile(r"<(/?)(?:textarea|title|xmp|iframe|noembed|noframes|plaintext)(?=[\s/>])", re.IGNORECASE)
+# Inside a tag, only ">" and the "=" before a possibly quoted attribute value matter
+_TAG_DELIMITERS = re.compile(r"[>=]")
+# Longest entity we hold back when a chunk ends mid-entity (e.g. "&thetasym;")
+_MAX_ENTITY_LENGTH = 10
+
+# Forces a specific html_to_text backend ("lxml", "stream" or "bs4")
+HTML_BACKEND_ENV = "HUSHH_HTML_BACKEND"
+
+# ==================== Streaming HTML Stripper ====================
+
+class HtmlTextStripper:
+    """
+    Single-pass HTML-to-text converter fed in chunks. Tags become a single
+    space, <script>/<style> contents and comments are dropped, and runs of
+    whitespace are collapsed as text is emitted, so the full body is never
+    rescanned. Tags, comments and entities may span chunk boundaries.
+    """
+
+    def __init__(self, unescape_entities: bool = False):
+        self.unescape_entities = unescape_entities
+        self._out: List[str] = []
+        self._pending = ""
+        self._skip_until: Optional[str] = None
+        self._space_pending = False
+        self._at_start = True
+
+    def _emit(self, text: str) -> None:
+        if not text:
+            return
+        if self.unescape_entities and "&" in text:
+            text = unescape(text)
+        collapsed = _WHITESPACE.sub(" ", text)
+        if collapsed[0] == " ":
+            self._space_pending = True
+            collapsed = collapsed[1:]
+        if not collapsed:
+            return
+        trailing = collapsed[-1] == " "
+        if trailing:
+            collapsed = collapsed[:-1]
+        if self._space_pending and not self._at_start:
+            self._out.append(" ")
+        self._out.append(collapsed)
+        self._at_start = False
+        self._space_pending = trailing
+
+    def _separator(self) -> None:
+        self._space_pending = True
+
+    @staticmethod
+    def _tag_end(data: str, pos: int) -> int:
+        # Index of the ">" closing the tag, skipping quoted attribute values as html.parser
+        # does (so <p title='a>b'> ends at the last ">"); -1 if the tag continues past `data`
+        while True:
+            match = _TAG_DELIMITERS.search(data, pos)
+            if match is None:
+                return -1
+            if match.group() == ">":
+                return match.start()
+            value = match.end()
+            while value < len(data) and data[value] in " \t\n\r\f":
+                value += 1
+            if value == len(data):
+                return -1
+            if data[value] in "\"'":
+                close = data.find(data[value], value + 1)
+                if close == -1:
+                    return -1
+                pos = close + 1
+            else:
+                pos = value
+
+    def feed(self, chunk: str) -> None:
+        data = self._pending + chunk
+        self._pending = ""
+        pos = 0
+        length = len(data)
+
+        while pos < length:
+            if self._skip_until:
+                end = data.lower().find(self._skip_until, pos)
+                if end == -1:
+                    # Keep enough of the tail to recognise a closing tag split across chunks
+                    self._pending = data[max(pos, length - len(self._skip_until)):]
+                    return
+                # Resume at the closing tag so it is consumed like any other tag
+                pos = end
+                self._skip_until = None
+                continue
+
+            lt = data.find("<", pos)
+            if lt == -1:
+                text = data[pos:]
+                amp = text.rfind("&") if self.unescape_entities else -1
+                if amp != -1 and ";" not in text[amp:] and len(text) - amp <= _MAX_ENTITY_LENGTH:
+                    self._pending = text[amp:]
+                    text = text[:amp]
+                self._emit(text)
+                return
+
+            if lt + 1 == length:
+                self._emit(data[pos:lt])
+                self._pending = "<"
+                return
+            if not (data[lt + 1].isalpha() or data[lt + 1] in "/!?"):
+                # A bare "<" in text, as in "a < b", is not markup
+                self._emit(data[pos:lt + 1])
+                pos = lt + 1
+                continue
+
+            self._emit(data[pos:lt])
+
+            if data.startswith("<!--", lt):
+                end = data.find("-->", lt + 4)
+                if end == -1:
+                    self._pending = data[lt:]
+                    return
+                pos = end + 3
+                self._separator()
+                continue
+
+            gt = self._tag_end(data, lt + 1)
+            if gt == -1:
+                self._pending = data[lt:]
+                return
+
+            name = data[lt + 1:gt].split(None, 1)[0].lower() if gt > lt + 1 else ""
+            if name in _SKIPPED_ELEMENTS:
+                self._skip_until = f"</{name}"
+            self._separator()
+            pos = gt + 1
+
+    def close(self) -> str:
+        if self._pending and not self._skip_until:
+            # An unterminated tag at the very end is dropped; stray text is kept
+            if not self._pending.startswith("<"):
+                self._emit(self._pending)
+        self._pending = ""
+        return "".join(self._out)
+
+def strip_html(html: str, unescape_entities: bool = False) -> str:
+    stripper = HtmlTextStripper(unescape_entities=unescape_entities)
+    stripper.feed(html)
+    return stripper.close()
+
+# ==================== HTML-to-Text Backends ====================
+
+def _lxml_text(html: str) -> str:
+    try:
+        root = lxml.html.document_fromstring(_RAW_TEXT_TAGS.sub(r"<\1span", html))
+    except (etree.ParserError, ValueError):
+        # Empty documents and unparseable fragments fall back to the stripper
+        return _stream_text(html)
+    for removed in root.iter("script", "style", etree.Comment):
+        # Stripping merges the tail into the preceding text; keep them apart as bs4 does
+        if removed.tail:
+            removed.tail = " " + removed.tail
+    etree.strip_elements(root, "script", "style", etree.Comment, with_tail=False)
+    return _WHITESPACE.sub(" ", " ".join(root.itertext())).strip()
+
+def _stream_text(html: str) -> str:
+    return strip_html(html, unescape_entities=True).strip()
+
+def _bs4_text(html: str) -> str:
+    # Reference backend: the original BeautifulSoup path, kept for parity checks
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(html, "html.parser")
+    return _WHITESPACE.sub(" ", soup.get_text(separator=" ")).strip()
+
+HTML_TEXT_BACKENDS: Dict[str, Callable[[str], str]] = {
+    "stream": _stream_text,
+    "bs4": _bs4_text,
+}
+if lxml is not None:
+    HTML_TEXT_BACKENDS["lxml"] = _lxml_text
+
+def default_html_backend() -> str:
+    forced = os.getenv(HTML_BACKEND_ENV)
+    if forced:
+        if forced not in HTML_TEXT_BACKENDS:
+            raise ValueError(f"Unknown or unavailable HTML backend: {forced}")
+        return forced
+    return "lxml" if "lxml" in HTML_TEXT_BACKENDS else "stream"
+
+def html_to_text(html: str, backend: Optional[str] = None) -> str:
+    """
+    Converts HTML (or already-stripped text) to whitespace-collapsed text.
+
+    Text without markup skips the parser entirely; otherwise the C-backed
+    lxml parser is used when installed, and the streaming stripper when not.
+    All backends drop <script>/<style> contents and comments.
+    """
+    if "<" not in html:
+        if "&" in html:
+            html = unescape(html)
+        return _WHITESPACE.sub(" ", html).strip()
+    return HTML_TEXT_BACKENDS[backend or default_html_backend()](html)
+
+# ==================== MIME Walking ====================
+
+def _text_parts(payload: dict) -> Iterator[dict]:
+    mime_type = payload.get("mimeType")
+    if mime_type in ("text/plain", "text/html") and payload.get("body", {}).get("data"):
+        yield payload
+    for part in payload.get("parts", []) or []:
+        yield from _text_parts(part)
+
+def iter_decoded_chunks(data: str, max_bytes: Optional[int] = None) -> Iterator[str]:
+    """
+    Incrementally decodes a base64url Gmail body, yielding text chunks and
+    stopping once max_bytes of decoded content have been produced.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+    produced = 0
+    for start in range(0, len(data), DECODE_SLICE_CHARS):
+        piece = data[start:start + DECODE_SLICE_CHARS]
+        raw = base64.urlsafe_b64decode(piece + "=" * (-len(piece) % 4))
+        if max_bytes is not None and produced + len(raw) >= max_bytes:
+            yield decoder.decode(raw[:max_bytes - produced], final=True)
+            return
+        produced += len(raw)
+        yield decoder.decode(raw)
+    yield decoder.decode(b"", final=True)
+
+# ==================== Operon ====================
+
+def extract_email_text(payload: dict, max_bytes: int = DEFAULT_MAX_BODY_BYTES) -> Tuple[str, Optional[str]]:
+    """
+    Extracts normalised body text from a Gmail message payload.
+
+    Prefers a text/plain part anywhere in the MIME tree over text/html,
+    decodes it incrementally and stops after max_bytes of decoded body.
+
+    Args:
+        payload (dict): The message's `payload` from messages.get(format='full')
+        max_bytes (int): Decoded-byte budget for the body
+
+    Returns:
+        tuple: (text, kind) where kind is 'plain', 'html' or None if no body was found
+    """
+    parts = list(_text_parts(payload))
+    chosen = next((p for p in parts if p["mimeType"] == "text/plain"), None)
+    if chosen is None:
+        chosen = next((p for p in parts if p["mimeType"] == "text/html"), None)
+    if chosen is None:
+        return "", None
+
+    chunks = iter_decoded_chunks(chosen["body"]["data"], max_bytes)
+    if chosen["mimeType"] == "text/html":
+        stripper = HtmlTextStripper()
+        for chunk in chunks:
+            stripper.feed(chunk)
+        return stripper.close(), "html"
+
+    text = "".join(chunks)
+    return _WHITESPACE.sub(" ", text).strip(), "plain"
@@ -0,0 +1,407 @@
+# hushh_mcp/operons/extract_receipt_data.py
+
+import hashlib
+import multiprocessing
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+from hushh_mcp.operons.extract_email_text import html_to_text
+from hushh_mcp.operons.parse_email_date import format_email_date
+from hushh_mcp.operons.safe_regex import ReceiptPattern, RegexBudgetExceeded, regex_budget
+
+# ==================== Constants ====================
+
+# Below this many emails, process start-up costs more than parsing serially
+PARALLEL_MIN_EMAILS = 500
+# Emails per task sent to a worker; large enough to amortise pickling overhead
+PARALLEL_CHUNK_SIZE = 200
+# Bump when shared helpers (clean_text, format_date, extract_price) change; per-platform
+# changes bump that extractor's own version instead, so only its cached results are redone
+EXTRACTION_VERSION = "2"
+# Pattern time after which an email's extraction stops and is retried on a truncated body.
+# Checked between pattern calls, so the standard engine can overrun it by its slowest call
+EMAIL_REGEX_BUDGET_SECONDS = 0.5
+# Item tables sit near the top of order mails, so the retry keeps this many body characters
+TRUNCATED_BODY_CHARS = 10000
+# Appended to the strategy of results parsed from a truncated body
+TRUNCATED_SUFFIX = "+truncated"
+# Reported when even the truncated body runs over budget
+BUDGET_EXCEEDED = "budget_exceeded"
+
+# ==================== Compiled Patterns ====================
+
+_SENDER_DOMAIN = re.compile(r"@([a-z0-9.-]+)")
+
+_PRICE_PATTERNS = (
+    ReceiptPattern(r"Total\s+([\d,]+)\s+INR"),
+    ReceiptPattern(r"Rs\.?\s?([\d,]+(?:\.\d{2})?)"),
+    ReceiptPattern(r"₹\s?([\d,]+(?:\.\d{2})?)"),
+    ReceiptPattern(r"Total Amount Paid: ([\d,]+\.\d{2})"),
+)
+
+_AMAZON_MODERN = ReceiptPattern(r"\*\s+(.+?)\s+Quantity:?[ ]*\d+\s+([\d,.]+)\s*INR")
+_AMAZON_LEGACY_ITEMS = ReceiptPattern(r"\*\s+(.+?)\s+Quantity")
+_AMAZON_LEGACY_PRICES = ReceiptPattern(r"Quantity: ?\d+\s+([\d,.]+)\s*INR")
+_AMAZON_SHIPMENT_LINE = ReceiptPattern(r"(.+?)\s+Rs\.?\s?([\d,.]+)")
+_AMAZON_ORDER_SUMMARY = ReceiptPattern(r"Order summary Item Subtotal: Rs\.([\d,.]+)")
+_AMAZON_SHIPPED_SUBJECT = ReceiptPattern(r"Shipped: [\"“”']?(.+?)[\"“”']")
+
+_CROMA_INVOICE = ReceiptPattern(
+    r"Item Description\s*Tax Code\s*Qty\.\s*Rate\s*Amount\s*(\d+)\s+(.+?)\s+\S+\s+(\d+\.\d+)\s+(\d+\.\d+)",
+    re.DOTALL
+)
+_CROMA_TOTAL = ReceiptPattern(r"Total Amount Paid: ([\d,.]+)")
+
+_FLIPKART_ITEM = ReceiptPattern(r"([A-Za-z0-9][^₹]{2,150}?)\s+(?:Qty|Quantity):?\s*\d+\s+(?:₹|Rs\.?)\s?([\d,]+(?:\.\d{2})?)")
+_FLIPKART_SUBJECT = (
+    ReceiptPattern(r"(?:Your )?(?:Flipkart )?Order for (.+?) (?:has been|is) (?:delivered|shipped|placed|confirmed)", re.IGNORECASE),
+    ReceiptPattern(r"^(?:Delivered|Shipped|Order Confirmed)\s*[:-]\s*(.+?)\s*$", re.IGNORECASE),
+)
+_FLIPKART_TOTAL = ReceiptPattern(r"(?:Amount Paid|Order Total|Total)\s*:?\s*(?:₹|Rs\.?)\s?([\d,]+(?:\.\d{2})?)", re.IGNORECASE)
+
+_ORDER_ID_PATTERNS = (
+    re.compile(r"\b(\d{3}-\d{7}-\d{7})\b"),  # Amazon
+    re.compile(r"\b(OD\d{15,21})\b"),  # Flipkart
+    re.compile(r"\border\s*(?:id|no\.?|number|#)\s*[:#]?\s*(?=[A-Z0-9-]*\d)([A-Z0-9][A-Z0-9-]{5,})", re.IGNORECASE),
+)
+_ORDER_SUBJECT = re.compile(r"\border(?:ed)?\b", re.IGNORECASE)
+# Subjects about an order that already exists rather than a new one
+_ORDER_UPDATE_SUBJECT = re.compile(
+    r"shipped|dispatched|out for delivery|delivered|invoice|cancel|return|refund", re.IGNORECASE
+)
+
+# ==================== Helpers ====================
+
+def clean_text(html: str) -> str:
+    return html_to_text(html)
+
+def format_date(date_str):
+    return format_email_date(date_str)
+
+def extract_price(text: str) -> Optional[int]:
+    for pattern in _PRICE_PATTERNS:
+        match = pattern.search(text)
+        if match:
+            return int(float(match.group(1).replace(",", "")))
+    return None
+
+def _to_price(price: str) -> Optional[int]:
+    try:
+        return int(float(price.replace(",", "")))
+    except Exception:
+        return None
+
+def _item(itemname, price, date, platform) -> dict:
+    return {
+        "itemname": itemname.strip() if itemname else None,
+        "price": price,
+        "purchase_date": date,
+        "platform": platform
+    }
+
+# ==================== Extractor Registry ====================
+
+ExtractResult = Tuple[List[dict], Optional[str]]
+
+@dataclass(frozen=True)
+class ReceiptExtractor:
+    platform: str
+    domains: Tuple[str, ...]
+    extract: Callable[[dict], ExtractResult]
+    version: str = "1"
+
+EXTRACTORS: Dict[str, ReceiptExtractor] = {}
+# Sender domain -> platform; consulted before any pattern runs
+SENDER_DOMAINS: Dict[str, str] = {}
+
+def register_extractor(platform: str, domains: Tuple[str, ...], version: str = "1"):
+    """
+    Registers `fn(email) -> (items, strategy)` as the extractor for mail sent
+    from any of `domains` (subdomains included). Bump `version` whenever the
+    extractor's output changes so cached results for that platform are redone.
+    """
+    def decorator(fn: Callable[[dict], ExtractResult]):
+        EXTRACTORS[platform] = ReceiptExtractor(platform, tuple(domains), fn, version)
+        for domain in domains:
+            SENDER_DOMAINS[domain.lower()] = platform
+        return fn
+    return decorator
+
+def detect_platform(email: dict) -> Optional[str]:
+    sender = email.get("from", "").lower()
+
+    # The address is the last "@domain" in 'Display Name <user@domain>'
+    domains = _SENDER_DOMAIN.findall(sender)
+    if domains:
+        labels = domains[-1].strip(".").split(".")
+        for start in range(len(labels) - 1):
+            platform = SENDER_DOMAINS.get(".".join(labels[start:]))
+            if platform:
+                return platform
+
+    # Fall back to the platform name anywhere in the sender, e.g. "Amazon.in <...>"
+    for platform in EXTRACTORS:
+        if platform in sender:
+            return platform
+    return None
+
+# ==================== Amazon ====================
+
+def _amazon_modern(body):
+    return _AMAZON_MODERN.findall(body)
+
+def _amazon_legacy(body):
+    items = _AMAZON_LEGACY_ITEMS.findall(body)
+    prices = _AMAZON_LEGACY_PRICES.findall(body)
+    return list(zip(items, prices)) if items and prices and len(items) == len(prices) else []
+
+def _amazon_shipment_details(body):
+    if "Your Shipment Details" in body:
+        section = body.split("Your Shipment Details", 1)[1]
+        lines = [l.strip() for l in section.splitlines() if l.strip() and not l.lower().startswith("http")]
+        found = []
+        for line in lines:
+            m = _AMAZON_SHIPMENT_LINE.match(line)
+            if m:
+                found.append(m.groups())
+        return found
+    return []
+
+def _amazon_order_summary(body):
+    m = _AMAZON_ORDER_SUMMARY.search(body)
+    if m:
+        return [(None, m.group(1))]
+    return []
+
+AMAZON_STRATEGIES = (
+    ("modern", _amazon_modern),
+    ("legacy", _amazon_legacy),
+    ("shipment_details", _amazon_shipment_details),
+    ("order_summary", _amazon_order_summary),
+)
+
+@register_extractor("amazon", ("amazon.in", "amazon.com"))
+def extract_amazon_data(email: dict) -> ExtractResult:
+    body = clean_text(email["body"])
+    subject = email.get("subject", "")
+    date = format_date(email["date"])
+    platform = "amazon"
+
+    for strategy, find in AMAZON_STRATEGIES:
+        results = [
+            _item(item, _to_price(price), date, platform)
+            for item, price in find(body)
+            if item is not None and price
+        ]
+        if results:
+            return results, strategy
+
+    match = _AMAZON_SHIPPED_SUBJECT.search(subject)
+    item = match.group(1).strip() if match else None
+    price = extract_price(body)
+    if item and price:
+        return [_item(item, _to_price(str(price)), date, platform)], "subject_fallback"
+
+    item = subject or body[:50]
+    if price:
+        return [_item(item, price, date, platform)], "price_only"
+
+    return [{
+        "itemname": subject or "Unknown Product",
+        "price": 0,
+        "purchase_date": date,
+        "platform": platform
+    }], "placeholder"
+
+# ==================== Croma ====================
+
+@register_extractor("croma", ("croma.com",))
+def extract_croma_data(email: dict) -> ExtractResult:
+    body = clean_text(email["body"])
+    date = format_date(email["date"])
+    platform = "croma"
+
+    invoice_items = _CROMA_INVOICE.findall(body)
+    if invoice_items:
+        return [
+            _item(item, int(float(amount)), date, platform)
+            for qty, item, rate, amount in invoice_items
+        ], "invoice_table"
+
+    m = _CROMA_TOTAL.search(body)
+    if m:
+        price = int(float(m.group(1).replace(",", "")))
+        return [_item(None, price, date, platform)], "total_paid"
+    return [], None
+
+# ==================== Flipkart ====================
+
+@register_extractor("flipkart", ("flipkart.com",))
+def extract_flipkart_data(email: dict) -> ExtractResult:
+    body = clean_text(email["body"])
+    subject = email.get("subject", "")
+    date = format_date(email["date"])
+    platform = "flipkart"
+
+    results = [
+        _item(item, _to_price(price), date, platform)
+        for item, price in _FLIPKART_ITEM.findall(body)
+    ]
+    if results:
+        return results, "item_table"
+
+    item = None
+    for pattern in _FLIPKART_SUBJECT:
+        match = pattern.search(subject)
+        if match:
+            item = match.group(1)
+            break
+    if item:
+        total = _FLIPKART_TOTAL.search(body)
+        price = _to_price(total.group(1)) if total else extract_price(body)
+        if price:
+            return [_item(item, price, date, platform)], "subject_fallback"
+    return [], None
+
+# ==================== Order References ====================
+
+def order_reference(email: dict) -> dict:
+    """
+    Identifies the order an email is about, so mails for different orders
+    are never merged as one purchase.
+
+    Returns:
+        dict: {"order_id": str | None, "order_confirmation": bool}; the latter
+              is true for "order placed" mails, of which each order has one
+    """
+    subject = email.get("subject") or ""
+    text = f"{subject}\n{email.get('body') or ''}"
+    order_id = None
+    for pattern in _ORDER_ID_PATTERNS:
+        match = pattern.search(text)
+        if match:
+            order_id = match.group(1).upper()
+            break
+    confirmation = bool(_ORDER_SUBJECT.search(subject)) and not _ORDER_UPDATE_SUBJECT.search(subject)
+    return {"order_id": order_id, "order_confirmation": confirmation}
+
+# ==================== Operon ====================
+
+def extract_receipt(email: dict) -> dict:
+    """
+    Extracts purchased items from one relevant email.
+
+    Args:
+        email (dict): Metadata dict written by gmail_reader_agent (from, subject, date, body)
+
+    Returns:
+        dict: {"platform": str | None, "strategy": str | None, "items": list}
+    """
+    platform = detect_platform(email)
+    extractor = EXTRACTORS.get(platform)
+    if extractor is None:
+        return {"platform": None, "strategy": None, "items": []}
+    try:
+        with regex_budget(EMAIL_REGEX_BUDGET_SECONDS):
+            items, strategy = extractor.extract(email)
+        return {"platform": platform, "strategy": strategy, "items": items}
+    except RegexBudgetExceeded:
+        pass
+    # Over budget on the full body: the items usually sit in its head, so retry on that
+    truncated = {**email, "body": (email.get("body") or "")[:TRUNCATED_BODY_CHARS]}
+    try:
+        with regex_budget(EMAIL_REGEX_BUDGET_SECONDS):
+            items, strategy = extractor.extract(truncated)
+    except RegexBudgetExceeded:
+        return {"platform": platform, "strategy": BUDGET_EXCEEDED, "items": []}
+    if not items:
+        return {"platform": platform, "strategy": BUDGET_EXCEEDED, "items": []}
+    return {"platform": platform, "strategy": f"{strategy}{TRUNCATED_SUFFIX}", "items": items}
+
+def parse_email(email: dict) -> List[dict]:
+    return extract_receipt(email)["items"]
+
+# ==================== Parallel Parsing ====================
+
+def _extract_chunk(emails: List[dict]) -> List[dict]:
+    return [extract_receipt(email) for email in emails]
+
+def extract_receipts(
+    emails: List[dict],
+    workers: Optional[int] = None,
+    chunk_size: int = PARALLEL_CHUNK_SIZE,
+    min_parallel: int = PARALLEL_MIN_EMAILS,
+) -> List[dict]:
+    """
+    Runs extract_receipt over many emails, returning results in input order.
+
+    Inputs smaller than `min_parallel` (or a single worker) are parsed
+    serially. Larger inputs are split into `chunk_size` chunks and spread
+    over a process pool. Workers are spawned rather than forked, so they see
+    only the extractors registered when this module is imported.
+
+    Args:
+        emails (list): Email dicts as written by gmail_reader_agent
+        workers (int): Process count; defaults to the number of CPUs
+
+    Returns:
+        list: One extract_receipt result per email
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1 or len(emails) < min_parallel:
+        return _extract_chunk(emails)
+
+    chunks = [emails[i:i + chunk_size] for i in range(0, len(emails), chunk_size)]
+    try:
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=min(workers, len(chunks)), mp_context=context) as pool:
+            # map() yields chunk results in submission order
+            return [result for chunk in pool.map(_extract_chunk, chunks) for result in chunk]
+    except (OSError, BrokenProcessPool) as e:
+        print(f"Parallel receipt parsing unavailable ({e}); parsing serially")
+        return _extract_chunk(emails)
+
+# ==================== Result Cache ====================
+
+def extraction_cache_key(email: dict) -> str:
+    """
+    Cache key for one email's extract_receipt result: message id, a digest of
+    every field the extractors read, and the version of the extractor that
+    would handle it.
+    """
+    digest = hashlib.sha256("\x1f".join(
+        email.get(field) or "" for field in ("from", "subject", "date", "body")
+    ).encode("utf-8")).hexdigest()
+    extractor = EXTRACTORS.get(detect_platform(email))
+    version = f"{extractor.platform}@{extractor.version}" if extractor else "none"
+    return f"{email.get('id') or ''}:{digest}:{EXTRACTION_VERSION}:{version}"
+
+def extract_receipts_cached(emails: List[dict], cache, workers: Optional[int] = None) -> Tuple[List[dict], int]:
+    """
+    extract_receipts with a result cache in front: only emails whose key is
+    missing from `cache` (new, changed, or handled by a bumped extractor)
+    are parsed.
+
+    Args:
+        emails (list): Email dicts as written by gmail_reader_agent
+        cache: EncryptedLRUCache-like object with get/put
+
+    Returns:
+        tuple: (one extract_receipt result per email in input order, number of emails parsed)
+    """
+    keys = [extraction_cache_key(email) for email in emails]
+    results = [cache.get(key) for key in keys]
+    missing = [idx for idx, result in enumerate(results) if result is None]
+
+    parsed = extract_receipts([emails[idx] for idx in missing], workers=workers)
+    for idx, result in zip(missing, parsed):
+        results[idx] = result
+        # A blown time budget depends on machine load, not content; retry it next run
+        strategy = result["strategy"] or ""
+        if strategy != BUDGET_EXCEEDED and not strategy.endswith(TRUNCATED_SUFFIX):
+            cache.put(keys[idx], result)
+    return results, len(missing)
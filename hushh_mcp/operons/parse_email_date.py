@@ -0,0 +1,72 @@
+# hushh_mcp/operons/parse_email_date.py
+
+import calendar
+import re
+from datetime import date
+from functools import lru_cache
+from typing import Optional
+
+# ==================== Constants ====================
+
+# Headers repeat across the reader, receipt parsing and reruns within one process
+DATE_CACHE_SIZE = 16384
+
+_MONTHS = {name.lower(): index for index, name in enumerate(calendar.month_abbr) if name}
+
+# RFC 2822: [day-of-week ","] day month year ...; anything after the year is ignored
+_RFC2822_DATE = re.compile(r"\s*(?:[A-Za-z]{3},?\s*)?(\d{1,2})\s+([A-Za-z]{3})[a-z]*\.?\s+(\d{2,4})\b")
+_ISO_DATE = re.compile(r"\s*(\d{4})-(\d{2})-(\d{2})")
+
+# ==================== Helpers ====================
+
+def _valid_date(year: int, month: int, day: int) -> Optional[date]:
+    if not (1 <= month <= 12 and 1 <= year <= 9999):
+        return None
+    if not 1 <= day <= calendar.monthrange(year, month)[1]:
+        return None
+    return date(year, month, day)
+
+# ==================== Operon ====================
+
+@lru_cache(maxsize=DATE_CACHE_SIZE)
+def parse_email_date(value: Optional[str]) -> Optional[date]:
+    """
+    Parses the calendar date of an email Date header without exceptions.
+
+    Accepts RFC 2822 headers with or without the day name ("Wed, 1 Jan 2023
+    10:00:00 +0530", obsolete two-digit years included) and ISO dates
+    ("2023-01-01"). The date is taken as written, without converting time
+    zones. Results are memoised per header string.
+
+    Args:
+        value (str): Raw Date header, or None
+
+    Returns:
+        date | None: The date, or None if the header is missing or malformed
+    """
+    if not value:
+        return None
+
+    match = _RFC2822_DATE.match(value)
+    if match:
+        day, month_name, year_text = match.groups()
+        month = _MONTHS.get(month_name.lower())
+        if month is None:
+            return None
+        year = int(year_text)
+        if len(year_text) == 2:
+            year += 2000 if year < 50 else 1900
+        elif len(year_text) == 3:
+            year += 1900
+        return _valid_date(year, month, int(day))
+
+    match = _ISO_DATE.match(value)
+    if match:
+        year, month, day = (int(part) for part in match.groups())
+        return _valid_date(year, month, day)
+    return None
+
+@lru_cache(maxsize=DATE_CACHE_SIZE)
+def format_email_date(value: Optional[str]) -> Optional[str]:
+    parsed = parse_email_date(value)
+    return parsed.isoformat() if parsed else None
@@ -0,0 +1,52 @@
+# hushh_mcp/operons/product_identity.py
+
+import hashlib
+import re
+from typing import Optional
+
+# ==================== Constants ====================
+
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+# Hex digits kept from the digest; 64 bits is ample for one user's purchases
+PRODUCT_ID_LENGTH = 16
+
+# ==================== Normalisation ====================
+
+def normalise_item_name(name: Optional[str]) -> str:
+    return _NON_ALNUM.sub(" ", (name or "").lower()).strip()
+
+# ==================== Operon ====================
+
+def product_id(product: dict) -> str:
+    """
+    Derives a stable id for a purchased product from its content, so the
+    same purchase keeps the same id across pipeline runs regardless of what
+    else was bought.
+
+    Args:
+        product (dict): Product with "platform", "itemname", "purchase_date" and "price"
+
+    Returns:
+        str: Hex digest of (platform, normalised item name, purchase date, price)
+    """
+    key = "\x1f".join([
+        (product.get("platform") or "").lower(),
+        normalise_item_name(product.get("itemname")),
+        product.get("purchase_date") or "",
+        "" if product.get("price") is None else str(product.get("price")),
+    ])
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:PRODUCT_ID_LENGTH]
+
+def index_by_id(entries, required_key: Optional[str] = None) -> dict:
+    """
+    Indexes a previous run's per-product results by str(id) so agents can
+    reuse them for products whose id is unchanged. Entries missing
+    `required_key` are treated as incomplete and left out.
+    """
+    if not isinstance(entries, list):
+        return {}
+    return {
+        str(entry["id"]): entry
+        for entry in entries
+        if isinstance(entry, dict) and "id" in entry and (required_key is None or required_key in entry)
+    }
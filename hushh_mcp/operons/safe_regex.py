@@ -0,0 +1,106 @@
+# hushh_mcp/operons/safe_regex.py
+
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+try:
+    import re2
+except ImportError:  # google-re2 is optional; patterns then run on the standard engine
+    re2 = None
+
+# ==================== Constants ====================
+
+# "re2" (linear time), "re" (standard backtracking engine) or "auto" (re2 when installed)
+REGEX_ENGINE_ENV = "HUSHH_REGEX_ENGINE"
+
+_INLINE_FLAGS = ((re.IGNORECASE, "i"), (re.DOTALL, "s"), (re.MULTILINE, "m"))
+
+_state = threading.local()
+
+class RegexBudgetExceeded(Exception):
+    pass
+
+# ==================== Engine Selection ====================
+
+def default_regex_engine() -> str:
+    requested = os.getenv(REGEX_ENGINE_ENV, "auto").lower()
+    if requested not in ("auto", "re", "re2"):
+        raise ValueError(f"Unknown regex engine: {requested}")
+    if requested == "re":
+        return "re"
+    # An explicit "re2" without the package installed degrades to the standard engine
+    return "re2" if re2 is not None else "re"
+
+@contextmanager
+def regex_budget(seconds: Optional[float], engine: Optional[str] = None):
+    """
+    Runs the enclosed ReceiptPattern calls on one engine and under a time
+    budget. Only time spent inside pattern calls counts, and the budget is
+    checked before each call: once it is spent the next call raises
+    RegexBudgetExceeded. It is not a hard limit. A call already running on
+    the standard engine cannot be interrupted, so the block can overrun by
+    its slowest single call (seconds on adversarial bodies); re2 keeps every
+    call linear, which is why it is preferred when installed.
+    """
+    previous = (getattr(_state, "remaining", None), getattr(_state, "engine", None))
+    _state.remaining = seconds if seconds else None
+    # A nested budget keeps the engine chosen by the enclosing one unless told otherwise
+    _state.engine = engine or previous[1] or default_regex_engine()
+    try:
+        yield
+    finally:
+        _state.remaining, _state.engine = previous
+
+# ==================== Pattern ====================
+
+def _compile_linear(pattern: str, flags: int):
+    if re2 is None:
+        return None
+    inline = "".join(letter for flag, letter in _INLINE_FLAGS if flags & flag)
+    try:
+        return re2.compile(f"(?{inline}){pattern}" if inline else pattern)
+    except Exception:
+        # Syntax RE2 does not support (backreferences, lookarounds) stays on `re`
+        return None
+
+class ReceiptPattern:
+    """
+    A regex compiled for both the standard engine and, when available, the
+    linear-time RE2 engine, exposing the subset of the `re` API the receipt
+    extractors use.
+    """
+
+    def __init__(self, pattern: str, flags: int = 0):
+        self.pattern = pattern
+        self.flags = flags
+        self.standard = re.compile(pattern, flags)
+        self.linear = _compile_linear(pattern, flags)
+
+    def _engine(self):
+        engine = getattr(_state, "engine", None) or default_regex_engine()
+        return self.linear if engine == "re2" and self.linear is not None else self.standard
+
+    def _call(self, method: str, text: str):
+        remaining = getattr(_state, "remaining", None)
+        if remaining is None:
+            return getattr(self._engine(), method)(text)
+        if remaining <= 0:
+            raise RegexBudgetExceeded(self.pattern)
+        start = time.monotonic()
+        try:
+            return getattr(self._engine(), method)(text)
+        finally:
+            _state.remaining = remaining - (time.monotonic() - start)
+
+    def search(self, text: str):
+        return self._call("search", text)
+
+    def match(self, text: str):
+        return self._call("match", text)
+
+    def findall(self, text: str):
+        return self._call("findall", text)
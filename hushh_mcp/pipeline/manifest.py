@@ -0,0 +1,82 @@
+# hushh_mcp/pipeline/manifest.py
+
+import hashlib
+import importlib.util
+import json
+import os
+from typing import Dict, Iterable, Optional
+from hushh_mcp.vault.json_vault import load_encrypted_json, save_encrypted_json
+
+# ========== Constants ==========
+
+JSONS_DIR = os.path.join(os.path.dirname(__file__), "../jsons")
+MANIFEST_PATH = os.path.join(JSONS_DIR, "pipeline_manifest.json")
+MISSING_DIGEST = "missing"
+
+# ========== Manifest Storage ==========
+
+def load_manifest(path: str = MANIFEST_PATH) -> Dict[str, dict]:
+    if not os.path.exists(path):
+        return {}
+    try:
+        manifest = load_encrypted_json(path)
+    except Exception:
+        # A corrupt manifest only costs one full run
+        return {}
+    return manifest if isinstance(manifest, dict) else {}
+
+def save_manifest(manifest: Dict[str, dict], path: str = MANIFEST_PATH) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    save_encrypted_json(manifest, path)
+
+# ========== Digests ==========
+
+def digest_file(path: str) -> str:
+    """
+    Digest of a vault file's decrypted content. Every save re-encrypts with
+    a fresh IV, so hashing the ciphertext would never match across runs.
+    """
+    if not os.path.exists(path):
+        return MISSING_DIGEST
+    try:
+        data = load_encrypted_json(path)
+        canonical = json.dumps(data, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+    except Exception:
+        with open(path, "rb") as f:
+            return "raw:" + hashlib.sha256(f.read()).hexdigest()
+
+def code_version(module: str) -> str:
+    try:
+        spec = importlib.util.find_spec(module)
+    except (ImportError, ValueError):
+        spec = None
+    origin = spec.origin if spec else None
+    if not origin or not os.path.exists(origin):
+        return hashlib.sha256(module.encode("utf-8")).hexdigest()
+    with open(origin, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+def stage_fingerprint(
+    module: str,
+    inputs: Iterable[str],
+    jsons_dir: str = JSONS_DIR,
+    code_modules: Iterable[str] = ()
+) -> str:
+    parts = {
+        "code": [code_version(name) for name in (module, *code_modules)],
+        "inputs": {name: digest_file(os.path.join(jsons_dir, name)) for name in sorted(inputs)},
+    }
+    return hashlib.sha256(json.dumps(parts, sort_keys=True).encode("utf-8")).hexdigest()
+
+def is_up_to_date(
+    manifest: Dict[str, dict],
+    stage_name: str,
+    fingerprint: str,
+    outputs: Iterable[str],
+    jsons_dir: str = JSONS_DIR
+) -> bool:
+    entry: Optional[dict] = manifest.get(stage_name)
+    if not entry or entry.get("fingerprint") != fingerprint:
+        return False
+    return all(os.path.exists(os.path.join(jsons_dir, name)) for name in outputs)
@@ -0,0 +1,244 @@
+# hushh_mcp/pipeline/runner.py
+
+import importlib
+import os
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+from hushh_mcp import llm_metrics
+from hushh_mcp.pipeline import manifest as stage_manifest
+
+# ========== Stage Definitions ==========
+
+COMPLETED = "completed"
+# Ran and saved its outputs, but some items failed (e.g. an LLM provider was down)
+PARTIAL = "partial"
+UP_TO_DATE = "up_to_date"
+FAILED = "failed"
+SKIPPED = "skipped"
+
+SATISFIED = (COMPLETED, PARTIAL, UP_TO_DATE)
+
+@dataclass(frozen=True)
+class Stage:
+    name: str
+    module: str
+    depends_on: Tuple[str, ...] = ()
+    # Vault files (relative to jsons/) read and written by the stage
+    inputs: Tuple[str, ...] = ()
+    outputs: Tuple[str, ...] = ()
+    # Stages that pull from external sources (Gmail, Calendar) cannot be fingerprinted
+    always_run: bool = False
+    # Helper modules whose source is part of the stage's code version
+    code_modules: Tuple[str, ...] = ()
+
+    def load(self) -> Callable[[], Optional[bool]]:
+        # Imported lazily so each agent configures its clients once per process, not once per run
+        return importlib.import_module(self.module).main
+
+# Shared helpers imported by every LLM agent: prompt normalisation and cache keys (llm), call
+# tagging (llm_metrics) and product ids (product_identity) all shape the agents' outputs
+LLM_AGENT_MODULES = ("hushh_mcp.llm", "hushh_mcp.llm_metrics", "hushh_mcp.operons.product_identity")
+
+# Edges follow the files each agent reads:
+#   receipt   <- relevant_emails.json (gmail_reader)
+#   context   <- productdetail.json (receipt)
+#   cost      <- productdetail.json (receipt)
+#   calendar  <- context.json (context)
+#   aggregator<- productdetail.json, resale_cost.json, calendar_lastseen.json
+#   usage     <- master.json (aggregator), resale_cost.json (cost)
+AGENT_STAGES: List[Stage] = [
+    Stage(
+        "gmail_reader_agent", "hushh_mcp.agents.gmail_reader_agent",
+        outputs=("relevant_emails.json",), always_run=True
+    ),
+    Stage(
+        "receipt_agent", "hushh_mcp.agents.receipt_agent", ("gmail_reader_agent",),
+        inputs=("relevant_emails.json",), outputs=("productdetail.json",),
+        code_modules=LLM_AGENT_MODULES + (
+            "hushh_mcp.operons.extract_receipt_data",
+            "hushh_mcp.operons.extract_email_text",
+            "hushh_mcp.operons.safe_regex",
+            "hushh_mcp.operons.parse_email_date",
+            "hushh_mcp.operons.classify_electronics",
+            "hushh_mcp.operons.dedupe_products",
+        )
+    ),
+    Stage(
+        "context_agent", "hushh_mcp.agents.context_agent", ("receipt_agent",),
+        inputs=("productdetail.json",), outputs=("context.json",), code_modules=LLM_AGENT_MODULES
+    ),
+    Stage(
+        "cost_agent", "hushh_mcp.agents.cost_agent", ("receipt_agent",),
+        inputs=("productdetail.json",), outputs=("resale_cost.json",), code_modules=LLM_AGENT_MODULES
+    ),
+    Stage(
+        "calender_reader_agent", "hushh_mcp.agents.calender_reader_agent", ("context_agent",),
+        inputs=("context.json",), outputs=("calendar_lastseen.json",), always_run=True
+    ),
+    Stage(
+        "aggregator_agent", "hushh_mcp.agents.aggregator_agent", ("receipt_agent", "cost_agent", "calender_reader_agent"),
+        inputs=("productdetail.json", "resale_cost.json", "history.json", "calendar_lastseen.json", "driver.json"),
+        outputs=("master.json",)
+    ),
+    Stage(
+        "usage_agent", "hushh_mcp.agents.usage_agent", ("aggregator_agent", "cost_agent"),
+        inputs=("master.json", "resale_cost.json"), outputs=("usage.json",), code_modules=LLM_AGENT_MODULES
+    ),
+]
+
+DEFAULT_MAX_WORKERS = 4
+# Per-run LLM call summary, written to the jsons directory after every run
+LLM_METRICS_FILENAME = "llm_metrics.json"
+
+# Only one pipeline may write the jsons/ directory at a time
+_pipeline_lock = threading.Lock()
+
+# ========== Graph Validation ==========
+
+def validate_stages(stages: List[Stage]) -> None:
+    names = [stage.name for stage in stages]
+    if len(names) != len(set(names)):
+        raise ValueError("Duplicate stage names in pipeline")
+
+    known = set(names)
+    for stage in stages:
+        missing = [dep for dep in stage.depends_on if dep not in known]
+        if missing:
+            raise ValueError(f"Stage {stage.name} depends on unknown stages: {missing}")
+
+    # Kahn's algorithm: anything left over sits on a cycle
+    indegree = {stage.name: len(stage.depends_on) for stage in stages}
+    dependents: Dict[str, List[str]] = {name: [] for name in names}
+    for stage in stages:
+        for dep in stage.depends_on:
+            dependents[dep].append(stage.name)
+
+    queue = [name for name, degree in indegree.items() if degree == 0]
+    visited = 0
+    while queue:
+        name = queue.pop()
+        visited += 1
+        for child in dependents[name]:
+            indegree[child] -= 1
+            if indegree[child] == 0:
+                queue.append(child)
+
+    if visited != len(stages):
+        raise ValueError("Pipeline stages contain a dependency cycle")
+
+# ========== Stage Execution ==========
+
+def _run_stage(stage: Stage, manifest: Optional[Dict[str, dict]], jsons_dir: str) -> Tuple[str, float, Optional[str]]:
+    fingerprint = None
+    if manifest is not None and not stage.always_run:
+        # Dependencies have finished, so the inputs on disk are final
+        fingerprint = stage_manifest.stage_fingerprint(stage.module, stage.inputs, jsons_dir, stage.code_modules)
+        if stage_manifest.is_up_to_date(manifest, stage.name, fingerprint, stage.outputs, jsons_dir):
+            return UP_TO_DATE, 0.0, fingerprint
+
+    print(f"Running agent: {stage.name}")
+    started = time.perf_counter()
+    # An agent's main() returns False when it saved only part of its results
+    finished = stage.load()()
+    return PARTIAL if finished is False else COMPLETED, time.perf_counter() - started, fingerprint
+
+def run_pipeline(
+    stages: Optional[List[Stage]] = None,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    incremental: bool = True,
+    manifest_path: Optional[str] = None,
+    jsons_dir: Optional[str] = None
+) -> Dict[str, str]:
+    """
+    Runs the agent stages in-process, starting each one as soon as all of
+    its dependencies have completed. A failed stage skips everything
+    downstream of it while independent branches keep running.
+
+    With incremental=True, a stage whose code and decrypted inputs match
+    the fingerprint recorded in the manifest after its last successful
+    run is not executed again. A partial run records no fingerprint, so
+    the next run resumes it (agents reuse the results they already saved).
+
+    The run's LLM calls are summarised into LLM_METRICS_FILENAME.
+
+    Returns:
+        dict: stage name -> "completed" | "partial" | "up_to_date" | "failed" | "skipped"
+    """
+    stages = AGENT_STAGES if stages is None else stages
+    validate_stages(stages)
+    manifest_path = manifest_path or stage_manifest.MANIFEST_PATH
+    jsons_dir = jsons_dir or stage_manifest.JSONS_DIR
+
+    if not _pipeline_lock.acquire(blocking=False):
+        print("Agent pipeline already running. Skipping this run.")
+        return {}
+
+    try:
+        manifest = stage_manifest.load_manifest(manifest_path) if incremental else None
+        status: Dict[str, str] = {}
+        started_at = int(time.time() * 1000)
+        llm_metrics.registry.reset()
+        pending = {stage.name: stage for stage in stages}
+
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            running = {}
+            while pending or running:
+                progressed = True
+                while progressed:
+                    progressed = False
+                    for name, stage in list(pending.items()):
+                        dep_states = [status.get(dep) for dep in stage.depends_on]
+                        if any(state in (FAILED, SKIPPED) for state in dep_states):
+                            print(f"{name} skipped: an upstream stage did not complete.")
+                            status[name] = SKIPPED
+                            del pending[name]
+                            progressed = True
+                        elif all(state in SATISFIED for state in dep_states):
+                            running[pool.submit(_run_stage, stage, manifest, jsons_dir)] = name
+                            del pending[name]
+
+                if not running:
+                    break
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        state, elapsed, fingerprint = future.result()
+                        status[name] = state
+                        if state == UP_TO_DATE:
+                            print(f"{name} inputs unchanged. Skipping.")
+                        elif state == PARTIAL:
+                            print(f"{name} saved partial results in {elapsed:.1f}s; the next run resumes it.")
+                        else:
+                            print(f"{name} completed successfully in {elapsed:.1f}s.")
+                        if manifest is not None and fingerprint is not None and state == COMPLETED:
+                            manifest[name] = {"fingerprint": fingerprint, "completed_at": int(time.time() * 1000)}
+                            stage_manifest.save_manifest(manifest, manifest_path)
+                        elif manifest is not None and state == PARTIAL and manifest.pop(name, None) is not None:
+                            stage_manifest.save_manifest(manifest, manifest_path)
+                    except Exception:
+                        status[name] = FAILED
+                        print(f"{name} failed. Skipping dependent stages.")
+                        traceback.print_exc()
+                        # Its outputs may be half-written, so never trust the old fingerprint again
+                        if manifest is not None and manifest.pop(name, None) is not None:
+                            stage_manifest.save_manifest(manifest, manifest_path)
+
+        summary = llm_metrics.registry.write_summary(
+            os.path.join(jsons_dir, LLM_METRICS_FILENAME), started_at=started_at, stages=status
+        )
+        overall = summary["overall"]
+        print(f"LLM calls: {overall['network_calls']} sent, {overall['cache_hits']} cached, "
+              f"{overall['prompt_tokens'] + overall['completion_tokens']} tokens, "
+              f"{overall['latency_seconds']['total']:.1f}s")
+        return status
+    finally:
+        _pipeline_lock.release()
+
+if __name__ == "__main__":
+    run_pipeline()
@@ -0,0 +1,146 @@
+# hushh_mcp/ratelimit.py
+
+import random
+import threading
+import time
+
+# ========== Token Bucket ==========
+
+class TokenBucket:
+    """
+    Thread-safe token bucket. `rate` tokens are added per second up to
+    `capacity`; acquire() blocks until enough tokens are available.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        if rate <= 0 or capacity <= 0:
+            raise ValueError("TokenBucket rate and capacity must be positive")
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self, amount: float = 1) -> bool:
+        with self._lock:
+            self._refill()
+            if self._tokens >= amount:
+                self._tokens -= amount
+                return True
+            return False
+
+    def acquire(self, amount: float = 1) -> None:
+        # Requests larger than the bucket would never fit; cap them at a full bucket
+        amount = min(amount, self.capacity)
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return
+                wait = (amount - self._tokens) / self.rate
+            time.sleep(wait)
+
+# ========== Backoff ==========
+
+def backoff_delay(attempt: int, base: float = 1.0, cap: float = 32.0) -> float:
+    # "Full jitter": spreads retries from many workers instead of retrying in lockstep
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+# ========== Adaptive Concurrency ==========
+
+class AdaptiveConcurrency:
+    """
+    Concurrency limit that grows by one after each clean call and halves
+    whenever a call is throttled (additive increase, multiplicative decrease).
+    """
+
+    def __init__(self, max_limit: int, min_limit: int = 1, initial: int = None):
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.limit = min(self.max_limit, max(self.min_limit, initial or self.max_limit))
+        self.in_flight = 0
+        self.successes = 0
+        self.throttled = 0
+        self._cond = threading.Condition()
+
+    def acquire(self) -> None:
+        with self._cond:
+            while self.in_flight >= self.limit:
+                self._cond.wait()
+            self.in_flight += 1
+
+    def release(self, throttled: bool = False) -> None:
+        with self._cond:
+            self.in_flight -= 1
+            if throttled:
+                self.throttled += 1
+                self.limit = max(self.min_limit, self.limit // 2)
+            else:
+                self.successes += 1
+                self.limit = min(self.max_limit, self.limit + 1)
+            self._cond.notify_all()
+
+    @property
+    def error_rate(self) -> float:
+        total = self.successes + self.throttled
+        return self.throttled / total if total else 0.0
+
+# ========== Circuit Breaker ==========
+
+class CircuitOpenError(Exception):
+    pass
+
+class CircuitBreaker:
+    """
+    Fails fast while a dependency is down. After `failure_threshold`
+    consecutive failures the circuit opens and allow() refuses calls for
+    `reset_timeout` seconds. Then a single trial call is let through
+    (half-open): success closes the circuit, failure opens it again.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 60.0):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if time.monotonic() - self._opened_at < self.reset_timeout:
+                return "open"
+            return "half_open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.reset_timeout or self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self._trial_in_flight or (self._opened_at is None and self.failures >= self.failure_threshold):
+                self.opened += 1
+                self._opened_at = time.monotonic()
+            self._trial_in_flight = False
@@ -127,31 +127,7 @@ def auth_google():
 @app.route('/auth/google/callback')
 def auth_google_callback():
     import threading
-    import subprocess
-
-    def run_agent_pipeline():
-        agent_cmds = [
-            ["python", "-m", "hushh_mcp.agents.gmail_reader_agent"],
-            ["python", "-m", "hushh_mcp.agents.receipt_agent"],
-            ["python", "-m", "hushh_mcp.agents.context_agent"],
-            ["python", "-m", "hushh_mcp.agents.cost_agent"],
-            ["python", "-m", "hushh_mcp.agents.calender_reader_agent"],
-            ["python", "-m", "hushh_mcp.agents.aggregator_agent"],
-            ["python", "-m", "hushh_mcp.agents.usage_agent"]
-        ]
-        for cmd in agent_cmds:
-            agent_name = cmd[-1].split(".")[-1]
-            print(f"Running agent: {agent_name}")
-            try:
-                # Wait for each agent to finish before starting the next
-                result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-                print(f"{agent_name} completed successfully.")
-                print(result.stdout)
-            except subprocess.CalledProcessError as e:
-                print(f"{agent_name} failed. Stopping pipeline.")
-                print(e.stdout)
-                print(e.stderr)
-                break
+    from hushh_mcp.pipeline.runner import run_pipeline as run_agent_pipeline
 
     state = session.get('state')
     flow = Flow.from_client_secrets_file(
@@ -209,13 +185,12 @@ def auth_google_callback():
     def schedule_pipeline():
         import time
         while True:
+            time.sleep(7 * 24 * 60 * 60)  # 7 days in seconds
             try:
-                # Only run pipeline if usage.json does not exist
-                if not os.path.exists(usage_path):
-                    threading.Thread(target=run_agent_pipeline, daemon=True).start()
+                # Incremental run: only stages whose inputs changed since last week execute
+                threading.Thread(target=run_agent_pipeline, daemon=True).start()
             except Exception as e:
                 print("Scheduled pipeline error:", e)
-            time.sleep(7 * 24 * 60 * 60)  # 7 days in seconds
 
     # Start scheduler thread only once (on first login)
     if not hasattr(app, "_pipeline_scheduler_started"):
@@ -366,8 +341,9 @@ def driver_monitor():
             print("❌ Driver watcher error:", e)
             time.sleep(5)
 
-# Start driver monitoring in background
-threading.Thread(target=driver_monitor, daemon=True).start()
-
 if __name__ == "__main__":
+    # Started only by the real entry point: spawned worker processes (e.g. the receipt
+    # parser's process pool) re-import this module as __mp_main__ and must not start a
+    # second monitor writing driver.json
+    threading.Thread(target=driver_monitor, daemon=True).start()
     app.run(host="127.0.0.1", port=5000, debug=True)
@@ -0,0 +1,157 @@
+# hushh_mcp/vault/lru_cache.py
+
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+from hushh_mcp.vault.json_vault import load_encrypted_json, save_encrypted_json
+
+# ========== Encrypted LRU Cache ==========
+
+class EncryptedLRUCache:
+    """
+    Persistent key/value cache stored as a single vault-encrypted JSON file.
+    Entries are evicted least-recently-used first once either max_entries or
+    max_bytes (measured on the serialised values) is exceeded. With a `ttl`
+    (seconds), entries older than that are treated as missing. A cache file
+    written under a different `version` is discarded on load.
+    """
+
+    def __init__(self, path: str, max_entries: int = 5000, max_bytes: Optional[int] = None, version: str = "1",
+                 ttl: Optional[float] = None):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.version = version
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._entries: "OrderedDict[str, Any]" = OrderedDict()
+        self._sizes = {}
+        self._stored_at = {}
+        self._bytes = 0
+        self._dirty = False
+        self._lock = threading.RLock()
+        self._load()
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        try:
+            data = load_encrypted_json(self.path)
+        except Exception:
+            # An unreadable cache is just a cold cache
+            return
+        if not isinstance(data, dict) or data.get("version") != self.version:
+            return
+        now = time.time()
+        for entry in data.get("entries", []):
+            # Files written before entries carried a timestamp count as stored now
+            stored_at = entry[2] if len(entry) > 2 else now
+            if not self._expired(stored_at, now):
+                self._store(entry[0], entry[1], stored_at)
+        self._evict()
+
+    def _expired(self, stored_at: float, now: float) -> bool:
+        return self.ttl is not None and now - stored_at > self.ttl
+
+    def _store(self, key: str, value: Any, stored_at: Optional[float] = None) -> None:
+        if key in self._entries:
+            self._bytes -= self._sizes[key]
+        size = len(json.dumps(value, ensure_ascii=False))
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        self._sizes[key] = size
+        self._stored_at[key] = time.time() if stored_at is None else stored_at
+        self._bytes += size
+
+    def _remove(self, key: str) -> None:
+        del self._entries[key]
+        self._bytes -= self._sizes.pop(key)
+        self._stored_at.pop(key, None)
+
+    def _evict(self) -> None:
+        while self._entries and (
+            len(self._entries) > self.max_entries
+            or (self.max_bytes is not None and self._bytes > self.max_bytes)
+        ):
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+            self._dirty = True
+
+    # ---------- Public API ----------
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            if key in self._entries and self._expired(self._stored_at[key], time.time()):
+                self._remove(key)
+                self.expirations += 1
+                self._dirty = True
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            return default
+
+    def put(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._store(key, value)
+            self._dirty = True
+            self._evict()
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+                self._dirty = True
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self._stored_at.clear()
+            self._bytes = 0
+            self._dirty = True
+
+    def items(self) -> list:
+        # Snapshot for bulk reads; does not count as use for LRU or hit stats
+        with self._lock:
+            now = time.time()
+            return [(key, value) for key, value in self._entries.items()
+                    if not self._expired(self._stored_at[key], now)]
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
+
+    def save(self) -> None:
+        with self._lock:
+            if not self._dirty:
+                return
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            save_encrypted_json({
+                "version": self.version,
+                "entries": [[key, value, self._stored_at[key]] for key, value in self._entries.items()]
+            }, self.path)
+            self._dirty = False
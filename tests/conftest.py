@@ -0,0 +1,40 @@
+import pytest
+
+from hushh_mcp import llm, llm_metrics
+
+
+@pytest.fixture(autouse=True)
+def isolated_llm_cache(tmp_path, monkeypatch):
+    # Cached LLM replies and call metrics must neither leak between tests nor land in the real jsons directory
+    monkeypatch.setattr(llm, "LLM_CACHE_FILE", str(tmp_path / "llm_cache.json"))
+    llm.reset_response_cache()
+    llm_metrics.registry.reset()
+    yield
+    llm.reset_response_cache()
+    llm_metrics.registry.reset()
+
+
+@pytest.fixture(autouse=True)
+def unthrottled_llm_providers(monkeypatch):
+    # Mocked providers need no quota, backoff sleeps or breaker state carried between tests
+    unlimited = {llm.GEMINI: 10 ** 9, llm.GROQ: 10 ** 9}
+    monkeypatch.setattr(llm, "PROVIDER_REQUESTS_PER_MINUTE", unlimited)
+    monkeypatch.setattr(llm, "PROVIDER_TOKENS_PER_MINUTE", unlimited)
+    for provider in unlimited:
+        monkeypatch.delenv(llm.PROVIDER_REQUESTS_ENV.format(provider=provider.upper()), raising=False)
+        monkeypatch.delenv(llm.PROVIDER_TOKENS_ENV.format(provider=provider.upper()), raising=False)
+    monkeypatch.setattr(llm, "LLM_RETRY_BACKOFF_SECONDS", 0.0)
+    llm.reset_provider_controls()
+    yield
+    llm.reset_provider_controls()
+
+
+class DictCache(dict):
+    # Stands in for EncryptedLRUCache where a test only needs get/put and to inspect what was stored
+    def put(self, key, value):
+        self[key] = value
+
+
+@pytest.fixture
+def dict_cache():
+    return DictCache()
@@ -0,0 +1,71 @@
+from hushh_mcp.operons.classify_electronics import ElectronicsClassifier, split_electronics
+from hushh_mcp.vault.lru_cache import EncryptedLRUCache
+
+
+def test_confident_cases_are_decided_offline():
+    classifier = ElectronicsClassifier()
+    assert classifier.classify("Redmi 12 5G Smartphone") is True
+    assert classifier.classify("Atomic Habits (Paperback)") is False
+    # Device and accessory terms conflict; the model settles it
+    assert classifier.classify("Spigen Back Cover for iPhone 14") is False
+    assert classifier.classify("Item XYZ") is None
+    assert classifier.sources == {"lexicon": 2, "model": 1, "uncertain": 1}
+
+
+def test_accessories_named_after_devices_are_not_electronic():
+    classifier = ElectronicsClassifier()
+    for name in ["Gaming Mouse Pad XL", "Canon Printer Ink Cartridge", "Logitech Keyboard Wrist Rest",
+                 "HP Printer Paper", "Wooden Monitor Riser", "Digitek Camera Tripod"]:
+        assert classifier.classify(name) is not True, name
+
+
+def test_lexicon_hit_the_model_disagrees_with_is_escalated():
+    classifier = ElectronicsClassifier()
+    # "monitor" is a device term, but the model leans towards an accessory
+    classifier.model.predict_proba = lambda name: 0.2
+    assert classifier.classify("Dell 27 Monitor") is None
+    assert classifier.sources == {"uncertain": 1}
+
+
+def test_powered_items_are_never_rejected_offline():
+    classifier = ElectronicsClassifier()
+    for name in ["Oil Filled Room Heater", "Remote Control Car Toy Rechargeable", "Milton Electric Lunch Box"]:
+        assert classifier.classify(name) is None, name
+    # Even a confident model does not reject an accessory hit that names a power source
+    classifier.model.predict_proba = lambda name: 0.01
+    assert classifier.classify("Milton Electric Lunch Box 3 Containers") is None
+
+
+def test_lexicon_rejection_needs_a_confident_model():
+    classifier = ElectronicsClassifier()
+    classifier.model.predict_proba = lambda name: 0.3
+    assert classifier.classify("Milton Steel Lunch Box") is None
+    classifier.model.predict_proba = lambda name: 0.05
+    assert classifier.classify("Milton Steel Lunch Box") is False
+    assert classifier.sources == {"uncertain": 1, "lexicon": 1}
+
+
+def test_split_preserves_order_and_drops_non_electronics():
+    products = [
+        {"itemname": "Logitech M235 Wireless Mouse"},
+        {"itemname": "Levi's Slim Fit Jeans"},
+        {"itemname": "Item XYZ"},
+        {"itemname": "JBL Flip 5 Speaker"},
+    ]
+    electronic, uncertain = split_electronics(products, ElectronicsClassifier())
+    assert [p["itemname"] for p in electronic] == ["Logitech M235 Wireless Mouse", "JBL Flip 5 Speaker"]
+    assert uncertain == [{"itemname": "Item XYZ"}]
+
+
+def test_llm_labels_are_cached_and_learned(tmp_path):
+    path = str(tmp_path / "electronics_cache.json")
+    classifier = ElectronicsClassifier(EncryptedLRUCache(path))
+    assert classifier.classify("Zebronics Zeb Thunder") is None
+    classifier.record("Zebronics Zeb-Thunder", True)
+    classifier.cache.save()
+
+    reloaded = ElectronicsClassifier(EncryptedLRUCache(path))
+    assert reloaded.classify("ZEBRONICS zeb thunder") is True
+    assert reloaded.sources == {"cache": 1}
+    # The LLM label also became training data for the offline model
+    assert reloaded.model.predict_proba("zebronics") > 0.5
@@ -35,18 +35,21 @@ def test_build_prompt_contains_fields(sample_product):
     assert "ONLY WANT JSON" in prompt or "DONT WRITE ANYTHING ELSE" in prompt
 
 # --------- TEST: call_groq() ---------
-def test_call_groq_returns_response(monkeypatch):
+def test_call_groq_returns_reply_text(monkeypatch):
     dummy_response = MagicMock()
     dummy_response.choices = [MagicMock()]
     dummy_response.choices[0].message.content = '{"id":101,"price":"15000"}'
 
     # Patch the client.chat.completions.create method to return dummy_response
-    monkeypatch.setattr(context_agent.client.chat.completions, "create", lambda **kwargs: dummy_response)
+    create = MagicMock(return_value=dummy_response)
+    monkeypatch.setattr(context_agent.client.chat.completions, "create", create)
 
     prompt = "dummy prompt"
-    response = context_agent.call_groq(prompt)
-    assert hasattr(response, "choices")
-    assert response.choices[0].message.content == '{"id":101,"price":"15000"}'
+    assert context_agent.call_groq(prompt) == '{"id":101,"price":"15000"}'
+    # The same prompt again is answered from the LLM cache
+    assert context_agent.call_groq(prompt) == '{"id":101,"price":"15000"}'
+    create.assert_called_once()
+    assert create.call_args.kwargs["model"] == context_agent.MODEL
 
 # --------- TEST: main() ---------
 def test_main_flow(monkeypatch, tmp_path, sample_product, sample_response_json):
@@ -66,12 +69,9 @@ def test_main_flow(monkeypatch, tmp_path, sample_product, sample_response_json):
         with open(path, "w") as f:
             json.dump(data, f)
 
-    # Fake Groq call returns valid JSON string of sample_response_json
+    # Fake Groq call returns the reply text: valid JSON of sample_response_json
     def fake_call_groq(prompt):
-        class DummyResp:
-            choices = [MagicMock()]
-            choices[0].message.content = json.dumps(sample_response_json)
-        return DummyResp()
+        return json.dumps(sample_response_json)
 
     monkeypatch.setattr(context_agent, "load_encrypted_json", fake_load)
     monkeypatch.setattr(context_agent, "save_encrypted_json", fake_save)
@@ -107,10 +107,7 @@ def test_main_invalid_json(monkeypatch, tmp_path, sample_product):
 
     # Groq returns invalid JSON string
     def fake_call_groq(prompt):
-        class DummyResp:
-            choices = [MagicMock()]
-            choices[0].message.content = "Not a JSON string"
-        return DummyResp()
+        return "Not a JSON string"
 
     monkeypatch.setattr(context_agent, "load_encrypted_json", fake_load)
     monkeypatch.setattr(context_agent, "save_encrypted_json", fake_save)
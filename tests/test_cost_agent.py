@@ -116,3 +116,85 @@ def test_main_flow(monkeypatch, tmp_path, sample_product, sample_response_json):
         data = json.load(f)
         assert data[0]["id"] == "123"
         assert "price_range" in data[0]
+
+# ✅ TEST: cost_agent.main reuses valuations for unchanged product ids
+def test_main_reuses_previous_valuations(monkeypatch, tmp_path, sample_response_json):
+    output_path = tmp_path / "resale_cost.json"
+    output_path.write_text("[]")
+    monkeypatch.setattr(cost_agent, "OUTPUT_FILE", str(output_path))
+
+    products = [{"id": "old", "itemname": "Redmi Note 10"}, {"id": "new", "itemname": "Pixel 7"}]
+    previous = [{"id": "old", "itemname": "Redmi Note 10", "price_range": "4000 to 5000 INR"}]
+    monkeypatch.setattr(cost_agent, "load_encrypted_json", lambda path: previous if path == str(output_path) else products)
+
+    saved = {}
+    monkeypatch.setattr(cost_agent, "save_encrypted_json", lambda data, path: saved.update(data=data))
+    prompts = []
+    monkeypatch.setattr(cost_agent, "call_gemini", lambda prompt: prompts.append(prompt) or json.dumps(sample_response_json))
+
+    cost_agent.main()
+
+    assert len(prompts) == 1 and "Pixel 7" in prompts[0]
+    assert [entry["id"] for entry in saved["data"]] == ["old", "new"]
+    assert saved["data"][0] == previous[0]
+
+# ✅ TEST: cost_agent.main values products concurrently but saves them in input order
+def test_main_concurrent_valuations_keep_order(monkeypatch, sample_response_json):
+    import time
+    products = [{"id": str(i), "itemname": f"Phone {i}"} for i in range(6)]
+    monkeypatch.setattr(cost_agent, "VALUATION_BATCH_MAX_PRODUCTS", 1)  # one product per request
+    monkeypatch.setattr(cost_agent, "OUTPUT_FILE", "/nonexistent/resale_cost.json")
+    monkeypatch.setattr(cost_agent, "load_encrypted_json", lambda path: products)
+    saved = {}
+    monkeypatch.setattr(cost_agent, "save_encrypted_json", lambda data, path: saved.update(data=data))
+
+    def fake_call_gemini(prompt):
+        index = int(prompt.split("Phone ")[1][0])
+        time.sleep(0.01 * (6 - index))  # later products finish first
+        if index == 2:
+            raise RuntimeError("boom")
+        return json.dumps(sample_response_json)
+
+    monkeypatch.setattr(cost_agent, "call_gemini", fake_call_gemini)
+    cost_agent.main()
+
+    # Product 2 failed on its own; the rest are saved in their original order
+    assert [entry["id"] for entry in saved["data"]] == ["0", "1", "3", "4", "5"]
+
+# ✅ TEST: cost_agent.main batches products and re-queues the ones a reply left out
+def test_main_batches_and_requeues_missing_products(monkeypatch, sample_response_json):
+    products = [{"id": f"p{i}", "itemname": f"Phone {i}", "price": 10000 + i} for i in range(5)]
+    monkeypatch.setattr(cost_agent, "OUTPUT_FILE", "/nonexistent/resale_cost.json")
+    monkeypatch.setattr(cost_agent, "load_encrypted_json", lambda path: products)
+    saved = {}
+    monkeypatch.setattr(cost_agent, "save_encrypted_json", lambda data, path: saved.update(data=data))
+
+    prompts = []
+
+    def fake_call_gemini(prompt, accept=None):
+        prompts.append(prompt)
+        if "EACH second-hand product" in prompt:
+            # The batch reply skips p3 and invents an id that is not in the batch
+            reply = [dict(sample_response_json, id=f"p{i}") for i in (4, 0, 1, 2)]
+            return "```json\n" + json.dumps(reply + [dict(sample_response_json, id="zzz")]) + "\n```"
+        return json.dumps(sample_response_json)
+
+    monkeypatch.setattr(cost_agent, "call_gemini", fake_call_gemini)
+    cost_agent.main()
+
+    assert len(prompts) == 2
+    assert all(f'"id":"p{i}"' in prompts[0] for i in range(5))
+    assert '"id": "p3"' in prompts[1]  # re-queued with the single-product prompt
+    assert [entry["id"] for entry in saved["data"]] == ["p0", "p1", "p2", "p3", "p4"]
+    assert saved["data"][0] == dict(sample_response_json, id="p0", itemname="Phone 0")
+
+
+# ✅ TEST: cost_agent.batch_products respects the token budget and the product cap
+def test_batch_products_respects_budget_and_cap(monkeypatch):
+    products = [{"id": str(i), "itemname": "Phone " * 20} for i in range(10)]
+    monkeypatch.setattr(cost_agent, "VALUATION_BATCH_MAX_PRODUCTS", 4)
+    assert [len(batch) for batch in cost_agent.batch_products(products)] == [4, 4, 2]
+
+    line_tokens = cost_agent.llm.estimate_tokens(cost_agent.serialise_for_valuation(products[0]))
+    monkeypatch.setattr(cost_agent, "VALUATION_BATCH_TOKEN_BUDGET", line_tokens * 3)
+    assert [len(batch) for batch in cost_agent.batch_products(products)] == [3, 3, 3, 1]
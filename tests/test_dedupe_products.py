@@ -0,0 +1,83 @@
+from hushh_mcp.operons.dedupe_products import LLM_CALLS_PER_PRODUCT, collapse_near_duplicates
+from hushh_mcp.operons.product_identity import product_id
+
+
+def product(name, price, day, platform="amazon", **reference):
+    return {"itemname": name, "price": price, "purchase_date": day, "platform": platform, **reference}
+
+
+def test_shipped_and_delivered_mails_collapse():
+    products = [
+        product("boAt Rockerz 450 Bluetooth Headphones", 1499, "2023-01-04"),
+        product("Logitech M235 Wireless Mouse", 595, "2023-01-02"),
+        product("Boat Rockerz 450 Bluetooth Headphones (Black)", 1499, "2023-01-01"),
+    ]
+    collapsed, stats = collapse_near_duplicates(products)
+    assert collapsed == [
+        product("Boat Rockerz 450 Bluetooth Headphones (Black)", 1499, "2023-01-01"),
+        product("Logitech M235 Wireless Mouse", 595, "2023-01-02"),
+    ]
+    assert stats == {"merged": 1, "llm_calls_saved": LLM_CALLS_PER_PRODUCT}
+
+
+def test_distinct_purchases_are_kept():
+    products = [
+        product("boAt Rockerz 450 Bluetooth Headphones", 1499, "2023-01-01"),
+        # Bought again months later
+        product("boAt Rockerz 450 Bluetooth Headphones", 1499, "2023-06-01"),
+        # Same name on another platform
+        product("boAt Rockerz 450 Bluetooth Headphones", 1499, "2023-01-02", "flipkart"),
+        # Similar name, different price
+        product("boAt Rockerz 450 Pro Bluetooth Headphones", 2499, "2023-01-02"),
+    ]
+    collapsed, stats = collapse_near_duplicates(products)
+    assert collapsed == products
+    assert stats["merged"] == 0
+
+
+def test_missing_price_does_not_bridge_different_products():
+    products = [
+        product("Apple AirPods (2nd generation)", 12900, "2023-03-01", "flipkart"),
+        product("Apple AirPods (2nd generation)", 0, "2023-03-05", "flipkart"),
+        product("Apple AirPods Pro (2nd generation)", 24900, "2023-03-05", "flipkart"),
+    ]
+    collapsed, stats = collapse_near_duplicates(products)
+    assert [p["price"] for p in collapsed] == [12900, 24900]
+    assert stats["merged"] == 1
+
+
+def test_merged_name_and_id_come_from_the_earliest_mail():
+    first = product("boAt Rockerz 450 Bluetooth Headphones", 1499, "2023-01-01")
+    products = [first, product("Boat Rockerz 450 Bluetooth Headphones (Black)", 1499, "2023-01-04")]
+    collapsed, _ = collapse_near_duplicates(products)
+    assert collapsed == [first]
+    assert product_id(collapsed[0]) == product_id(first)
+
+
+def test_separate_orders_are_not_merged():
+    name = "boAt Rockerz 450 Bluetooth Headphones"
+    different_orders = [
+        product(name, 1499, "2023-01-01", order_id="403-1111111-1111111"),
+        product(name, 1499, "2023-01-03", order_id="403-2222222-2222222"),
+    ]
+    assert collapse_near_duplicates(different_orders)[1]["merged"] == 0
+
+    two_confirmations = [
+        product(name, 1499, "2023-01-01", order_confirmation=True),
+        product(name, 1499, "2023-01-03", order_confirmation=True),
+    ]
+    assert collapse_near_duplicates(two_confirmations)[1]["merged"] == 0
+
+
+def test_confirmation_and_shipping_mails_of_one_order_merge():
+    products = [
+        product("boAt Rockerz 450 Bluetooth Headphones", 1499, "2023-01-01",
+                order_id="403-1111111-1111111", order_confirmation=True),
+        product("boAt Rockerz 450 Bluetooth Headphones", 1499, "2023-01-03", order_confirmation=False),
+        product("boAt Rockerz 450 Bluetooth Headphones", 1499, "2023-01-05",
+                order_id="403-1111111-1111111", order_confirmation=False),
+    ]
+    collapsed, stats = collapse_near_duplicates(products)
+    assert collapsed == [products[0]]
+    assert stats["merged"] == 2
+
@@ -0,0 +1,50 @@
+import base64
+from hushh_mcp.operons.extract_email_text import (
+    HtmlTextStripper,
+    extract_email_text,
+    iter_decoded_chunks,
+    strip_html,
+)
+
+
+def encode(text):
+    return base64.urlsafe_b64encode(text.encode("utf-8")).decode()
+
+
+def test_prefers_plain_text_anywhere_in_the_tree():
+    payload = {
+        "mimeType": "multipart/mixed",
+        "parts": [
+            {"mimeType": "text/html", "body": {"data": encode("<p>HTML version</p>")}},
+            {
+                "mimeType": "multipart/alternative",
+                "parts": [{"mimeType": "text/plain", "body": {"data": encode("Plain   version\n")}}],
+            },
+        ],
+    }
+    assert extract_email_text(payload) == ("Plain version", "plain")
+
+
+def test_html_is_stripped_and_normalised_in_one_pass():
+    html = "<html><style>td{color:red}</style><body><td>Boat  Rockerz</td>\n<td>Rs. 1,299</td><!-- x --></body></html>"
+    payload = {"mimeType": "text/html", "body": {"data": encode(html)}}
+    assert extract_email_text(payload) == ("Boat Rockerz Rs. 1,299", "html")
+
+
+def test_missing_body_returns_none_kind():
+    payload = {"mimeType": "multipart/mixed", "parts": [{"mimeType": "image/png", "body": {"attachmentId": "a"}}]}
+    assert extract_email_text(payload) == ("", None)
+
+
+def test_decoding_stops_at_byte_budget():
+    text = "₹" * 1000  # 3 bytes each in UTF-8
+    chunks = list(iter_decoded_chunks(encode(text), max_bytes=300))
+    assert "".join(chunks) == "₹" * 100
+
+
+def test_stripper_handles_tags_split_across_chunks():
+    html = "<div>Order <b>#123</b></div><script>var a = '<b>';</script><p>Total &amp; tax</p>"
+    stripper = HtmlTextStripper(unescape_entities=True)
+    for i in range(0, len(html), 4):
+        stripper.feed(html[i:i + 4])
+    assert stripper.close() == strip_html(html, unescape_entities=True) == "Order #123 Total & tax"
@@ -0,0 +1,154 @@
+import pytest
+from hushh_mcp.operons import extract_receipt_data
+from hushh_mcp.operons.extract_receipt_data import detect_platform, extract_receipt, extract_receipts, extract_receipts_cached, register_extractor
+
+DATE = "Wed, 01 Jan 2023 10:00:00 +0530"
+
+
+@pytest.mark.parametrize("sender,platform", [
+    ("Amazon.in <auto-confirm@amazon.in>", "amazon"),
+    ("shipment-tracking@amazon.in", "amazon"),
+    ("Croma <orders@mail.croma.com>", "croma"),
+    ("Flipkart <noreply@flipkart.com>", "flipkart"),
+    ("Amazon <no-reply@example.net>", "amazon"),
+    ("news@example.com", None),
+])
+def test_detect_platform_uses_sender_domain(sender, platform):
+    assert detect_platform({"from": sender}) == platform
+
+
+def test_amazon_modern_strategy():
+    email = {
+        "from": "auto-confirm@amazon.in",
+        "subject": "Your Amazon.in order",
+        "date": DATE,
+        "body": "<p>* boAt Rockerz 450 Quantity: 1 1,499.00 INR</p>",
+    }
+    result = extract_receipt(email)
+    assert result["strategy"] == "modern"
+    assert result["items"] == [{
+        "itemname": "boAt Rockerz 450", "price": 1499, "purchase_date": "2023-01-01", "platform": "amazon"
+    }]
+
+
+def test_amazon_subject_fallback_and_placeholder():
+    shipped = {
+        "from": "shipment-tracking@amazon.in",
+        "subject": 'Shipped: "Logitech C270 Webcam"',
+        "date": DATE,
+        "body": "Your package total Rs. 1,995.00",
+    }
+    result = extract_receipt(shipped)
+    assert result["strategy"] == "subject_fallback"
+    assert result["items"][0]["itemname"] == "Logitech C270 Webcam"
+    assert result["items"][0]["price"] == 1995
+
+    empty = dict(shipped, subject="Your order", body="nothing useful")
+    result = extract_receipt(empty)
+    assert result["strategy"] == "placeholder"
+    assert result["items"][0]["price"] == 0
+
+
+def test_croma_invoice_table():
+    email = {
+        "from": "orders@croma.com",
+        "date": DATE,
+        "body": "Item Description Tax Code Qty. Rate Amount 1 Sony WH-1000XM4 85183000 24990.00 24990.00",
+    }
+    result = extract_receipt(email)
+    assert result["strategy"] == "invoice_table"
+    assert result["items"][0]["itemname"] == "Sony WH-1000XM4"
+    assert result["items"][0]["price"] == 24990
+
+
+def test_flipkart_is_parsed():
+    email = {
+        "from": "Flipkart <noreply@flipkart.com>",
+        "subject": "Your Flipkart Order for Apple AirPods (2nd gen) has been delivered",
+        "date": DATE,
+        "body": "<div>Hi, your item was delivered.</div><div>Amount Paid: ₹9,999</div>",
+    }
+    result = extract_receipt(email)
+    assert result["platform"] == "flipkart"
+    assert result["strategy"] == "subject_fallback"
+    assert result["items"][0]["itemname"] == "Apple AirPods (2nd gen)"
+    assert result["items"][0]["price"] == 9999
+
+
+def test_registered_extractor_is_dispatched_by_domain(monkeypatch):
+    monkeypatch.setattr(extract_receipt_data, "EXTRACTORS", dict(extract_receipt_data.EXTRACTORS))
+    monkeypatch.setattr(extract_receipt_data, "SENDER_DOMAINS", dict(extract_receipt_data.SENDER_DOMAINS))
+
+    @register_extractor("reliance", ("reliancedigital.in",))
+    def extract_reliance(email):
+        return [{"itemname": "TV", "price": 1, "purchase_date": None, "platform": "reliance"}], "stub"
+
+    result = extract_receipt({"from": "orders@mail.reliancedigital.in"})
+    assert result == {"platform": "reliance", "strategy": "stub", "items": [
+        {"itemname": "TV", "price": 1, "purchase_date": None, "platform": "reliance"}
+    ]}
+
+
+def make_amazon_emails(count):
+    return [{
+        "from": "auto-confirm@amazon.in",
+        "subject": "Your Amazon.in order",
+        "date": DATE,
+        "body": f"<p>* Gadget {i} Quantity: 1 {i + 100}.00 INR</p>",
+    } for i in range(count)]
+
+
+def test_small_inputs_are_parsed_serially(monkeypatch):
+    def no_pool(*args, **kwargs):
+        raise AssertionError("no process pool expected for small inputs")
+
+    monkeypatch.setattr(extract_receipt_data, "ProcessPoolExecutor", no_pool)
+    emails = make_amazon_emails(5)
+    assert extract_receipts(emails, workers=4) == [extract_receipt(e) for e in emails]
+
+
+def test_process_pool_preserves_email_order():
+    emails = make_amazon_emails(23)
+    results = extract_receipts(emails, workers=2, chunk_size=4, min_parallel=0)
+    assert [r["items"][0]["itemname"] for r in results] == [f"Gadget {i}" for i in range(23)]
+    assert results == [extract_receipt(e) for e in emails]
+
+
+def test_cached_extraction_only_parses_new_or_changed_emails(monkeypatch, dict_cache):
+    emails = [dict(e, id=f"m{i}") for i, e in enumerate(make_amazon_emails(3))]
+    emails.append({"id": "f1", "from": "noreply@flipkart.com", "subject": "Delivered: Mi Smart Band 7",
+                   "date": DATE, "body": "Order Total: Rs. 3,499"})
+
+    results, parsed = extract_receipts_cached(emails, dict_cache)
+    assert parsed == 4
+    assert results == [extract_receipt(e) for e in emails]
+
+    emails[1] = dict(emails[1], body="<p>* Gadget 1 Quantity: 1 999.00 INR</p>")
+    results, parsed = extract_receipts_cached(emails, dict_cache)
+    assert parsed == 1
+    assert results[1]["items"][0]["price"] == 999
+
+    # Bumping one extractor's version redoes only that platform's emails
+    flipkart = extract_receipt_data.EXTRACTORS["flipkart"]
+    monkeypatch.setitem(extract_receipt_data.EXTRACTORS, "flipkart",
+                        extract_receipt_data.ReceiptExtractor(flipkart.platform, flipkart.domains, flipkart.extract, "2"))
+    results, parsed = extract_receipts_cached(emails, dict_cache)
+    assert parsed == 1
+    assert results[3]["platform"] == "flipkart"
+
+
+@pytest.mark.parametrize("subject,body,reference", [
+    ("Your Amazon.in order of boAt Rockerz 450", "Order #403-1234567-7654321 placed",
+     {"order_id": "403-1234567-7654321", "order_confirmation": True}),
+    ('Shipped: "boAt Rockerz 450"', "Order 403-1234567-7654321 is on its way",
+     {"order_id": "403-1234567-7654321", "order_confirmation": False}),
+    ("Your Flipkart Order for Mi Smart Band 7 has been delivered", "Order ID: od123456789012345678",
+     {"order_id": "OD123456789012345678", "order_confirmation": False}),
+    ("Invoice", "Order No: CR9912345 Total Amount Paid: 24990.00",
+     {"order_id": "CR9912345", "order_confirmation": False}),
+    ("Order Confirmed - Sony WH-1000XM4", "Order number information below",
+     {"order_id": None, "order_confirmation": True}),
+])
+def test_order_reference(subject, body, reference):
+    assert extract_receipt_data.order_reference({"subject": subject, "body": body}) == reference
+
@@ -1,10 +1,17 @@
-import os
 import base64
+import time
 import pytest
-from datetime import datetime
+from datetime import date, datetime
 from hushh_mcp.agents import gmail_reader_agent
 
 
+@pytest.fixture(autouse=True)
+def isolated_message_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(gmail_reader_agent, "MESSAGE_CACHE_FILE", str(tmp_path / "message_cache.json"))
+    monkeypatch.setattr(gmail_reader_agent, "MESSAGE_HEADER_CACHE_FILE", str(tmp_path / "message_header_cache.json"))
+    return tmp_path / "message_cache.json"
+
+
 @pytest.fixture
 def mock_consent_token_file(tmp_path, monkeypatch):
     token_file = tmp_path / "consent_token.json"
@@ -67,26 +74,518 @@ def test_main(monkeypatch):
     monkeypatch.setattr(gmail_reader_agent, "load_consent_token", lambda: "valid-token")
     monkeypatch.setattr(gmail_reader_agent, "validate_token", lambda token, expected_scope: {"user": "test-user"})
     monkeypatch.setattr(gmail_reader_agent, "authenticate_google", lambda: "mock-service")
-    monkeypatch.setattr(gmail_reader_agent, "get_matching_message_ids", lambda service, query: ["id1"])
+    monkeypatch.setattr(gmail_reader_agent, "get_mailbox_history_id", lambda service: "500")
+    monkeypatch.setattr(gmail_reader_agent, "load_sync_state", lambda: None)
+    monkeypatch.setattr(gmail_reader_agent, "get_matching_message_ids", lambda service, query, **kwargs: ["id1"])
 
-    def mock_extract(service, msg_id):
+    def mock_fetch(service, msg_ids):
         return {
-            "id": msg_id,
-            "from": "noreply@flipkart.com",
-            "subject": "Your item has been delivered",
-            "body": "Delivered to your address."
+            msg_id: {
+                "id": msg_id,
+                "from": "noreply@flipkart.com",
+                "subject": "Your item has been delivered",
+                "body": "Delivered to your address."
+            }
+            for msg_id in msg_ids
         }
 
-    monkeypatch.setattr(gmail_reader_agent, "extract_message_metadata", mock_extract)
+    monkeypatch.setattr(gmail_reader_agent, "fetch_message_headers", mock_fetch)
+    monkeypatch.setattr(gmail_reader_agent, "fetch_messages_metadata", mock_fetch)
 
     captured = {}
 
     def fake_save(data, path):
-        captured["data"] = data
-        captured["path"] = path
+        captured[path] = data
 
     monkeypatch.setattr(gmail_reader_agent, "save_encrypted_json", fake_save)
 
     gmail_reader_agent.main()
-    assert len(captured["data"]) == 1
-    assert "flipkart" in captured["data"][0]["from"]
+    emails = captured[gmail_reader_agent.INPUT_FILE]
+    assert len(emails) == 1
+    assert "flipkart" in emails[0]["from"]
+    assert captured[gmail_reader_agent.SYNC_STATE_FILE]["history_id"] == "500"
+
+
+class FakeBatchService:
+    """Serves messages.get through batch requests, failing listed ids once."""
+
+    def __init__(self, flaky_ids=()):
+        self.flaky_ids = set(flaky_ids)
+        self.batch_sizes = []
+        self.requested = []
+
+    def users(self): return self
+    def messages(self): return self
+
+    def get(self, userId, id, format, **kwargs):
+        return id
+
+    def new_batch_http_request(self, callback):
+        service = self
+
+        class Batch:
+            def __init__(self):
+                self.calls = []
+
+            def add(self, request, request_id):
+                self.calls.append(request_id)
+
+            def execute(self):
+                service.batch_sizes.append(len(self.calls))
+                for msg_id in self.calls:
+                    service.requested.append(msg_id)
+                    if msg_id in service.flaky_ids:
+                        service.flaky_ids.discard(msg_id)
+                        callback(msg_id, None, RuntimeError("429 rate limited"))
+                        continue
+                    callback(msg_id, {
+                        "payload": {
+                            "mimeType": "text/plain",
+                            "body": {"data": base64.urlsafe_b64encode(f"body {msg_id}".encode()).decode()},
+                            "headers": [{"name": "From", "value": "auto-confirm@amazon.in"}]
+                        },
+                        "internalDate": "1000"
+                    }, None)
+
+        return Batch()
+
+
+def test_fetch_messages_metadata_batches_and_retries_failures(monkeypatch):
+    monkeypatch.setattr(gmail_reader_agent.time, "sleep", lambda seconds: None)
+    service = FakeBatchService(flaky_ids={"m3"})
+    ids = [f"m{i}" for i in range(5)]
+
+    with gmail_reader_agent.GmailFetcher(lambda: service, max_workers=1, batch_size=2) as fetcher:
+        results = gmail_reader_agent.fetch_messages_metadata(fetcher, ids)
+
+    assert set(results) == set(ids)
+    assert results["m3"]["body"] == "body m3"
+    assert results["m0"]["from"] == "auto-confirm@amazon.in"
+    # Batches of two; only the failed id is retried, not the rest of its batch
+    assert sorted(service.batch_sizes) == [1, 1, 2, 2]
+    assert service.requested.count("m3") == 2
+    assert service.requested.count("m2") == 1
+    assert fetcher.failed_ids == []
+
+
+def _http_error(status):
+    from googleapiclient.errors import HttpError
+
+    class Resp(dict):
+        reason = "error"
+
+    resp = Resp()
+    resp.status = status
+    return HttpError(resp, b"error")
+
+
+class ErrorBatchService(FakeBatchService):
+    def __init__(self, errors):
+        super().__init__()
+        self.errors = errors
+
+    def new_batch_http_request(self, callback):
+        service = self
+
+        class Batch:
+            def __init__(self):
+                self.calls = []
+
+            def add(self, request, request_id):
+                self.calls.append(request_id)
+
+            def execute(self):
+                for msg_id in self.calls:
+                    service.requested.append(msg_id)
+                    callback(msg_id, None, service.errors[msg_id])
+
+        return Batch()
+
+
+def test_fetcher_retries_transient_errors_and_reports_exhausted_ids(monkeypatch):
+    monkeypatch.setattr(gmail_reader_agent.time, "sleep", lambda seconds: None)
+    service = ErrorBatchService({"gone": _http_error(404), "busy": _http_error(429)})
+
+    with gmail_reader_agent.GmailFetcher(lambda: service, max_workers=1, max_retries=2) as fetcher:
+        results = gmail_reader_agent.fetch_messages_metadata(fetcher, ["gone", "busy"])
+
+    assert results == {}
+    # 404 is permanent and never retried; 429 is retried until the budget runs out
+    assert service.requested.count("gone") == 1
+    assert service.requested.count("busy") == 3
+    assert fetcher.failed_ids == ["busy"]
+    # Throttling halves the number of batches allowed in flight
+    assert fetcher.concurrency.limit == 1
+
+
+def test_fetcher_builds_one_service_per_worker_thread(monkeypatch):
+    built = []
+
+    def factory():
+        built.append(1)
+        return FakeBatchService()
+
+    ids = [f"m{i}" for i in range(8)]
+    with gmail_reader_agent.GmailFetcher(factory, max_workers=2, batch_size=2) as fetcher:
+        results = gmail_reader_agent.fetch_messages_metadata(fetcher, ids)
+
+    assert set(results) == set(ids)
+    assert 1 <= len(built) <= 2
+
+
+class FakeListService:
+    def __init__(self, pages):
+        self.pages = pages
+        self.requests = []
+
+    def users(self): return self
+    def messages(self): return self
+
+    def list(self, **kwargs):
+        self.requests.append(kwargs)
+        return self
+
+    def execute(self):
+        token = self.requests[-1].get("pageToken")
+        index = int(token) if token else 0
+        page = {"messages": [{"id": msg_id} for msg_id in self.pages[index]]}
+        if index + 1 < len(self.pages):
+            page["nextPageToken"] = str(index + 1)
+        return page
+
+
+def test_get_matching_message_ids_follows_pages_lazily():
+    service = FakeListService([["a", "b"], ["c", "d"], ["e"]])
+    ids = gmail_reader_agent.get_matching_message_ids(service, "from:amazon.in")
+
+    assert next(ids) == "a"
+    assert next(ids) == "b"
+    # The second page is not requested until the first one is consumed
+    assert len(service.requests) == 1
+    assert list(ids) == ["c", "d", "e"]
+    assert [r.get("pageToken") for r in service.requests] == [None, "1", "2"]
+
+
+def test_get_matching_message_ids_cap_and_date_window():
+    service = FakeListService([["a", "b"], ["c", "d"]])
+    ids = list(gmail_reader_agent.get_matching_message_ids(
+        service, "from:amazon.in", max_results=3, after=date(2024, 1, 1), before=date(2024, 7, 1)
+    ))
+
+    assert ids == ["a", "b", "c"]
+    assert service.requests[0]["q"] == "(from:amazon.in) after:2024/01/01 before:2024/07/01"
+    assert service.requests[1]["maxResults"] == 1
+
+
+class FlakyListService(FakeListService):
+    """Fails the first execute of each listed page with the given error."""
+
+    def __init__(self, pages, error):
+        super().__init__(pages)
+        self.error = error
+        self.failed = set()
+
+    def execute(self):
+        token = self.requests[-1].get("pageToken")
+        if token not in self.failed:
+            self.failed.add(token)
+            raise self.error
+        return super().execute()
+
+
+class CountingBucket:
+    def __init__(self):
+        self.acquired = []
+
+    def acquire(self, amount=1):
+        self.acquired.append(amount)
+
+
+def test_get_matching_message_ids_retries_pages_within_quota(monkeypatch):
+    monkeypatch.setattr(gmail_reader_agent.time, "sleep", lambda seconds: None)
+    service = FlakyListService([["a", "b"], ["c"]], _http_error(503))
+    bucket = CountingBucket()
+
+    ids = list(gmail_reader_agent.get_matching_message_ids(service, "from:amazon.in", bucket=bucket))
+
+    assert ids == ["a", "b", "c"]
+    # Every attempt, including retries, is charged to the shared quota
+    assert bucket.acquired == [gmail_reader_agent.MESSAGES_LIST_QUOTA_UNITS] * 4
+
+
+def test_get_matching_message_ids_does_not_retry_permanent_errors(monkeypatch):
+    monkeypatch.setattr(gmail_reader_agent.time, "sleep", lambda seconds: None)
+    service = FlakyListService([["a"]], _http_error(400))
+
+    with pytest.raises(gmail_reader_agent.HttpError):
+        list(gmail_reader_agent.get_matching_message_ids(service, "from:amazon.in"))
+    assert len(service.requests) == 1
+
+
+def test_get_matching_message_ids_non_positive_cap_lists_nothing():
+    service = FakeListService([["a", "b"]])
+    assert list(gmail_reader_agent.get_matching_message_ids(service, "from:amazon.in", max_results=0)) == []
+    assert list(gmail_reader_agent.get_matching_message_ids(service, "from:amazon.in", max_results=-1)) == []
+    assert service.requests == []
+
+
+def _patch_incremental_run(monkeypatch, existing, added_ids, captured):
+    monkeypatch.setattr(gmail_reader_agent, "load_consent_token", lambda: "valid-token")
+    monkeypatch.setattr(gmail_reader_agent, "validate_token", lambda token, expected_scope: {"user": "test-user"})
+    monkeypatch.setattr(gmail_reader_agent, "authenticate_google", lambda: "mock-service")
+    monkeypatch.setattr(gmail_reader_agent, "get_mailbox_history_id", lambda service: "900")
+    monkeypatch.setattr(gmail_reader_agent, "load_sync_state", lambda: {"history_id": "500", "pending_ids": ["retry"]})
+    monkeypatch.setattr(gmail_reader_agent, "load_existing_emails", lambda: existing)
+    monkeypatch.setattr(gmail_reader_agent, "get_added_message_ids", lambda service, start: added_ids)
+    fake_fetch = lambda service, ids: {
+        msg_id: {"id": msg_id, "from": "auto-confirm@amazon.in", "subject": "Shipped: Mouse", "body": ""}
+        for msg_id in ids
+    }
+    monkeypatch.setattr(gmail_reader_agent, "fetch_message_headers", fake_fetch)
+    monkeypatch.setattr(gmail_reader_agent, "fetch_messages_metadata", fake_fetch)
+    monkeypatch.setattr(gmail_reader_agent, "save_encrypted_json", lambda data, path: captured.__setitem__(path, data))
+
+
+def test_main_incremental_merges_new_messages(monkeypatch):
+    captured = {}
+    existing = [{"id": "old", "from": "auto-confirm@amazon.in", "subject": "Shipped: Laptop", "body": ""}]
+    _patch_incremental_run(monkeypatch, existing, ["new"], captured)
+
+    def full_scan(service, query, **kwargs):
+        raise AssertionError("incremental run must not list the whole mailbox")
+
+    monkeypatch.setattr(gmail_reader_agent, "get_matching_message_ids", full_scan)
+
+    gmail_reader_agent.main()
+    assert [e["id"] for e in captured[gmail_reader_agent.INPUT_FILE]] == ["old", "retry", "new"]
+    assert captured[gmail_reader_agent.SYNC_STATE_FILE]["pending_ids"] == []
+    assert captured[gmail_reader_agent.SYNC_STATE_FILE]["history_id"] == "900"
+
+
+def test_main_falls_back_to_full_resync_when_cursor_expired(monkeypatch):
+    captured = {}
+    existing = [{"id": "stale", "from": "auto-confirm@amazon.in", "subject": "Shipped: Laptop", "body": ""}]
+    _patch_incremental_run(monkeypatch, existing, None, captured)
+    monkeypatch.setattr(gmail_reader_agent, "get_matching_message_ids", lambda service, query, **kwargs: ["a", "b"])
+
+    gmail_reader_agent.main()
+    assert [e["id"] for e in captured[gmail_reader_agent.INPUT_FILE]] == ["a", "b"]
+
+
+def test_get_added_message_ids_returns_none_on_expired_cursor():
+    from googleapiclient.errors import HttpError
+
+    class Resp(dict):
+        status = 404
+        reason = "Not Found"
+
+    class HistoryService:
+        def users(self): return self
+        def history(self): return self
+        def list(self, **kwargs): return self
+        def execute(self): raise HttpError(Resp(), b"history too old")
+
+    assert gmail_reader_agent.get_added_message_ids(HistoryService(), "1") is None
+
+
+def _patch_added_ids(monkeypatch, added_ids):
+    # Incremental runs see every new message, so they are the ones screened by sender
+    monkeypatch.setattr(gmail_reader_agent, "load_consent_token", lambda: "valid-token")
+    monkeypatch.setattr(gmail_reader_agent, "validate_token", lambda token, expected_scope: {"user": "test-user"})
+    monkeypatch.setattr(gmail_reader_agent, "authenticate_google", lambda: "mock-service")
+    monkeypatch.setattr(gmail_reader_agent, "get_mailbox_history_id", lambda service: "1")
+    monkeypatch.setattr(gmail_reader_agent, "load_sync_state", lambda: {"history_id": "1"})
+    monkeypatch.setattr(gmail_reader_agent, "load_existing_emails", lambda: [])
+    monkeypatch.setattr(gmail_reader_agent, "get_added_message_ids", lambda service, start: list(added_ids))
+
+
+def test_main_fetches_bodies_only_for_store_senders(monkeypatch):
+    _patch_added_ids(monkeypatch, ["ship", "promo", "other"])
+
+    headers = {
+        "ship": {"id": "ship", "from": "auto-confirm@amazon.in", "subject": "Shipped: Headphones"},
+        "promo": {"id": "promo", "from": "store-news@amazon.in", "subject": "Deals of the day"},
+        "other": {"id": "other", "from": "news@example.com", "subject": "shipped to you"},
+    }
+    bodies = {
+        "ship": "Your order has shipped",
+        "promo": "Great deals on laptops",
+    }
+    full_requests = []
+
+    def fake_full(service, ids):
+        full_requests.extend(ids)
+        return {msg_id: dict(headers[msg_id], body=bodies[msg_id]) for msg_id in ids}
+
+    monkeypatch.setattr(gmail_reader_agent, "fetch_message_headers", lambda service, ids: {i: headers[i] for i in ids})
+    monkeypatch.setattr(gmail_reader_agent, "fetch_messages_metadata", fake_full)
+    captured = {}
+    monkeypatch.setattr(gmail_reader_agent, "save_encrypted_json", lambda data, path: captured.__setitem__(path, data))
+
+    gmail_reader_agent.main()
+
+    assert full_requests == ["ship", "promo"]
+    assert [e["id"] for e in captured[gmail_reader_agent.INPUT_FILE]] == ["ship"]
+
+
+def test_main_serves_repeat_runs_from_message_cache(monkeypatch, isolated_message_cache):
+    _patch_added_ids(monkeypatch, ["ship", "other"])
+    monkeypatch.setattr(gmail_reader_agent, "save_sync_state", lambda history_id, pending_ids=None: None)
+    monkeypatch.setattr(gmail_reader_agent, "save_encrypted_json", lambda data, path: None)
+
+    headers = {
+        "ship": {"id": "ship", "from": "auto-confirm@amazon.in", "subject": "Shipped: Headphones"},
+        "other": {"id": "other", "from": "news@example.com", "subject": "Weekly digest"},
+    }
+    network = []
+
+    def fake_headers(fetcher, ids):
+        network.extend(("headers", i) for i in ids)
+        return {i: headers[i] for i in ids}
+
+    def fake_full(fetcher, ids):
+        network.extend(("full", i) for i in ids)
+        return {i: dict(headers[i], body="shipped") for i in ids}
+
+    monkeypatch.setattr(gmail_reader_agent, "fetch_message_headers", fake_headers)
+    monkeypatch.setattr(gmail_reader_agent, "fetch_messages_metadata", fake_full)
+
+    gmail_reader_agent.main()
+    assert network == [("headers", "ship"), ("headers", "other"), ("full", "ship")]
+    assert isolated_message_cache.exists()
+
+    network.clear()
+    gmail_reader_agent.main()
+    assert network == []
+
+
+def test_main_keeps_fetched_messages_cached_when_a_later_chunk_fails(monkeypatch):
+    _patch_added_ids(monkeypatch, ["first", "second"])
+    monkeypatch.setattr(gmail_reader_agent, "FETCH_CHUNK_SIZE", 1)
+    monkeypatch.setattr(gmail_reader_agent, "fetch_message_headers", lambda fetcher, ids: {
+        i: {"id": i, "from": "auto-confirm@amazon.in", "subject": "Shipped: Headphones"} for i in ids
+    })
+
+    def fake_full(fetcher, ids):
+        if ids == ["second"]:
+            raise RuntimeError("connection reset")
+        return {i: {"id": i, "from": "auto-confirm@amazon.in", "subject": "Shipped: Headphones", "body": ""} for i in ids}
+
+    monkeypatch.setattr(gmail_reader_agent, "fetch_messages_metadata", fake_full)
+
+    with pytest.raises(RuntimeError):
+        gmail_reader_agent.main()
+
+    cache = gmail_reader_agent.open_message_cache()
+    assert cache.get("first")["body"] == ""
+    assert cache.get("second") is None
+
+
+def test_screened_out_headers_never_evict_cached_messages(monkeypatch):
+    _patch_added_ids(monkeypatch, ["ship"] + [f"news{i}" for i in range(5)])
+    monkeypatch.setattr(gmail_reader_agent, "MESSAGE_CACHE_MAX_ENTRIES", 1)
+    monkeypatch.setattr(gmail_reader_agent, "save_sync_state", lambda history_id, pending_ids=None: None)
+    monkeypatch.setattr(gmail_reader_agent, "save_encrypted_json", lambda data, path: None)
+    monkeypatch.setattr(gmail_reader_agent, "fetch_message_headers", lambda fetcher, ids: {
+        i: {"id": i, "from": "auto-confirm@amazon.in" if i == "ship" else "news@example.com", "subject": "Shipped"}
+        for i in ids
+    })
+    monkeypatch.setattr(gmail_reader_agent, "fetch_messages_metadata", lambda fetcher, ids: {
+        i: {"id": i, "from": "auto-confirm@amazon.in", "subject": "Shipped", "body": ""} for i in ids
+    })
+
+    gmail_reader_agent.main()
+
+    assert gmail_reader_agent.open_message_cache().get("ship")["body"] == ""
+    header_cache = gmail_reader_agent.open_header_cache()
+    assert header_cache.get("ship") is None
+    assert all(header_cache.get(f"news{i}") is not None for i in range(5))
+
+def test_full_scan_skips_the_sender_screen(monkeypatch):
+    monkeypatch.setattr(gmail_reader_agent, "load_consent_token", lambda: "valid-token")
+    monkeypatch.setattr(gmail_reader_agent, "validate_token", lambda token, expected_scope: {"user": "test-user"})
+    monkeypatch.setattr(gmail_reader_agent, "authenticate_google", lambda: "mock-service")
+    monkeypatch.setattr(gmail_reader_agent, "get_mailbox_history_id", lambda service: "1")
+    monkeypatch.setattr(gmail_reader_agent, "load_sync_state", lambda: None)
+    monkeypatch.setattr(gmail_reader_agent, "get_matching_message_ids", lambda service, query, **kwargs: ["ship"])
+    monkeypatch.setattr(gmail_reader_agent, "save_sync_state", lambda history_id, pending_ids=None: None)
+    captured = {}
+    monkeypatch.setattr(gmail_reader_agent, "save_encrypted_json", lambda data, path: captured.__setitem__(path, data))
+
+    def no_headers(fetcher, ids):
+        raise AssertionError("ids listed by from:<store> queries need no header screen")
+
+    monkeypatch.setattr(gmail_reader_agent, "fetch_message_headers", no_headers)
+    monkeypatch.setattr(gmail_reader_agent, "fetch_messages_metadata", lambda fetcher, ids: {
+        i: {"id": i, "from": "auto-confirm@amazon.in", "subject": "Shipped: Headphones", "body": ""} for i in ids
+    })
+
+    gmail_reader_agent.main()
+    assert [e["id"] for e in captured[gmail_reader_agent.INPUT_FILE]] == ["ship"]
+
+
+
+def test_plan_query_shards_covers_every_date_per_store():
+    shards = gmail_reader_agent.plan_query_shards(
+        {"amazon.in": ["shipped"], "croma.com": ["invoice"]},
+        today=date(2025, 1, 1), shard_days=365, sharded_years=2
+    )
+
+    amazon = [q for q in shards if "amazon.in" in q]
+    assert len(amazon) == len(shards) // 2
+    assert all('"shipped"' in q and "croma" not in q for q in amazon)
+    # Open-ended oldest and newest windows, overlapping boundaries in between
+    assert amazon[0] == '((from:amazon.in "shipped")) before:2023/01/03'
+    assert amazon[1] == '((from:amazon.in "shipped")) after:2023/01/02 before:2024/01/03'
+    assert amazon[-1] == '((from:amazon.in "shipped")) after:2024/01/02'
+
+
+def test_list_message_ids_sharded_deduplicates_across_shards(monkeypatch):
+    pages = {"q1": ["a", "b", "c"], "q2": ["c", "d"], "q3": ["a", "e"]}
+    monkeypatch.setattr(gmail_reader_agent, "get_matching_message_ids", lambda service, query, **kwargs: iter(pages[query]))
+
+    ids = list(gmail_reader_agent.list_message_ids_sharded(lambda: "svc", ["q1", "q2", "q3"], max_workers=3))
+    assert sorted(ids) == ["a", "b", "c", "d", "e"]
+
+
+def test_list_message_ids_sharded_buffers_a_bounded_number_of_chunks(monkeypatch):
+    monkeypatch.setattr(gmail_reader_agent, "GMAIL_BATCH_SIZE", 1)
+    monkeypatch.setattr(gmail_reader_agent, "LIST_QUEUE_MAX_CHUNKS", 2)
+    monkeypatch.setattr(gmail_reader_agent, "LIST_QUEUE_POLL_SECONDS", 0.01)
+    listed = []
+
+    def slow_consumer_source(service, query, **kwargs):
+        for n in range(100):
+            listed.append(n)
+            yield f"{query}-{n}"
+
+    monkeypatch.setattr(gmail_reader_agent, "get_matching_message_ids", slow_consumer_source)
+    ids = gmail_reader_agent.list_message_ids_sharded(lambda: "svc", ["q1"], max_workers=1)
+
+    assert next(ids) == "q1-0"
+    time.sleep(0.1)
+    # The worker waits on the full queue instead of listing the whole shard
+    assert len(listed) <= 5
+    ids.close()
+    time.sleep(0.1)
+    assert len(listed) <= 5
+
+
+def test_list_message_ids_sharded_propagates_shard_errors(monkeypatch):
+    def failing(service, query, **kwargs):
+        raise RuntimeError("list failed")
+
+    monkeypatch.setattr(gmail_reader_agent, "get_matching_message_ids", failing)
+    with pytest.raises(RuntimeError, match="list failed"):
+        list(gmail_reader_agent.list_message_ids_sharded(lambda: "svc", ["q1"]))
+
+
+def test_missing_or_malformed_date_header_falls_back_to_receive_time():
+    msg = {
+        "internalDate": str(int(datetime(2023, 5, 6, 12, 0).timestamp() * 1000)),
+        "payload": {"headers": [{"name": "From", "value": "auto-confirm@amazon.in"}, {"name": "Date", "value": "garbage"}]},
+    }
+    assert gmail_reader_agent.parse_message_headers("m1", msg)["date"] == "2023-05-06"
+
+    msg["payload"]["headers"][1]["value"] = "Sat, 6 May 2023 10:00:00 +0530"
+    assert gmail_reader_agent.parse_message_headers("m1", msg)["date"] == "Sat, 6 May 2023 10:00:00 +0530"
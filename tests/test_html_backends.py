@@ -0,0 +1,106 @@
+import pytest
+from hushh_mcp.operons import extract_email_text
+from hushh_mcp.operons.extract_email_text import HTML_TEXT_BACKENDS, html_to_text
+from hushh_mcp.operons.extract_receipt_data import extract_receipt
+
+pytest.importorskip("bs4")
+
+DATE = "Wed, 01 Jan 2023 10:00:00 +0530"
+
+# Trimmed-down shapes of the mails the receipt extractors see in practice
+CORPUS = [
+    {
+        "from": "Amazon.in <auto-confirm@amazon.in>",
+        "subject": "Your Amazon.in order of boAt Rockerz 450",
+        "body": (
+            "<!DOCTYPE html><html><head><title>Amazon.in</title>"
+            "<style>td { font-family: Arial; }</style><script>var t = '<b>';</script></head>"
+            "<body><table><tr><td>Hello,</td></tr><tr><td>"
+            "<ul><li>* boAt Rockerz 450&nbsp;Bluetooth Headphones Quantity: 1 1,499.00 INR</li>"
+            "<li>* Logitech&nbsp;M235 Mouse Quantity:2 1,190.00 INR</li></ul>"
+            "</td></tr><!-- tracking pixel --><tr><td>Conditions of Use &amp; Sale</td></tr></table></body></html>"
+        ),
+    },
+    {
+        "from": "shipment-tracking@amazon.in",
+        "subject": "Your package is on the way",
+        "body": (
+            "<div>Shipment details</div><div><span>Redmi Note 12 Pro 5G</span>"
+            "<span>Rs.24,999.00</span></div><div>Track package</div>"
+        ),
+    },
+    {
+        "from": "Croma <orders@mail.croma.com>",
+        "subject": "Invoice for your order",
+        "body": (
+            "<html><body><table><tr><th>Item Description</th><th>Tax Code</th><th>Qty.</th>"
+            "<th>Rate</th><th>Amount</th></tr><tr><td>1</td><td>Sony WH-1000XM4</td>"
+            "<td>85183000</td><td>24990.00</td><td>24990.00</td></tr></table>"
+            "<p>Total Amount Paid: 24,990.00</p></body></html>"
+        ),
+    },
+    {
+        "from": "Flipkart <noreply@flipkart.com>",
+        "subject": "Your Order for Apple AirPods has been delivered",
+        "body": (
+            "<table><tr><td>Apple AirPods (2nd generation)</td><td>Qty: 1</td>"
+            "<td>&#8377;12,900</td></tr><tr><td>Amount Paid</td><td>&#8377;12,900</td></tr></table>"
+        ),
+    },
+    {
+        "from": "Flipkart <noreply@flipkart.com>",
+        "subject": "Delivered: Mi Smart Band 7",
+        "body": "Your item was delivered. Order Total: Rs. 3,499 &lt;see app&gt;",
+    },
+    # Comments between words, markup inside RCDATA elements and ">" inside quoted attributes
+    {
+        "from": "Amazon.in <auto-confirm@amazon.in>",
+        "subject": "Your Amazon.in order of boAt Rockerz 450",
+        "body": (
+            "<html><head><title>Order <b>confirmed</b></title></head><body>"
+            "<ul><li>* boAt<!-- sku -->Rockerz 450<!--x-->Headphones Quantity: 1 1,499.00 INR</li>"
+            "<li>* Logitech M235<script>t()</script>Mouse Quantity:2 1,190.00 INR</li></ul>"
+            "<textarea><b>Gift</b> note &amp; wishes</textarea></body></html>"
+        ),
+    },
+    {
+        "from": "Flipkart <noreply@flipkart.com>",
+        "subject": "Your Order for Apple AirPods has been delivered",
+        "body": (
+            "<table><tr><td title='qty>1'>Apple AirPods<!-- c -->(2nd generation)</td>"
+            "<td data-note=\"a > b\">Qty: 1</td><td>&#8377;12,900</td></tr>"
+            "<tr><td alt = 'x>y'>Amount Paid</td><td>&#8377;12,900</td></tr></table>"
+        ),
+    },
+]
+
+
+@pytest.mark.parametrize("backend", sorted(HTML_TEXT_BACKENDS))
+def test_backends_extract_identical_items_and_prices(backend, monkeypatch):
+    for email in CORPUS:
+        email = dict(email, date=DATE)
+        monkeypatch.setenv(extract_email_text.HTML_BACKEND_ENV, "bs4")
+        expected = extract_receipt(email)
+        monkeypatch.setenv(extract_email_text.HTML_BACKEND_ENV, backend)
+        assert extract_receipt(email) == expected, email["subject"]
+        assert expected["strategy"] != "placeholder"
+
+
+@pytest.mark.parametrize("backend", sorted(HTML_TEXT_BACKENDS))
+def test_backends_produce_identical_text(backend):
+    for email in CORPUS:
+        assert html_to_text(email["body"], backend) == html_to_text(email["body"], "bs4")
+
+
+def test_plain_text_skips_the_parser(monkeypatch):
+    def fail(html):
+        raise AssertionError("parser should not run for plain text")
+
+    monkeypatch.setitem(HTML_TEXT_BACKENDS, "stream", fail)
+    assert html_to_text("  Total  Rs. 1,299 &amp; more\n", "stream") == "Total Rs. 1,299 & more"
+
+
+def test_unknown_backend_is_rejected(monkeypatch):
+    monkeypatch.setenv(extract_email_text.HTML_BACKEND_ENV, "html5lib")
+    with pytest.raises(ValueError):
+        html_to_text("<p>x</p>")
@@ -0,0 +1,200 @@
+import threading
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+from hushh_mcp import llm
+
+
+def gemini_client(text="{}"):
+    client = MagicMock()
+    client.generate_content.return_value = MagicMock(text=text)
+    return client
+
+
+def test_identical_prompts_reach_the_provider_once_across_runs():
+    client = gemini_client('{"price_range": "1 to 2 INR"}')
+    first = llm.complete(llm.GEMINI, "gemini-1.5-flash", "Value this:\n  {\"item\": \"Pixel 7\"}", client=client)
+    # Whitespace-only differences normalise to the same prompt
+    second = llm.complete(llm.GEMINI, "gemini-1.5-flash", "Value this: {\"item\": \"Pixel 7\"}", client=client)
+    assert first == second == '{"price_range": "1 to 2 INR"}'
+    assert client.generate_content.call_count == 1
+
+    stats = llm.save_response_cache()
+    assert (stats["hits"], stats["misses"], stats["hit_rate"]) == (1, 1, 0.5)
+
+    # A later run (fresh process state) is served from the encrypted cache file
+    llm.reset_response_cache()
+    rerun_client = gemini_client()
+    assert llm.complete(llm.GEMINI, "gemini-1.5-flash", "Value this: {\"item\": \"Pixel 7\"}", client=rerun_client) == first
+    rerun_client.generate_content.assert_not_called()
+
+
+def test_key_covers_provider_model_and_options():
+    prompt = "Describe the Pixel 7"
+    keys = {
+        llm.cache_key(llm.GEMINI, "gemini-1.5-flash", prompt),
+        llm.cache_key(llm.GROQ, "gemini-1.5-flash", prompt),
+        llm.cache_key(llm.GEMINI, "gemini-1.5-pro", prompt),
+        llm.cache_key(llm.GEMINI, "gemini-1.5-flash", prompt, {"temperature": 0.3}),
+    }
+    assert len(keys) == 4
+
+
+def test_rejected_replies_and_errors_are_not_cached():
+    client = gemini_client("Sorry, I can't help with that")
+    llm.complete(llm.GEMINI, "m", "prompt", client=client, accept=lambda text: text.startswith("{"))
+    llm.complete(llm.GEMINI, "m", "prompt", client=client, accept=lambda text: text.startswith("{"))
+    assert client.generate_content.call_count == 2
+
+    client.generate_content.side_effect = ConnectionError("offline")
+    with pytest.raises(ConnectionError):
+        llm.complete(llm.GEMINI, "m", "other prompt", client=client)
+    assert len(llm.response_cache()) == 0
+
+
+def test_groq_replies_are_unwrapped_and_options_forwarded():
+    client = MagicMock()
+    client.chat.completions.create.return_value.choices = [MagicMock()]
+    client.chat.completions.create.return_value.choices[0].message.content = '{"id": "a"}'
+
+    assert llm.complete(llm.GROQ, "llama3-70b-8192", "prompt", client=client, temperature=0.3) == '{"id": "a"}'
+    kwargs = client.chat.completions.create.call_args.kwargs
+    assert kwargs["model"] == "llama3-70b-8192" and kwargs["temperature"] == 0.3
+    assert kwargs["messages"] == [{"role": "user", "content": "prompt"}]
+
+
+def test_concurrent_identical_prompts_make_one_request():
+    calls = []
+
+    def slow_generate(prompt):
+        calls.append(prompt)
+        time.sleep(0.05)
+        return MagicMock(text="{}")
+
+    client = MagicMock()
+    client.generate_content.side_effect = slow_generate
+    threads = [threading.Thread(target=llm.complete, args=(llm.GEMINI, "m", "same prompt"), kwargs={"client": client})
+               for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+    # Per-prompt locks do not outlive the calls that needed them
+    assert llm._inflight == {}
+
+    client.generate_content.side_effect = ConnectionError("provider down")
+    with pytest.raises(ConnectionError):
+        llm.complete(llm.GEMINI, "m", "failing prompt", client=client)
+    assert llm._inflight == {}
+
+
+def test_unknown_provider_is_rejected():
+    with pytest.raises(ValueError):
+        llm.complete("openai", "gpt-4o", "prompt", client=MagicMock())
+
+
+def test_map_concurrently_keeps_order_limits_workers_and_isolates_failures():
+    active, peak = [0], [0]
+    guard = threading.Lock()
+
+    def work(n):
+        with guard:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.01 * (5 - n % 5))
+        with guard:
+            active[0] -= 1
+        if n == 3:
+            raise RuntimeError("bad product")
+        return n * 10
+
+    results = llm.map_concurrently(work, range(10), max_workers=3, on_error=lambda n: -n)
+    assert results == [0, 10, 20, -3, 40, 50, 60, 70, 80, 90]
+    assert peak[0] <= 3
+
+
+def test_concurrency_is_configurable_from_the_environment(monkeypatch):
+    monkeypatch.setenv(llm.LLM_CONCURRENCY_ENV, "2")
+    assert llm.default_concurrency() == 2
+    monkeypatch.delenv(llm.LLM_CONCURRENCY_ENV)
+    assert llm.default_concurrency() == llm.LLM_MAX_CONCURRENCY
+
+
+def test_provider_quotas_are_configurable_from_the_environment(monkeypatch):
+    monkeypatch.setattr(llm, "PROVIDER_REQUESTS_PER_MINUTE", {llm.GEMINI: 15, llm.GROQ: 30})
+    monkeypatch.setattr(llm, "PROVIDER_TOKENS_PER_MINUTE", {llm.GEMINI: 1000000, llm.GROQ: 6000})
+    monkeypatch.setenv("HUSHH_GROQ_REQUESTS_PER_MINUTE", "600")
+    llm.reset_provider_controls()
+
+    requests, tokens, _ = llm.provider_controls(llm.GROQ)
+    assert requests.rate == 10
+    # Unset variables keep the free-tier defaults
+    assert tokens.rate == 100
+    assert llm.provider_controls(llm.GEMINI)[0].rate == 0.25
+
+    monkeypatch.setenv("HUSHH_GEMINI_TOKENS_PER_MINUTE", "lots")
+    llm.reset_provider_controls()
+    with pytest.raises(ValueError, match="HUSHH_GEMINI_TOKENS_PER_MINUTE"):
+        llm.provider_controls(llm.GEMINI)
+
+
+class ProviderError(Exception):
+    def __init__(self, status, headers=None):
+        super().__init__(f"HTTP {status}")
+        self.status_code = status
+        self.response = MagicMock(status_code=status, headers=headers or {})
+
+
+def test_throttled_calls_wait_for_retry_after_then_succeed(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(llm.time, "sleep", sleeps.append)
+    client = gemini_client("{}")
+    client.generate_content.side_effect = [ProviderError(429, {"retry-after": "3"}), ProviderError(503),
+                                           MagicMock(text="{}")]
+
+    assert llm.complete(llm.GEMINI, "m", "prompt", client=client) == "{}"
+    assert client.generate_content.call_count == 3
+    assert sleeps[0] == 3.0 and len(sleeps) == 2
+
+
+def test_client_errors_are_not_retried():
+    client = gemini_client()
+    client.generate_content.side_effect = ProviderError(400)
+    with pytest.raises(ProviderError):
+        llm.complete(llm.GEMINI, "m", "prompt", client=client)
+    assert client.generate_content.call_count == 1
+    assert llm.provider_controls(llm.GEMINI)[2].state == "closed"
+
+
+def test_circuit_breaker_fails_fast_while_provider_is_down(monkeypatch):
+    monkeypatch.setattr(llm, "LLM_MAX_RETRIES", 1)
+    monkeypatch.setattr(llm, "CIRCUIT_FAILURE_THRESHOLD", 2)
+    llm.reset_provider_controls()
+    client = gemini_client()
+    client.generate_content.side_effect = ConnectionError("provider down")
+
+    with pytest.raises(ConnectionError):
+        llm.complete(llm.GEMINI, "m", "first", client=client)
+    with pytest.raises(llm.CircuitOpenError):
+        llm.complete(llm.GEMINI, "m", "second", client=client)
+    assert client.generate_content.call_count == 2
+    # Groq has its own breaker
+    groq = MagicMock()
+    groq.chat.completions.create.return_value.choices = [MagicMock()]
+    groq.chat.completions.create.return_value.choices[0].message.content = "{}"
+    assert llm.complete(llm.GROQ, "m", "second", client=groq) == "{}"
+
+
+def test_cache_is_checkpointed_during_a_run(monkeypatch):
+    monkeypatch.setattr(llm, "LLM_CHECKPOINT_EVERY", 2)
+    client = gemini_client("{}")
+    llm.complete(llm.GEMINI, "m", "one", client=client)
+    llm.complete(llm.GEMINI, "m", "two", client=client)
+
+    # A crash now loses nothing: a fresh process finds both replies on disk
+    llm.reset_response_cache()
+    assert llm.cache_key(llm.GEMINI, "m", "one") in llm.response_cache()
+    assert llm.cache_key(llm.GEMINI, "m", "two") in llm.response_cache()
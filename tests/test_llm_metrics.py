@@ -0,0 +1,83 @@
+from unittest.mock import MagicMock
+
+from hushh_mcp import llm, llm_metrics
+from hushh_mcp.vault.json_vault import load_encrypted_json
+
+
+def gemini_reply(text, prompt_tokens=None, completion_tokens=None):
+    reply = MagicMock(text=text)
+    reply.usage_metadata.prompt_token_count = prompt_tokens
+    reply.usage_metadata.candidates_token_count = completion_tokens
+    return reply
+
+
+def test_calls_are_recorded_with_tags_tokens_and_outcome():
+    client = MagicMock()
+    client.generate_content.side_effect = [gemini_reply('{"ok": 1}', 120, 30), gemini_reply("not json")]
+    is_json = lambda text: text.startswith("{")
+
+    with llm_metrics.tagged(agent="cost_agent"):
+        with llm_metrics.tagged(stage="valuation", product_id="p1"):
+            llm.complete(llm.GEMINI, "m", "value p1", client=client, accept=is_json)
+            llm.complete(llm.GEMINI, "m", "value p1", client=client, accept=is_json)  # cache hit
+        with llm_metrics.tagged(stage="valuation", product_id="p2"):
+            llm.complete(llm.GEMINI, "m", "value p2", client=client, accept=is_json)
+
+    first, hit, failed = llm_metrics.registry.records()
+    assert (first.agent, first.stage, first.product_id) == ("cost_agent", "valuation", "p1")
+    assert (first.prompt_tokens, first.completion_tokens, first.tokens_estimated) == (120, 30, False)
+    assert first.parsed is True and not first.cache_hit
+    assert hit.cache_hit and hit.product_id == "p1"
+    # No usage metadata: counts fall back to estimates
+    assert failed.parsed is False and failed.tokens_estimated and failed.prompt_tokens > 0
+
+    overall = llm_metrics.registry.summary()["overall"]
+    assert (overall["calls"], overall["network_calls"], overall["cache_hits"]) == (3, 2, 1)
+    assert overall["prompt_tokens"] == 120 + failed.prompt_tokens
+    assert overall["parse_failure_rate"] == 1 / 3
+
+
+def test_retries_and_errors_are_counted(monkeypatch):
+    monkeypatch.setattr(llm, "LLM_MAX_RETRIES", 1)
+    client = MagicMock()
+    client.generate_content.side_effect = ConnectionError("down")
+    try:
+        llm.complete(llm.GEMINI, "m", "prompt", client=client)
+    except ConnectionError:
+        pass
+    (record,) = llm_metrics.registry.records()
+    assert record.retries == 1 and record.error == "ConnectionError"
+
+
+def test_tags_follow_work_onto_worker_threads():
+    client = MagicMock()
+    client.generate_content.side_effect = lambda prompt: gemini_reply("{}", 10, 2)
+
+    def work(product_id):
+        with llm_metrics.tagged(product_id=product_id):
+            return llm.complete(llm.GEMINI, "m", f"describe {product_id}", client=client)
+
+    with llm_metrics.tagged(agent="usage_agent", stage="usage_check"):
+        llm.map_concurrently(work, ["a", "b", "c"], max_workers=3)
+
+    records = llm_metrics.registry.records()
+    assert sorted(r.product_id for r in records) == ["a", "b", "c"]
+    assert {(r.agent, r.stage) for r in records} == {("usage_agent", "usage_check")}
+
+
+def test_summary_ranks_slowest_and_most_expensive_and_is_saved(tmp_path):
+    registry = llm_metrics.MetricsRegistry()
+    for agent, stage, latency, tokens in [("cost_agent", "valuation", 2.0, 500), ("cost_agent", "batch_valuation", 9.0, 4000),
+                                          ("context_agent", "context", 4.0, 300)]:
+        registry.record(llm_metrics.LLMCallRecord("gemini", "m", "h", agent=agent, stage=stage,
+                                                  latency_seconds=latency, prompt_tokens=tokens))
+    registry.record(llm_metrics.LLMCallRecord("gemini", "m", "h", agent="cost_agent", stage="valuation", cache_hit=True))
+
+    path = str(tmp_path / "llm_metrics.json")
+    summary = registry.write_summary(path, stages={"cost_agent": "completed"})
+    assert [r["latency_seconds"] for r in summary["slowest"]] == [9.0, 4.0, 2.0]
+    assert summary["most_expensive"][0]["stage"] == "batch_valuation"
+    assert summary["by_agent"]["cost_agent"]["cache_hit_rate"] == 1 / 3
+    assert summary["by_stage"]["cost_agent/valuation"]["prompt_tokens"] == 500
+    assert summary["overall"]["latency_seconds"]["p50"] == 4.0
+    assert load_encrypted_json(path) == summary
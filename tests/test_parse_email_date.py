@@ -0,0 +1,31 @@
+import pytest
+from datetime import date
+from hushh_mcp.operons.parse_email_date import format_email_date, parse_email_date
+
+
+@pytest.mark.parametrize("header,expected", [
+    ("Wed, 01 Jan 2023 10:00:00 +0530", date(2023, 1, 1)),
+    ("Wed, 1 Jan 2023 10:00:00 +0530 (IST)", date(2023, 1, 1)),
+    ("1 Jan 2023 10:00:00 -0000", date(2023, 1, 1)),
+    ("Sun, 29 Feb 2004 23:59:59 GMT", date(2004, 2, 29)),
+    ("Tue, 5 Mar 24 08:00:00 +0000", date(2024, 3, 5)),
+    ("Thu, 12 sept 2024 08:00:00 +0000", date(2024, 9, 12)),
+    ("2023-07-15", date(2023, 7, 15)),
+    ("2023-07-15T10:00:00Z", date(2023, 7, 15)),
+])
+def test_parses_rfc2822_and_iso_dates(header, expected):
+    assert parse_email_date(header) == expected
+
+
+@pytest.mark.parametrize("header", [None, "", "yesterday", "Wed, 31 Feb 2023 10:00:00", "Wed, 01 Foo 2023", "2023-13-01"])
+def test_malformed_dates_return_none(header):
+    assert parse_email_date(header) is None
+
+
+def test_results_are_memoised():
+    parse_email_date.cache_clear()
+    header = "Fri, 03 Mar 2023 09:15:00 +0530"
+    assert format_email_date(header) == "2023-03-03"
+    assert format_email_date(header) == "2023-03-03"
+    assert format_email_date.cache_info().hits >= 1
+    assert parse_email_date.cache_info().misses == 1
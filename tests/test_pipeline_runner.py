@@ -0,0 +1,187 @@
+import json
+import sys
+import threading
+import types
+import pytest
+from hushh_mcp.pipeline import runner, manifest
+from hushh_mcp.pipeline.runner import Stage
+
+
+@pytest.fixture(autouse=True)
+def isolated_jsons(tmp_path, monkeypatch):
+    monkeypatch.setattr(manifest, "JSONS_DIR", str(tmp_path))
+    monkeypatch.setattr(manifest, "MANIFEST_PATH", str(tmp_path / "pipeline_manifest.json"))
+    monkeypatch.setattr(runner.stage_manifest, "load_encrypted_json", lambda path: json.loads(open(path).read()))
+    monkeypatch.setattr(runner.stage_manifest, "save_encrypted_json", lambda data, path: open(path, "w").write(json.dumps(data)))
+    return tmp_path
+
+
+def install_stage(monkeypatch, name, fn):
+    module = types.ModuleType(f"fake_stages.{name}")
+    module.main = fn
+    monkeypatch.setitem(sys.modules, module.__name__, module)
+    return module.__name__
+
+
+def test_stages_run_after_their_dependencies(monkeypatch):
+    order = []
+    lock = threading.Lock()
+
+    def recorder(name):
+        def main():
+            with lock:
+                order.append(name)
+        return main
+
+    stages = [
+        Stage("a", install_stage(monkeypatch, "a", recorder("a"))),
+        Stage("b", install_stage(monkeypatch, "b", recorder("b")), ("a",)),
+        Stage("c", install_stage(monkeypatch, "c", recorder("c")), ("a",)),
+        Stage("d", install_stage(monkeypatch, "d", recorder("d")), ("b", "c")),
+    ]
+    status = runner.run_pipeline(stages)
+
+    assert status == {"a": "completed", "b": "completed", "c": "completed", "d": "completed"}
+    assert order[0] == "a"
+    assert order[-1] == "d"
+
+
+def test_independent_stages_run_concurrently(monkeypatch):
+    # Both stages must be inside main() at the same time for the barrier to release
+    barrier = threading.Barrier(2, timeout=5)
+    stages = [
+        Stage("root", install_stage(monkeypatch, "root", lambda: None)),
+        Stage("left", install_stage(monkeypatch, "left", barrier.wait), ("root",)),
+        Stage("right", install_stage(monkeypatch, "right", barrier.wait), ("root",)),
+    ]
+    status = runner.run_pipeline(stages, max_workers=2)
+    assert status["left"] == "completed"
+    assert status["right"] == "completed"
+
+
+def test_failure_skips_downstream_only(monkeypatch):
+    def boom():
+        raise RuntimeError("stage exploded")
+
+    stages = [
+        Stage("root", install_stage(monkeypatch, "root", lambda: None)),
+        Stage("bad", install_stage(monkeypatch, "bad", boom), ("root",)),
+        Stage("good", install_stage(monkeypatch, "good", lambda: None), ("root",)),
+        Stage("after_bad", install_stage(monkeypatch, "after_bad", lambda: None), ("bad",)),
+        Stage("after_both", install_stage(monkeypatch, "after_both", lambda: None), ("after_bad", "good")),
+    ]
+    status = runner.run_pipeline(stages)
+
+    assert status["bad"] == "failed"
+    assert status["good"] == "completed"
+    assert status["after_bad"] == "skipped"
+    assert status["after_both"] == "skipped"
+
+
+def test_validate_stages_rejects_cycles_and_unknown_deps():
+    with pytest.raises(ValueError, match="cycle"):
+        runner.validate_stages([Stage("a", "x", ("b",)), Stage("b", "y", ("a",))])
+    with pytest.raises(ValueError, match="unknown"):
+        runner.validate_stages([Stage("a", "x", ("missing",))])
+
+
+def test_agent_stages_form_a_valid_graph():
+    runner.validate_stages(runner.AGENT_STAGES)
+
+
+def test_editing_a_shared_module_invalidates_the_stages_using_it(monkeypatch, isolated_jsons):
+    stages = {stage.name: stage for stage in runner.AGENT_STAGES if not stage.always_run}
+
+    def fingerprints():
+        return {
+            name: manifest.stage_fingerprint(stage.module, stage.inputs, str(isolated_jsons), stage.code_modules)
+            for name, stage in stages.items()
+        }
+
+    before = fingerprints()
+    real_code_version = manifest.code_version
+    for shared in runner.LLM_AGENT_MODULES:
+        monkeypatch.setattr(manifest, "code_version", lambda name, shared=shared: (
+            "edited" if name == shared else real_code_version(name)
+        ))
+        after = fingerprints()
+        changed = {name for name in stages if after[name] != before[name]}
+        assert changed == {"receipt_agent", "context_agent", "cost_agent", "usage_agent"}, shared
+
+
+def test_incremental_run_skips_stages_with_unchanged_inputs(monkeypatch, isolated_jsons):
+    calls = []
+
+    def producer():
+        calls.append("producer")
+        (isolated_jsons / "emails.json").write_text(json.dumps(["same"]))
+
+    def consumer():
+        calls.append("consumer")
+        (isolated_jsons / "products.json").write_text(json.dumps(["p1"]))
+
+    stages = [
+        Stage("producer", install_stage(monkeypatch, "producer", producer), outputs=("emails.json",), always_run=True),
+        Stage(
+            "consumer", install_stage(monkeypatch, "consumer", consumer), ("producer",),
+            inputs=("emails.json",), outputs=("products.json",)
+        ),
+    ]
+
+    assert runner.run_pipeline(stages)["consumer"] == "completed"
+    status = runner.run_pipeline(stages)
+    assert status == {"producer": "completed", "consumer": "up_to_date"}
+    assert calls == ["producer", "consumer", "producer"]
+
+    # Changed upstream content invalidates the downstream fingerprint
+    stages[0] = Stage(
+        "producer",
+        install_stage(monkeypatch, "producer", lambda: (isolated_jsons / "emails.json").write_text(json.dumps(["new"]))),
+        outputs=("emails.json",), always_run=True
+    )
+    assert runner.run_pipeline(stages)["consumer"] == "completed"
+    assert calls[-1] == "consumer"
+
+
+def test_missing_output_forces_rerun(monkeypatch, isolated_jsons):
+    def stage_main():
+        (isolated_jsons / "out.json").write_text("{}")
+
+    stages = [Stage("only", install_stage(monkeypatch, "only", stage_main), outputs=("out.json",))]
+    assert runner.run_pipeline(stages)["only"] == "completed"
+    assert runner.run_pipeline(stages)["only"] == "up_to_date"
+
+    (isolated_jsons / "out.json").unlink()
+    assert runner.run_pipeline(stages)["only"] == "completed"
+
+
+def test_partial_stage_feeds_dependents_and_resumes_next_run(monkeypatch, isolated_jsons):
+    calls = []
+
+    def flaky():
+        calls.append("flaky")
+        (isolated_jsons / "partial.json").write_text("[]")
+        return len(calls) > 1  # the first run leaves items behind
+
+    def downstream():
+        calls.append("downstream")
+
+    stages = [
+        Stage("flaky", install_stage(monkeypatch, "flaky", flaky), outputs=("partial.json",)),
+        Stage("downstream", install_stage(monkeypatch, "downstream", downstream), ("flaky",)),
+    ]
+    assert runner.run_pipeline(stages) == {"flaky": "partial", "downstream": "completed"}
+    assert runner.run_pipeline(stages)["flaky"] == "completed"
+    assert runner.run_pipeline(stages)["flaky"] == "up_to_date"
+    assert calls.count("flaky") == 2
+
+
+def test_run_writes_llm_metrics_summary(monkeypatch, isolated_jsons):
+    from hushh_mcp.vault.json_vault import load_encrypted_json
+
+    stages = [Stage("only", install_stage(monkeypatch, "only", lambda: None))]
+    runner.run_pipeline(stages)
+
+    summary = load_encrypted_json(str(isolated_jsons / runner.LLM_METRICS_FILENAME))
+    assert summary["stages"] == {"only": "completed"}
+    assert summary["overall"]["calls"] == 0
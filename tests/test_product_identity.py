@@ -0,0 +1,24 @@
+from hushh_mcp.operons.product_identity import index_by_id, normalise_item_name, product_id
+
+PRODUCT = {"itemname": "boAt Rockerz 450", "price": 1499, "purchase_date": "2023-01-01", "platform": "amazon"}
+
+
+def test_normalise_item_name():
+    assert normalise_item_name("  boAt Rockerz-450 (Black)!! ") == "boat rockerz 450 black"
+    assert normalise_item_name(None) == ""
+
+
+def test_product_id_is_stable_and_content_derived():
+    pid = product_id(PRODUCT)
+    assert pid == product_id(dict(PRODUCT))
+    assert len(pid) == 16
+    # Cosmetic differences in the name do not change the id
+    assert product_id(dict(PRODUCT, itemname="BOAT rockerz-450 ")) == pid
+    for field, value in [("price", 1299), ("purchase_date", "2023-01-02"), ("platform", "flipkart")]:
+        assert product_id(dict(PRODUCT, **{field: value})) != pid
+
+
+def test_index_by_id_skips_incomplete_entries():
+    entries = [{"id": "a", "price_range": "1 to 2 INR"}, {"id": 7, "price_range": "x"}, {"id": "b"}, "junk"]
+    assert index_by_id(entries, "price_range") == {"a": entries[0], "7": entries[1]}
+    assert index_by_id({"not": "a list"}) == {}
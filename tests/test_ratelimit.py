@@ -0,0 +1,73 @@
+import threading
+import time
+from hushh_mcp.ratelimit import AdaptiveConcurrency, CircuitBreaker, TokenBucket, backoff_delay
+
+
+def test_token_bucket_spends_burst_then_refills():
+    bucket = TokenBucket(rate=100, capacity=10)
+    assert bucket.try_acquire(10) is True
+    assert bucket.try_acquire(1) is False
+
+    started = time.monotonic()
+    bucket.acquire(5)
+    # 5 tokens at 100/s is ~50ms of waiting
+    assert time.monotonic() - started >= 0.03
+
+
+def test_backoff_delay_is_jittered_and_capped():
+    delays = [backoff_delay(attempt, base=1.0, cap=4.0) for attempt in range(10) for _ in range(20)]
+    assert all(0 <= d <= 4.0 for d in delays)
+    assert len(set(delays)) > 1
+
+
+def test_adaptive_concurrency_halves_on_throttle_and_grows_back():
+    limiter = AdaptiveConcurrency(max_limit=8, initial=8)
+    limiter.acquire()
+    limiter.release(throttled=True)
+    assert limiter.limit == 4
+    for _ in range(3):
+        limiter.acquire()
+        limiter.release()
+    assert limiter.limit == 7
+    assert limiter.error_rate == 0.25
+
+
+def test_adaptive_concurrency_blocks_at_limit():
+    limiter = AdaptiveConcurrency(max_limit=1)
+    limiter.acquire()
+    entered = threading.Event()
+
+    def worker():
+        limiter.acquire()
+        entered.set()
+        limiter.release()
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    assert not entered.wait(0.05)
+    limiter.release()
+    assert entered.wait(1)
+    thread.join()
+
+
+def test_circuit_breaker_opens_fails_fast_and_recovers_through_a_trial(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("hushh_mcp.ratelimit.time.monotonic", lambda: now[0])
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30)
+
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.allow() and breaker.state == "closed"
+    breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow()
+
+    now[0] += 31
+    assert breaker.allow()  # the single half-open trial
+    assert not breaker.allow()
+    breaker.record_failure()  # trial failed: open again for another window
+    assert breaker.state == "open" and breaker.opened == 2
+
+    now[0] += 31
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.failures == 0
@@ -1,8 +1,23 @@
+import json
+import os
+import re
+import tempfile
 import unittest
 from unittest.mock import patch, MagicMock
 from hushh_mcp.agents import receipt_agent  # Correct import
+from hushh_mcp.llm import estimate_tokens
 
 class TestEmailParser(unittest.TestCase):
+    def setUp(self):
+        # Keep cached decisions and extraction results out of the real jsons directory
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        for name, filename in [("CLASSIFIER_CACHE_FILE", "electronics_cache.json"),
+                               ("EXTRACTION_CACHE_FILE", "extraction_cache.json")]:
+            cache_patch = patch.object(receipt_agent, name, os.path.join(tmp.name, filename))
+            cache_patch.start()
+            self.addCleanup(cache_patch.stop)
+
     @patch("hushh_mcp.agents.receipt_agent.load_encrypted_json")
     @patch("hushh_mcp.agents.receipt_agent.save_encrypted_json")
     @patch("hushh_mcp.agents.receipt_agent.model.generate_content")
@@ -17,8 +32,8 @@ class TestEmailParser(unittest.TestCase):
             }
         ]
 
-        # Mock Gemini API response to only keep electronics
-        gemini_response = '[{"itemname": "Item XYZ", "price": 1500, "purchase_date": "2023-01-01", "platform": "amazon"}]'
+        # Mock Gemini API response to only keep electronics (the item is named after the subject)
+        gemini_response = '[{"itemname": "Your Amazon order", "price": 1500, "purchase_date": "2023-01-01", "platform": "amazon"}]'
         mock_generate_content.return_value = MagicMock(text=gemini_response)
 
         # Run main should parse emails, call Gemini, and save output
@@ -44,5 +59,79 @@ class TestEmailParser(unittest.TestCase):
         self.assertIn("purchase_date", saved_data[0])
         self.assertIn("platform", saved_data[0])
 
+    @patch("hushh_mcp.agents.receipt_agent.load_encrypted_json")
+    @patch("hushh_mcp.agents.receipt_agent.save_encrypted_json")
+    @patch("hushh_mcp.agents.receipt_agent.model.generate_content")
+    def test_only_uncertain_items_reach_gemini(self, mock_generate_content, mock_save_json, mock_load_json):
+        mock_load_json.return_value = [
+            {
+                "from": "auto-confirm@amazon.in",
+                "subject": "Your Amazon.in order",
+                "date": "Wed, 01 Jan 2023 10:00:00",
+                "body": "* Logitech M235 Wireless Mouse Quantity: 1 595.00 INR "
+                        "* Spigen Back Cover for iPhone 14 Quantity: 1 799.00 INR "
+                        "* Zebronics Zeb-Thunder Quantity: 1 999.00 INR"
+            }
+        ]
+        mock_generate_content.return_value = MagicMock(text='[{"itemname": "Zebronics Zeb-Thunder"}]')
+
+        receipt_agent.main()
+
+        prompt = mock_generate_content.call_args[0][0]
+        self.assertIn("Zebronics Zeb-Thunder", prompt)
+        self.assertNotIn("Logitech", prompt)
+        self.assertNotIn("Spigen", prompt)
+        saved = mock_save_json.call_args[0][0]
+        self.assertEqual([p["itemname"] for p in saved], ["Logitech M235 Wireless Mouse", "Zebronics Zeb-Thunder"])
+
+        # The Gemini decision is cached, so a rerun stays offline
+        mock_generate_content.reset_mock()
+        receipt_agent.main()
+        mock_generate_content.assert_not_called()
+        self.assertEqual(mock_save_json.call_args[0][0], saved)
+
+    @patch("hushh_mcp.agents.receipt_agent.load_encrypted_json")
+    @patch("hushh_mcp.agents.receipt_agent.save_encrypted_json")
+    @patch("hushh_mcp.agents.receipt_agent.model.generate_content")
+    def test_gemini_failure_falls_back_to_offline_guess(self, mock_generate_content, mock_save_json, mock_load_json):
+        mock_load_json.return_value = [
+            {
+                "from": "auto-confirm@amazon.in",
+                "subject": "Your Amazon.in order",
+                "date": "Wed, 01 Jan 2023 10:00:00",
+                "body": "* Logitech M235 Wireless Mouse Quantity: 1 595.00 INR"
+            }
+        ]
+        mock_generate_content.side_effect = ConnectionError("offline")
+
+        receipt_agent.main()
+
+        saved = mock_save_json.call_args[0][0]
+        self.assertEqual([p["itemname"] for p in saved], ["Logitech M235 Wireless Mouse"])
+
+    @patch("hushh_mcp.agents.receipt_agent.model.generate_content")
+    def test_filter_is_chunked_and_bad_chunks_retried_alone(self, mock_generate_content):
+        products = [{"itemname": f"Gizmo {i}", "price": 100 + i} for i in range(6)]
+        prompts = []
+
+        def fake_generate(prompt):
+            prompts.append(prompt)
+            ids = [int(i) for i in re.findall(r'"id":(\d+)', prompt)]
+            if 0 in ids and prompts.count(prompt) == 1:
+                return MagicMock(text="Sure! Here are the items")
+            return MagicMock(text=json.dumps([i for i in ids if i % 2 == 0]))
+
+        mock_generate_content.side_effect = fake_generate
+        one_line = estimate_tokens(receipt_agent.serialise_product(0, products[0]))
+        with patch.object(receipt_agent, "FILTER_CHUNK_TOKEN_BUDGET", one_line * 2):
+            classifier = MagicMock()
+            kept = receipt_agent.resolve_with_gemini(products, classifier)
+
+        self.assertEqual([p["itemname"] for p in kept], ["Gizmo 0", "Gizmo 2", "Gizmo 4"])
+        # Three two-item chunks, and only the chunk with id 0 was sent twice
+        self.assertEqual(len(prompts), 4)
+        self.assertEqual(len(set(prompts)), 3)
+        self.assertEqual(classifier.record.call_count, 6)
+
 if __name__ == "__main__":
     unittest.main()
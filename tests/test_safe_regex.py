@@ -0,0 +1,128 @@
+import re
+import time
+import pytest
+from hushh_mcp.operons import extract_receipt_data, safe_regex
+from hushh_mcp.operons.extract_receipt_data import BUDGET_EXCEEDED, extract_receipt, extract_receipts_cached, register_extractor
+from hushh_mcp.operons.safe_regex import ReceiptPattern, RegexBudgetExceeded, regex_budget
+
+DATE = "Wed, 01 Jan 2023 10:00:00 +0530"
+
+EMAILS = [
+    {"from": "auto-confirm@amazon.in", "subject": "Your order", "date": DATE,
+     "body": "* boAt Rockerz 450 Quantity: 1 1,499.00 INR * Logitech M235 Quantity:2 1,190.00 INR"},
+    {"from": "auto-confirm@amazon.in", "subject": "Your order", "date": DATE,
+     "body": "* Redmi Note 12 Quantity Quantity: 1 24,999.00 INR"},
+    {"from": "shipment-tracking@amazon.in", "subject": 'Shipped: "Logitech C270 Webcam"', "date": DATE,
+     "body": "Your package total Rs. 1,995.00"},
+    {"from": "orders@croma.com", "date": DATE,
+     "body": "Item Description Tax Code Qty. Rate Amount 1 Sony WH-1000XM4 85183000 24990.00 24990.00"},
+    {"from": "noreply@flipkart.com", "subject": "DELIVERED: Mi Smart Band 7", "date": DATE,
+     "body": "Your item was delivered. Order Total: Rs. 3,499"},
+    {"from": "noreply@flipkart.com", "subject": "Your order", "date": DATE,
+     "body": "Apple AirPods (2nd generation) Qty: 1 ₹12,900"},
+]
+
+
+def test_patterns_keep_flags_on_both_engines():
+    pattern = ReceiptPattern(r"order for (.+?) has", re.IGNORECASE)
+    with regex_budget(None, engine="re"):
+        assert pattern.search("ORDER FOR Kindle has shipped").group(1) == "Kindle"
+    if safe_regex.re2 is not None:
+        assert pattern.linear is not None
+        with regex_budget(None, engine="re2"):
+            assert pattern.search("ORDER FOR Kindle has shipped").group(1) == "Kindle"
+
+
+def test_unsupported_syntax_falls_back_to_standard_engine():
+    pattern = ReceiptPattern(r"(\w+) \1")
+    assert pattern.linear is None
+    with regex_budget(None, engine="re2"):
+        assert pattern.search("so so good").group(1) == "so"
+
+
+@pytest.mark.skipif(safe_regex.re2 is None, reason="google-re2 not installed")
+def test_engines_extract_identical_receipts(monkeypatch):
+    monkeypatch.setenv(safe_regex.REGEX_ENGINE_ENV, "re")
+    expected = [extract_receipt(email) for email in EMAILS]
+    monkeypatch.setenv(safe_regex.REGEX_ENGINE_ENV, "re2")
+    assert [extract_receipt(email) for email in EMAILS] == expected
+    assert all(result["items"] for result in expected)
+
+
+class SlowEngine:
+    """Stands in for a compiled pattern whose search backtracks on long inputs."""
+
+    def __init__(self, compiled, slow_from=0):
+        self.compiled = compiled
+        self.slow_from = slow_from
+
+    def search(self, text):
+        if len(text) >= self.slow_from:
+            time.sleep(0.01)
+        return self.compiled.search(text)
+
+
+def test_budget_stops_further_pattern_calls():
+    pattern = ReceiptPattern(r"x")
+    pattern.standard = SlowEngine(pattern.standard)
+    with regex_budget(0.001, engine="re"):
+        pattern.search("x")
+        with pytest.raises(RegexBudgetExceeded):
+            pattern.search("x")
+    # The budget does not leak out of the block
+    assert pattern.search("x")
+
+
+def test_budget_counts_only_pattern_calls():
+    pattern = ReceiptPattern(r"x")
+    with regex_budget(0.001):
+        time.sleep(0.01)
+        assert pattern.search("x")
+
+
+def test_email_over_budget_is_reported_and_not_cached(monkeypatch, dict_cache):
+    monkeypatch.setattr(extract_receipt_data, "EXTRACTORS", dict(extract_receipt_data.EXTRACTORS))
+    monkeypatch.setattr(extract_receipt_data, "SENDER_DOMAINS", dict(extract_receipt_data.SENDER_DOMAINS))
+    monkeypatch.setattr(extract_receipt_data, "EMAIL_REGEX_BUDGET_SECONDS", 0.001)
+    monkeypatch.setenv(safe_regex.REGEX_ENGINE_ENV, "re")
+    slow_pattern = ReceiptPattern(r"Total (\d+)")
+    slow_pattern.standard = SlowEngine(slow_pattern.standard)
+
+    @register_extractor("slowshop", ("slowshop.in",))
+    def extract_slowshop(email):
+        slow_pattern.search(email["body"])
+        return [{"itemname": "x", "price": int(slow_pattern.search(email["body"]).group(1))}], "total"
+
+    email = {"id": "m1", "from": "orders@slowshop.in", "subject": "", "date": DATE, "body": "Total 5"}
+    assert extract_receipt(email) == {"platform": "slowshop", "strategy": BUDGET_EXCEEDED, "items": []}
+
+    results, parsed = extract_receipts_cached([email], dict_cache)
+    assert results[0]["strategy"] == BUDGET_EXCEEDED
+    assert parsed == 1
+    assert dict_cache == {}
+
+
+def test_email_over_budget_is_retried_on_truncated_body(monkeypatch, dict_cache):
+    monkeypatch.setattr(extract_receipt_data, "EXTRACTORS", dict(extract_receipt_data.EXTRACTORS))
+    monkeypatch.setattr(extract_receipt_data, "SENDER_DOMAINS", dict(extract_receipt_data.SENDER_DOMAINS))
+    monkeypatch.setattr(extract_receipt_data, "EMAIL_REGEX_BUDGET_SECONDS", 0.001)
+    monkeypatch.setattr(extract_receipt_data, "TRUNCATED_BODY_CHARS", 10)
+    monkeypatch.setenv(safe_regex.REGEX_ENGINE_ENV, "re")
+    # Slow only on bodies longer than the truncated length
+    slow_pattern = ReceiptPattern(r"Total (\d+)")
+    slow_pattern.standard = SlowEngine(slow_pattern.standard, slow_from=11)
+
+    @register_extractor("slowshop", ("slowshop.in",))
+    def extract_slowshop(email):
+        slow_pattern.search(email["body"])
+        return [{"itemname": "x", "price": int(slow_pattern.search(email["body"]).group(1))}], "total"
+
+    email = {"id": "m1", "from": "orders@slowshop.in", "subject": "", "date": DATE, "body": "Total 5 " + "x" * 100}
+    result = extract_receipt(email)
+    assert result["strategy"] == "total" + extract_receipt_data.TRUNCATED_SUFFIX
+    assert result["items"] == [{"itemname": "x", "price": 5}]
+
+    # Like a blown budget, truncation depends on machine load and is not cached
+    extract_receipts_cached([email], dict_cache)
+    assert dict_cache == {}
+
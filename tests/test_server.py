@@ -0,0 +1,30 @@
+import ast
+import os
+
+SERVER_PATH = os.path.join(os.path.dirname(__file__), "..", "hushh_mcp", "server.py")
+
+
+def is_main_guard(node):
+    return (
+        isinstance(node, ast.If)
+        and isinstance(node.test, ast.Compare)
+        and isinstance(node.test.left, ast.Name) and node.test.left.id == "__name__"
+        and any(isinstance(c, ast.Constant) and c.value == "__main__" for c in node.test.comparators)
+    )
+
+
+def test_server_module_body_starts_nothing_when_reimported():
+    # The pipeline runs inside the server, and the receipt parser's spawned workers
+    # re-import the server module as __mp_main__. Its module body must only define things.
+    with open(SERVER_PATH, encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+
+    started = []
+    for node in tree.body:
+        if is_main_guard(node) or isinstance(node, (ast.FunctionDef, ast.ClassDef)):
+            continue
+        for call in (n for n in ast.walk(node) if isinstance(n, ast.Call)):
+            name = ast.unparse(call.func)
+            if name.endswith((".start", ".run", "Thread")) or name in ("driver_monitor", "main"):
+                started.append(name)
+    assert started == []
@@ -1,4 +1,3 @@
-import pytest
 from unittest.mock import patch
 import hushh_mcp.agents.usage_agent as usage_agent
 
@@ -86,3 +85,58 @@ class TestUsageAgent:
         invalid_json = 'No json here!'
         parsed = usage_agent.extract_json(invalid_json)
         assert parsed is None
+
+    def test_main_reuses_settled_status_when_signals_unchanged(self, tmp_path, monkeypatch):
+        output_file = tmp_path / "usage.json"
+        output_file.write_text("{}")
+        monkeypatch.setattr(usage_agent, "OUTPUT_FILE", str(output_file))
+
+        master = {
+            "products": [{"id": "a", "itemname": "Kept"}, {"id": "b", "itemname": "Changed"}],
+            "driver_history_from_pc": {"usb": ["2024-01-01"]},
+        }
+        previous = {
+            "products": [
+                {"id": "a", "itemname": "Kept", "status": "dont_sell"},
+                {"id": "b", "itemname": "Changed before", "status": "dont_sell"},
+            ],
+            "driver_history_from_pc": {"usb": ["2024-01-01"]},
+        }
+        monkeypatch.setattr(usage_agent, "load_encrypted_json",
+                            lambda path: previous if path == str(output_file) else master)
+        saved = {}
+        monkeypatch.setattr(usage_agent, "save_encrypted_json", lambda data, path: saved.update(data=data))
+
+        with patch("hushh_mcp.agents.usage_agent.call_gemini", return_value='{"status": "resell_candidate"}') as mock_call:
+            usage_agent.main()
+
+        assert mock_call.call_count == 1
+        assert [p["status"] for p in saved["data"]["products"]] == ["dont_sell", "resell_candidate"]
+
+        # New driver activity invalidates every previous decision
+        master["driver_history_from_pc"] = {"usb": ["2024-02-01"]}
+        for product in master["products"]:
+            product.pop("status", None)
+        with patch("hushh_mcp.agents.usage_agent.call_gemini", return_value='{"status": "uncertain"}') as mock_call:
+            usage_agent.main()
+        assert mock_call.call_count == 2
+
+    def test_main_isolates_a_failing_product(self, monkeypatch):
+        master = {
+            "products": [{"id": "a", "itemname": "Laptop"}, {"id": "b", "itemname": "Mouse"}],
+            "driver_history_from_pc": {},
+        }
+        monkeypatch.setattr(usage_agent, "OUTPUT_FILE", "/nonexistent/usage.json")
+        monkeypatch.setattr(usage_agent, "load_encrypted_json", lambda path: master)
+        saved = {}
+        monkeypatch.setattr(usage_agent, "save_encrypted_json", lambda data, path: saved.update(data=data))
+
+        def fake_call_gemini(prompt):
+            if '"Laptop"' in prompt:
+                raise RuntimeError("unexpected failure")
+            return '{"status": "dont_sell"}'
+
+        monkeypatch.setattr(usage_agent, "call_gemini", fake_call_gemini)
+        usage_agent.main()
+
+        assert [(p["id"], p["status"]) for p in saved["data"]["products"]] == [("a", "uncertain"), ("b", "dont_sell")]
@@ -6,6 +6,7 @@ import base64
 from hushh_mcp.vault.encrypt import encrypt_data, decrypt_data
 from hushh_mcp.config import VAULT_ENCRYPTION_KEY
 from hushh_mcp.types import EncryptedPayload
+from hushh_mcp.vault.lru_cache import EncryptedLRUCache
 
 
 def test_encrypt_decrypt_roundtrip():
@@ -47,3 +48,44 @@ def test_decryption_fails_with_tampered_data():
 
     with pytest.raises(Exception, match="Decryption failed"):
         decrypt_data(corrupted, VAULT_ENCRYPTION_KEY)
+
+
+def test_encrypted_lru_cache_evicts_and_persists(tmp_path):
+    path = str(tmp_path / "cache.json")
+    cache = EncryptedLRUCache(path, max_entries=2)
+    cache.put("a", {"body": "1"})
+    cache.put("b", {"body": "2"})
+    assert cache.get("a") == {"body": "1"}
+    cache.put("c", {"body": "3"})  # evicts b, the least recently used
+
+    assert "b" not in cache
+    assert cache.stats()["evictions"] == 1
+    cache.save()
+
+    reloaded = EncryptedLRUCache(path, max_entries=2)
+    assert reloaded.get("a") == {"body": "1"}
+    assert reloaded.get("b") is None
+    assert reloaded.stats()["hit_rate"] == 0.5
+
+    assert len(EncryptedLRUCache(path, max_entries=2, version="2")) == 0
+
+
+def test_encrypted_lru_cache_expires_entries_after_ttl(tmp_path, monkeypatch):
+    path = str(tmp_path / "cache.json")
+    now = [1000.0]
+    monkeypatch.setattr("hushh_mcp.vault.lru_cache.time.time", lambda: now[0])
+
+    cache = EncryptedLRUCache(path, ttl=60)
+    cache.put("a", {"body": "1"})
+    now[0] += 30
+    cache.put("b", {"body": "2"})
+    cache.save()
+
+    now[0] += 45  # "a" is 75s old, "b" 45s
+    reloaded = EncryptedLRUCache(path, ttl=60)
+    assert "a" not in reloaded
+    assert reloaded.get("b") == {"body": "2"}
+
+    now[0] += 30
+    assert reloaded.get("b") is None
+    assert reloaded.stats()["expirations"] == 1